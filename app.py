@@ -1,4 +1,5 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, session
+from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, session, g, current_app, send_from_directory, send_file, has_app_context
+from flask.logging import default_handler
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager, UserMixin, login_user, login_required, logout_user, current_user
 from flask_wtf.csrf import CSRFProtect
@@ -6,118 +7,214 @@ from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 from werkzeug.security import generate_password_hash, check_password_hash
 from sqlalchemy.orm import joinedload
+from sqlalchemy import insert, delete, select, update, and_, or_, bindparam
+from sqlalchemy.exc import IntegrityError
 from datetime import datetime, timedelta
-from config import Config
+from config import Config, SQLITE_PRAGMAS, SQLITE_PERFORMANCE_PRAGMAS
+from db_pool import (install_pool_listeners, install_sqlite_pragmas, pool_metrics,
+                     InstrumentedQueuePool, ReadWriteSession)
+from sqlalchemy import create_engine
+from sharding import VoteShardRouter
+from vote_wal import VoteWriteAheadLog
+from tally import VOTING_METHODS, tally, parse_rankings, format_rankings
+from timeline import GRANULARITIES, rollup_deltas, build_timeline
+from snapshots import SnapshotIntegrityError, encode_snapshot, decode_snapshot, compare_results
+from structured_log import create_log_pipeline, install_query_counter
+from profiler import RequestProfiler, SamplingProfiler, list_profiles
+from static_assets import AssetPipeline
+from candidate_photos import THUMBNAIL_SIZES, PhotoError, make_thumbnails
+from voted_index import VotedIndex
+from jobs import JobRunner
+from bloom_filter import BloomFilter
+from login_throttle import LoginThrottle
+from audit_log import new_nonce, leaf_hash, frontier_keys, extend_tree, proof_keys, build_proof, verify_proof
+from email_blocklist import SizedCache
+from sqlalchemy.dialects import sqlite as sqlite_dialect, postgresql as postgresql_dialect
+from types import SimpleNamespace
+from jinja2 import FileSystemBytecodeCache
 import os
+import time
+import atexit
+import logging
+import threading
 import secrets
-import smtplib
-import bleach
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-
-import re
-from functools import lru_cache
-
-# Set for O(1) lookup of blocked disposable email domains
-BLOCKED_EMAIL_DOMAINS = frozenset({
-    'tempmail.com', 'temp-mail.org', 'guerrillamail.com', 'guerrillamail.org',
-    'mailinator.com', 'throwaway.email', 'fakeinbox.com', 'trashmail.com',
-    'yopmail.com', 'sharklasers.com', 'guerrillamail.info', 'grr.la',
-    'mailnesia.com', 'mytemp.email', 'tempmailaddress.com', 'throwawaymail.com',
-    'getnada.com', 'tempail.com', 'emailondeck.com', 'mohmal.com',
-    '10minutemail.com', '10minutemail.net', 'minutemail.com', 'tempinbox.com',
-    'discard.email', 'mailcatch.com', 'mailsac.com', 'spamgourmet.com',
-    'maildrop.cc', 'getairmail.com', 'fakemailgenerator.com', 'emailfake.com',
-    'crazymailing.com', 'tempmailo.com', 'tempr.email', 'dispostable.com',
-    'mailnull.com', 'spamfree24.org', 'binkmail.com', 'safetymail.info'
-})
-
-# Pre-compile regex for better performance
-EMAIL_PATTERN = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
-
-@lru_cache(maxsize=256)
-def is_valid_email(email):
-    """Validate email format and check against blocked domains (cached)"""
-    if not email or len(email) < 6:
-        return False, "Email is required" if not email else "Email is too short"
-    
-    email = email.strip().lower()
-    
-    # Fast regex check with pre-compiled pattern
-    if not EMAIL_PATTERN.match(email):
-        return False, "Invalid email format"
-    
-    # Extract and validate domain
-    domain = email.rsplit('@', 1)[-1]
-    if '.' not in domain or domain in BLOCKED_EMAIL_DOMAINS:
-        return (False, "Invalid email domain") if '.' not in domain else (False, "Disposable/temporary emails are not allowed.")
-    
-    return True, "Valid email"
-
-
-# Password strength validation
-def is_strong_password(password):
-    """Check password strength: min 8 chars, 1 uppercase, 1 lowercase, 1 digit"""
-    if not password or len(password) < 8:
-        return False, "Password must be at least 8 characters long"
-    if not any(c.isupper() for c in password):
-        return False, "Password must contain at least one uppercase letter"
-    if not any(c.islower() for c in password):
-        return False, "Password must contain at least one lowercase letter"
-    if not any(c.isdigit() for c in password):
-        return False, "Password must contain at least one number"
-    return True, "Strong password"
-
-
-# Input sanitization
-def sanitize_input(text):
-    """Sanitize user input to prevent XSS"""
-    if text is None:
-        return None
-    return bleach.clean(str(text).strip(), tags=[], strip=True)
+import csv
+import json
 
+from validation import (validate_form, validate_batch, VOTER_REGISTRATION_SCHEMA, VOTER_LOGIN_SCHEMA,
+                        email_blocklist, email_validation_cache)
 
-# Use /tmp for instance folder (writable in serverless environments)
-app = Flask(__name__, instance_path='/tmp')
-app.config.from_object(Config)
 
-# Initialize extensions
-db = SQLAlchemy(app)
+# Extensions are created unbound and attached to the app in create_app()
+db = SQLAlchemy(session_options={'class_': ReadWriteSession})
 
 # CSRF Protection
-csrf = CSRFProtect(app)
+csrf = CSRFProtect()
 
 # Rate Limiting (uses in-memory storage - for production use Redis)
 limiter = Limiter(
     key_func=get_remote_address,
-    app=app,
     default_limits=["200 per day", "50 per hour"],
     storage_uri="memory://",
 )
 
 login_manager = LoginManager()
-login_manager.init_app(app)
 login_manager.login_view = 'login'
 
-# Security headers middleware
-@app.after_request
+
+# Security headers, built once: every response gets them in a single update
+# CSP - allow Bootstrap and FontAwesome CDNs
+CONTENT_SECURITY_POLICY = (
+    "default-src 'self'; "
+    "script-src 'self' 'unsafe-inline' https://cdn.jsdelivr.net; "
+    "style-src 'self' 'unsafe-inline' https://cdn.jsdelivr.net; "
+    "font-src 'self' https://cdn.jsdelivr.net; "
+    "img-src 'self' data: https:; "
+    "connect-src 'self';"
+)
+SECURITY_HEADERS = {
+    'X-Content-Type-Options': 'nosniff',
+    'X-Frame-Options': 'SAMEORIGIN',
+    'X-XSS-Protection': '1; mode=block',
+    'Referrer-Policy': 'strict-origin-when-cross-origin',
+    'Permissions-Policy': 'geolocation=(), microphone=(), camera=()',
+    'Content-Security-Policy': CONTENT_SECURITY_POLICY,
+}
+
+
 def add_security_headers(response):
-    response.headers['X-Content-Type-Options'] = 'nosniff'
-    response.headers['X-Frame-Options'] = 'SAMEORIGIN'
-    response.headers['X-XSS-Protection'] = '1; mode=block'
-    response.headers['Referrer-Policy'] = 'strict-origin-when-cross-origin'
-    response.headers['Permissions-Policy'] = 'geolocation=(), microphone=(), camera=()'
-    # CSP - allow Bootstrap and FontAwesome CDNs
-    response.headers['Content-Security-Policy'] = (
-        "default-src 'self'; "
-        "script-src 'self' 'unsafe-inline' https://cdn.jsdelivr.net; "
-        "style-src 'self' 'unsafe-inline' https://cdn.jsdelivr.net; "
-        "font-src 'self' https://cdn.jsdelivr.net; "
-        "img-src 'self' data: https:; "
-        "connect-src 'self';"
-    )
+    response.headers.update(SECURITY_HEADERS)
     return response
 
+
+def candidate_photo_url(candidate, size=THUMBNAIL_SIZES[0]):
+    """Local thumbnail of an uploaded photo (smallest stored size >= size), else photo_url"""
+    if candidate.photo_key:
+        size = next((s for s in THUMBNAIL_SIZES if s >= size), THUMBNAIL_SIZES[-1])
+        return url_for('candidate_photo', key=candidate.photo_key, size=size)
+    return candidate.photo_url
+
+
+def asset_url(filename):
+    """URL of the fingerprinted copy of a static file (plain static URL if it was not built)"""
+    hashed = current_app.extensions['assets'].manifest.get(filename)
+    if hashed is None:
+        return url_for('static', filename=filename)
+    return url_for('serve_asset', filename=hashed)
+
+
+def start_request_profile():
+    profile = current_app.extensions['request_profiler'].start(request.endpoint)
+    if profile is not None:
+        g.profile = profile
+
+
+def finish_request_profile(exc):
+    profile = g.pop('profile', None)
+    if profile is not None:
+        path = current_app.extensions['request_profiler'].finish(profile, request.endpoint)
+        current_app.logger.info('Profiled %s into %s', request.endpoint, path, extra={'event': 'profile_written'})
+
+
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    g.query_count = 0
+
+
+def log_request(response):
+    """One structured summary per request (sampled; slow requests always logged)"""
+    started = g.get('request_started')
+    if started is None:
+        return response
+    latency_ms = round((time.perf_counter() - started) * 1000, 2)
+    slow = latency_ms >= current_app.config['LOG_SLOW_REQUEST_MS']
+    current_app.logger.log(
+        logging.WARNING if slow else logging.INFO,
+        '%s %s %s%s', request.method, request.path, response.status_code, ' (slow)' if slow else '',
+        extra={'event': 'request', 'method': request.method, 'status': response.status_code,
+               'latency_ms': latency_ms, 'query_count': g.get('query_count', 0)})
+    return response
+
+
+def configure_engines(app):
+    """Install pool telemetry and SQLite tuning (no connection is opened here)"""
+    with app.app_context():
+        install_pool_listeners(db.engine)
+        install_query_counter(db.engine)
+        if app.config['SQLITE_PERFORMANCE_MODE']:
+            install_sqlite_pragmas(db.engine, {**SQLITE_PRAGMAS, **SQLITE_PERFORMANCE_PRAGMAS})
+            # Read-only connections for SELECTs; the default engine is the single writer
+            read_engine = create_engine(
+                app.config['SQLALCHEMY_DATABASE_URI'],
+                poolclass=InstrumentedQueuePool,
+                pool_size=app.config['SQLITE_READ_POOL_SIZE'],
+                max_overflow=0,
+                pool_timeout=30,
+                connect_args={'check_same_thread': False, 'timeout': 30}
+            )
+            install_sqlite_pragmas(read_engine, {**SQLITE_PRAGMAS, **SQLITE_PERFORMANCE_PRAGMAS, 'query_only': 'ON'})
+            install_query_counter(read_engine)
+            app.extensions['sqlite_read_engine'] = read_engine
+        elif app.config['DB_PROFILE'] == 'sqlite':
+            install_sqlite_pragmas(db.engine, SQLITE_PRAGMAS)
+
+
+def create_app(config_object=Config):
+    """
+    Build and configure the Flask application
+    
+    Only fork-safe state is set up here (config, extensions, engine options);
+    connections and background threads are per-process and are started by
+    init_worker(), so the app can be preloaded in the gunicorn master.
+    """
+    # Use /tmp for instance folder (writable in serverless environments)
+    app = Flask(__name__, instance_path='/tmp')
+    app.config.from_object(config_object)
+    
+    # Log records go through a queue to a listener thread instead of being
+    # written on the request thread; the listener runs from here on (also in
+    # a preloading master) and is restarted per worker in init_worker
+    log_pipeline = create_log_pipeline(app.config)
+    log_pipeline.install()
+    app.logger.removeHandler(default_handler)
+    app.extensions['log_pipeline'] = log_pipeline
+    atexit.register(log_pipeline.stop)
+    
+    # Compiled templates are cached on disk so new workers and instances
+    # skip Jinja compilation (see `flask precompile-templates`)
+    cache_dir = app.config.get('TEMPLATE_CACHE_DIR') or os.path.join(app.instance_path, 'jinja_cache')
+    os.makedirs(cache_dir, exist_ok=True)
+    app.jinja_env.bytecode_cache = FileSystemBytecodeCache(cache_dir)
+    
+    # Fingerprinted, precompressed copies of static/, built at deploy time
+    # (`flask build-assets`); only the manifest is read here, so cold starts
+    # never hash or compress files. Without a build, plain static URLs are used.
+    assets = AssetPipeline(app.static_folder, app.config['ASSET_BUILD_DIR'])
+    assets.load()
+    app.extensions['assets'] = assets
+    app.jinja_env.globals['asset_url'] = asset_url
+    app.jinja_env.globals['candidate_photo_url'] = candidate_photo_url
+    
+    # Admin-triggered profilers (see /admin/profiler); idle until armed
+    profile_dir = app.config.get('PROFILE_DIR') or os.path.join(app.instance_path, 'profiles')
+    app.extensions['request_profiler'] = RequestProfiler(profile_dir)
+    app.extensions['sampling_profiler'] = SamplingProfiler(profile_dir)
+    
+    db.init_app(app)
+    configure_engines(app)
+    csrf.init_app(app)
+    limiter.init_app(app)
+    login_manager.init_app(app)
+    app.before_request(start_request_profile)
+    app.teardown_request(finish_request_profile)
+    app.before_request(start_request_timer)
+    app.after_request(log_request)
+    app.after_request(add_security_headers)
+    return app
+
+
+app = create_app()
+
 # ==================== Models ====================
 
 class College(db.Model):
@@ -161,22 +258,45 @@ class Election(db.Model):
     description = db.Column(db.Text)
     start_date = db.Column(db.DateTime, nullable=False)
     end_date = db.Column(db.DateTime, nullable=False)
-    status = db.Column(db.String(20), default='upcoming')  # upcoming, active, completed
+    status = db.Column(db.String(20), default='upcoming')  # upcoming, active, completed, deleting
+    voting_method = db.Column(db.String(20), default='plurality', server_default='plurality')  # plurality, irv, stv
+    seats = db.Column(db.Integer, default=1, server_default='1')
     college_code = db.Column(db.String(20), db.ForeignKey('colleges.college_code'), nullable=False)
     created_by = db.Column(db.Integer, db.ForeignKey('admins.id'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.now)
-    candidates = db.relationship('Candidate', backref='election', lazy=True, cascade='all, delete-orphan')
-    votes = db.relationship('Vote', backref='election', lazy=True, cascade='all, delete-orphan')
+    # passive_deletes: children are removed by ON DELETE CASCADE / the bulk
+    # deletes below, never loaded into the session just to be deleted
+    candidates = db.relationship('Candidate', backref='election', lazy=True, cascade='all, delete-orphan',
+                                 passive_deletes=True)
+    votes = db.relationship('Vote', backref='election', lazy=True, cascade='all, delete-orphan',
+                            passive_deletes=True)
+    rollups = db.relationship('VoteRollup', lazy=True, cascade='all, delete-orphan', passive_deletes=True)
+    result_snapshot = db.relationship('ResultSnapshot', uselist=False, lazy=True, cascade='all, delete-orphan',
+                                      passive_deletes=True)
     creator = db.relationship('Admin', foreign_keys=[created_by])
+    # Indexes on existing databases are built by migrations.py
+    __table_args__ = (
+        db.Index('ix_elections_college_code', 'college_code'),
+    )
 
-    def update_status(self):
+    @property
+    def current_status(self):
+        """Status from the dates, without touching the stored column"""
+        if self.status == 'deleting':
+            return self.status
         now = datetime.now()
         if now < self.start_date:
-            self.status = 'upcoming'
-        elif now > self.end_date:
-            self.status = 'completed'
-        else:
-            self.status = 'active'
+            return 'upcoming'
+        if now > self.end_date:
+            return 'completed'
+        return 'active'
+
+    def update_status(self):
+        self.status = self.current_status
+
+    @property
+    def is_ranked(self):
+        return self.voting_method in ('irv', 'stv')
 
 
 class Candidate(db.Model):
@@ -186,11 +306,15 @@ class Candidate(db.Model):
     party = db.Column(db.String(100))
     description = db.Column(db.Text)
     photo_url = db.Column(db.String(255))
-    election_id = db.Column(db.Integer, db.ForeignKey('elections.id'), nullable=False)
-    votes = db.relationship('Vote', backref='candidate', lazy=True)
+    photo_key = db.Column(db.String(32))  # uploaded photo (candidate_photos), preferred over photo_url
+    election_id = db.Column(db.Integer, db.ForeignKey('elections.id', ondelete='CASCADE'), nullable=False)
+    votes = db.relationship('Vote', backref='candidate', lazy=True, passive_deletes=True)
+    __table_args__ = (
+        db.Index('ix_candidates_election_id', 'election_id'),
+    )
 
     def get_vote_count(self):
-        return Vote.query.filter_by(candidate_id=self.id).count()
+        return get_vote_counts(self.election).get(self.id, 0)
 
 
 class Voter(db.Model):
@@ -202,7 +326,13 @@ class Voter(db.Model):
     password_hash = db.Column(db.String(255), nullable=False)
     college_code = db.Column(db.String(20), db.ForeignKey('colleges.college_code'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.now)
-    votes = db.relationship('Vote', backref='voter', lazy=True)
+    votes = db.relationship('Vote', backref='voter', lazy=True, passive_deletes=True)
+    # Voter IDs and emails are globally unique (registration relies on it)
+    __table_args__ = (
+        db.Index('uq_voters_voter_id', 'voter_id', unique=True),
+        db.Index('uq_voters_email', 'email', unique=True),
+        db.Index('ix_voters_college_code', 'college_code'),
+    )
 
     def set_password(self, password):
         self.password_hash = generate_password_hash(password)
@@ -211,16 +341,1429 @@ class Voter(db.Model):
         return check_password_hash(self.password_hash, password)
 
     def has_voted(self, election_id):
-        return Vote.query.filter_by(voter_id=self.id, election_id=election_id).first() is not None
+        return voter_has_voted(self, election_id)
 
 
 class Vote(db.Model):
     __tablename__ = 'votes'
     id = db.Column(db.Integer, primary_key=True)
-    voter_id = db.Column(db.Integer, db.ForeignKey('voters.id'), nullable=False)
-    election_id = db.Column(db.Integer, db.ForeignKey('elections.id'), nullable=False)
-    candidate_id = db.Column(db.Integer, db.ForeignKey('candidates.id'), nullable=False)
+    voter_id = db.Column(db.Integer, db.ForeignKey('voters.id', ondelete='CASCADE'), nullable=False)
+    election_id = db.Column(db.Integer, db.ForeignKey('elections.id', ondelete='CASCADE'), nullable=False)
+    candidate_id = db.Column(db.Integer, db.ForeignKey('candidates.id', ondelete='CASCADE'), nullable=False)  # first preference
     timestamp = db.Column(db.DateTime, default=datetime.now)
+    rankings = db.Column(db.String(255))  # ranked ballots: '3,1,2', most preferred first
+    __table_args__ = (
+        db.UniqueConstraint('voter_id', 'election_id', name='uq_votes_voter_election'),
+        db.Index('ix_votes_election_candidate', 'election_id', 'candidate_id'),
+        db.Index('ix_votes_candidate_id', 'candidate_id'),
+    )
+
+
+class VoteRollup(db.Model):
+    """Per-minute/per-hour vote counts per election and candidate (turnout timeline)"""
+    __tablename__ = 'vote_rollups'
+    id = db.Column(db.Integer, primary_key=True)
+    election_id = db.Column(db.Integer, db.ForeignKey('elections.id', ondelete='CASCADE'), nullable=False)
+    candidate_id = db.Column(db.Integer, nullable=False)
+    granularity = db.Column(db.String(10), nullable=False)  # minute, hour
+    bucket_start = db.Column(db.DateTime, nullable=False)
+    votes = db.Column(db.Integer, nullable=False, default=0)
+    __table_args__ = (
+        db.UniqueConstraint('election_id', 'granularity', 'bucket_start', 'candidate_id',
+                            name='uq_vote_rollups_bucket'),
+    )
+
+
+class ResultSnapshot(db.Model):
+    """Compressed, checksummed results of a completed election (written once)"""
+    __tablename__ = 'result_snapshots'
+    id = db.Column(db.Integer, primary_key=True)
+    election_id = db.Column(db.Integer, db.ForeignKey('elections.id', ondelete='CASCADE'), nullable=False, unique=True)
+    payload = db.Column(db.LargeBinary, nullable=False)  # zlib-compressed canonical JSON
+    checksum = db.Column(db.String(64), nullable=False)  # sha256 of the JSON
+    total_votes = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.now)
+    verified_at = db.Column(db.DateTime)
+    verified_ok = db.Column(db.Boolean)
+
+
+class AuditEntry(db.Model):
+    """Append-only audit log of stored votes; the receipt is the Merkle leaf"""
+    __tablename__ = 'vote_audit_log'
+    id = db.Column(db.Integer, primary_key=True)
+    election_id = db.Column(db.Integer, db.ForeignKey('elections.id', ondelete='CASCADE'), nullable=False)
+    # No foreign keys: entries outlive deleted voters and candidates
+    voter_id = db.Column(db.Integer, nullable=False)
+    candidate_id = db.Column(db.Integer, nullable=False)
+    rankings = db.Column(db.String(255))
+    timestamp = db.Column(db.DateTime, nullable=False)
+    nonce = db.Column(db.String(32), nullable=False)
+    receipt = db.Column(db.String(64), nullable=False, unique=True)  # sha256 leaf hash
+    leaf_index = db.Column(db.Integer)  # assigned when hashed into the tree
+    __table_args__ = (
+        db.UniqueConstraint('election_id', 'leaf_index', name='uq_vote_audit_log_leaf'),
+    )
+
+
+class AuditTreeNode(db.Model):
+    """One stored node of an election's audit Merkle tree (level 0 = leaves)"""
+    __tablename__ = 'audit_tree_nodes'
+    id = db.Column(db.Integer, primary_key=True)
+    election_id = db.Column(db.Integer, db.ForeignKey('elections.id', ondelete='CASCADE'), nullable=False)
+    level = db.Column(db.Integer, nullable=False)
+    position = db.Column(db.Integer, nullable=False)
+    hash = db.Column(db.String(64), nullable=False)
+    __table_args__ = (
+        db.UniqueConstraint('election_id', 'level', 'position', name='uq_audit_tree_nodes_position'),
+    )
+
+
+class AuditTree(db.Model):
+    """Size and root of an election's audit Merkle tree"""
+    __tablename__ = 'audit_trees'
+    id = db.Column(db.Integer, primary_key=True)
+    election_id = db.Column(db.Integer, db.ForeignKey('elections.id', ondelete='CASCADE'), nullable=False, unique=True)
+    size = db.Column(db.Integer, nullable=False, default=0)
+    root = db.Column(db.String(64))
+    updated_at = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now)
+
+
+class CandidatePhoto(db.Model):
+    """One JPEG thumbnail size of an uploaded candidate photo"""
+    __tablename__ = 'candidate_photos'
+    id = db.Column(db.Integer, primary_key=True)
+    photo_key = db.Column(db.String(32), nullable=False)  # hash of the uploaded file
+    size = db.Column(db.Integer, nullable=False)
+    data = db.Column(db.LargeBinary, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.now)
+    __table_args__ = (
+        db.UniqueConstraint('photo_key', 'size', name='uq_candidate_photos_size'),
+    )
+
+
+class Job(db.Model):
+    """Background job (see jobs.py); progress is written by the running worker"""
+    __tablename__ = 'jobs'
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)
+    title = db.Column(db.String(200), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='queued', index=True)  # queued, running, cancelling, done, failed, cancelled, interrupted
+    params = db.Column(db.Text)  # JSON
+    result = db.Column(db.Text)  # JSON
+    error = db.Column(db.Text)
+    message = db.Column(db.String(255))
+    progress_done = db.Column(db.Integer, nullable=False, default=0)
+    progress_total = db.Column(db.Integer)
+    college_code = db.Column(db.String(20))
+    # No foreign key: the job history outlives deleted admins
+    created_by = db.Column(db.Integer)
+    created_at = db.Column(db.DateTime, default=datetime.now)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime, default=datetime.now)  # heartbeat
+
+    @property
+    def percent(self):
+        if self.status == 'done':
+            return 100
+        if not self.progress_total:
+            return None
+        return min(100, int(self.progress_done * 100 / self.progress_total))
+
+    @property
+    def result_data(self):
+        return json.loads(self.result) if self.result else None
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'title': self.title,
+            'status': self.status,
+            'progress_done': self.progress_done,
+            'progress_total': self.progress_total,
+            'percent': self.percent,
+            'message': self.message,
+            'result': self.result_data,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+
+# ==================== College Registry ====================
+# Colleges change perhaps once a term but are needed by registration and most
+# admin forms. Each process keeps an immutable snapshot of them; add_college
+# replaces it, and other workers pick up changes after COLLEGE_REGISTRY_TTL
+# seconds or at the first lookup of a code missing from their snapshot.
+
+class CollegeRegistry:
+    """Versioned in-process snapshot of the colleges table"""
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self.version = 0  # bumped on every reload
+        self._colleges = None  # college_code -> SimpleNamespace, in id order
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    def reload(self):
+        rows = db.session.query(College.id, College.college_code, College.college_name,
+                                College.created_at).order_by(College.id).all()
+        colleges = {row.college_code: SimpleNamespace(**row._asdict()) for row in rows}
+        with self._lock:
+            self._colleges = colleges
+            self._loaded_at = time.monotonic()
+            self.version += 1
+        return colleges
+
+    def _snapshot(self):
+        colleges = self._colleges
+        if colleges is None or time.monotonic() - self._loaded_at > self.ttl:
+            colleges = self.reload()
+        return colleges
+
+    def invalidate(self):
+        with self._lock:
+            self._colleges = None
+
+    def all(self):
+        return list(self._snapshot().values())
+
+    def codes(self):
+        return list(self._snapshot())
+
+    def get(self, college_code):
+        """The college with this code, or None"""
+        if not college_code:
+            return None
+        college = self._snapshot().get(college_code)
+        if college is None and db.session.query(College.id).filter_by(college_code=college_code).first():
+            # Added through another worker since this snapshot was taken
+            college = self.reload().get(college_code)
+        return college
+
+
+college_registry = CollegeRegistry(app.config['COLLEGE_REGISTRY_TTL'])
+
+
+# ==================== Registered Voter Filter ====================
+# Most registrations use a new voter ID and email, so the two existence
+# queries before the insert usually find nothing. A Bloom filter of the
+# registered IDs and emails answers "definitely new" without a query. Each
+# worker has its own filter and picks up other workers' registrations every
+# VOTER_FILTER_SYNC_INTERVAL seconds; a key missed in between is still
+# rejected by the unique indexes on voters.
+
+class RegisteredVoterFilter:
+    """Per-process Bloom filter of voter IDs and emails"""
+
+    def __init__(self, error_rate, sync_interval):
+        self.error_rate = error_rate
+        self.sync_interval = sync_interval
+        self.filter = None
+        self.max_id = 0  # highest voter primary key loaded
+        self.removed = 0  # keys of deleted voters still set in the filter
+        self._synced_at = 0.0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _keys(voter_id, email):
+        return f'id:{voter_id}', f'email:{email}'
+
+    def _add_rows(self, bloom, rows):
+        for pk, voter_id, email in rows:
+            for key in self._keys(voter_id, email):
+                bloom.add(key)
+            self.max_id = max(self.max_id, pk)
+
+    def _load(self):
+        count = db.session.query(db.func.count(Voter.id)).scalar()
+        # Two keys per voter, with room for the registrations to come
+        bloom = BloomFilter(max(4 * count, 10000), self.error_rate)
+        self.max_id = 0
+        self._add_rows(bloom, db.session.query(Voter.id, Voter.voter_id, Voter.email).execution_options(
+            yield_per=10000))
+        self.filter, self.removed = bloom, 0
+
+    def _current(self):
+        with self._lock:
+            bloom = self.filter
+            if bloom is None or bloom.saturated or self.removed > bloom.capacity // 10:
+                self._load()
+                self._synced_at = time.monotonic()
+            elif time.monotonic() - self._synced_at > self.sync_interval:
+                # Voters registered through other workers since the last sync
+                self._add_rows(bloom, db.session.query(Voter.id, Voter.voter_id, Voter.email).filter(
+                    Voter.id > self.max_id))
+                self._synced_at = time.monotonic()
+            return self.filter
+
+    def may_exist(self, voter_id, email):
+        """(voter ID possibly taken, email possibly taken); False is definite"""
+        bloom = self._current()
+        id_key, email_key = self._keys(voter_id, email)
+        return id_key in bloom, email_key in bloom
+
+    def add(self, voter_id, email):
+        bloom = self.filter
+        if bloom is not None:
+            for key in self._keys(voter_id, email):
+                bloom.add(key)
+
+    def remove(self, voter_id, email):
+        # Bloom filters cannot unset keys: the stale keys only cost a query,
+        # and enough of them trigger a rebuild
+        self.removed += 2
+
+
+# Failed logins per account (admin and voter), shared by the workers on this
+# host through a mapped file; locked accounts are refused before hashing
+login_throttle = LoginThrottle(
+    app.config.get('LOGIN_THROTTLE_PATH') or os.path.join(app.instance_path, 'login_throttle.bin'),
+    slots=app.config['LOGIN_THROTTLE_SLOTS'], max_failures=app.config['LOGIN_MAX_FAILURES'],
+    window=app.config['LOGIN_FAILURE_WINDOW'], base_lockout=app.config['LOGIN_LOCKOUT_BASE'],
+    max_lockout=app.config['LOGIN_LOCKOUT_MAX'])
+
+voter_filter = (RegisteredVoterFilter(app.config['VOTER_FILTER_ERROR_RATE'], app.config['VOTER_FILTER_SYNC_INTERVAL'])
+                if app.config['VOTER_FILTER_ENABLED'] else None)
+
+
+# ==================== Vote Storage ====================
+# All vote reads/writes go through these helpers so that, when VOTE_SHARD_URL
+# is set, they are transparently routed to the owning college's shard.
+
+vote_router = VoteShardRouter.from_config(app.config)
+
+
+def get_vote_counts(election):
+    """Return {candidate_id: votes} for an election in one grouped query"""
+    if vote_router:
+        return vote_router.tally(election.college_code, election.id)
+    rows = db.session.query(Vote.candidate_id, db.func.count(Vote.id)).filter(
+        Vote.election_id == election.id).group_by(Vote.candidate_id).all()
+    return dict(rows)
+
+
+def get_election_results(election):
+    """Per-candidate result rows as used by the results page and API"""
+    counts = get_vote_counts(election)
+    candidates = Candidate.query.filter_by(election_id=election.id).all()
+    return [{
+        'id': candidate.id,
+        'name': candidate.name,
+        'party': candidate.party,
+        'votes': counts.get(candidate.id, 0)
+    } for candidate in candidates]
+
+
+def get_ranked_results(election):
+    """
+    Run the IRV/STV count for a ranked election
+
+    Identical ballots are grouped by the database, so the tally works on one
+    row per distinct ranking. Ballots cast before the election was switched
+    to ranked voting count as a single first preference.
+
+    Returns:
+        tally() result with 'candidates' ({id: name}) added
+    """
+    if vote_router:
+        rows = vote_router.grouped_rankings(election.college_code, election.id)
+    else:
+        rows = db.session.query(Vote.rankings, Vote.candidate_id, db.func.count(Vote.id)).filter(
+            Vote.election_id == election.id).group_by(Vote.rankings, Vote.candidate_id).all()
+    grouped = ((parse_rankings(rankings) or (candidate_id,), count) for rankings, candidate_id, count in rows)
+    candidates = Candidate.query.filter_by(election_id=election.id).order_by(Candidate.id).all()
+    result = tally(election.voting_method, grouped, [c.id for c in candidates], election.seats or 1)
+    result['candidates'] = {c.id: c.name for c in candidates}
+    return result
+
+
+def _vote_views(rows):
+    """Wrap shard rows so templates can use vote.voter / vote.candidate / vote.election"""
+    voter_ids = {row.voter_id for row in rows}
+    candidate_ids = {row.candidate_id for row in rows}
+    election_ids = {row.election_id for row in rows}
+    voters = {v.id: v for v in Voter.query.filter(Voter.id.in_(voter_ids)).all()} if voter_ids else {}
+    candidates = {c.id: c for c in Candidate.query.filter(Candidate.id.in_(candidate_ids)).all()} if candidate_ids else {}
+    elections = {e.id: e for e in Election.query.filter(Election.id.in_(election_ids)).all()} if election_ids else {}
+    return [SimpleNamespace(
+        id=row.id,
+        voter_id=row.voter_id,
+        election_id=row.election_id,
+        candidate_id=row.candidate_id,
+        timestamp=row.timestamp,
+        voter=voters.get(row.voter_id),
+        candidate=candidates.get(row.candidate_id),
+        election=elections.get(row.election_id)
+    ) for row in rows]
+
+
+def get_election_votes(election):
+    """All votes of an election with voter and candidate attached"""
+    if vote_router:
+        return _vote_views(vote_router.election_votes(election.college_code, election.id))
+    return Vote.query.options(joinedload(Vote.voter), joinedload(Vote.candidate)).filter_by(
+        election_id=election.id).all()
+
+
+def get_all_votes():
+    """Every vote in the system (database viewer)"""
+    if vote_router:
+        rows = []
+        for college in college_registry.all():
+            rows.extend(vote_router.all_votes(college.college_code))
+        return _vote_views(rows)
+    return Vote.query.all()
+
+
+def voter_has_voted(voter, election_id):
+    if vote_wal and vote_wal.is_pending(voter.id, election_id):
+        return True
+    if voted_index:
+        return voted_index.has_voted(election_id, voter.id)
+    if vote_router:
+        return vote_router.has_voted(voter.college_code, voter.id, election_id)
+    return Vote.query.filter_by(voter_id=voter.id, election_id=election_id).first() is not None
+
+
+def apply_vote_batch(entries):
+    """
+    Group-commit buffered votes in a fresh app context (the WAL flusher
+    thread, startup and shutdown)
+
+    Callers that already run in an app context (jobs, requests) use
+    store_vote_batch with their own session instead.
+    """
+    if has_app_context():
+        # The nested context would open a second session; with SQLite's
+        # single writer connection it waits forever for the caller's
+        raise RuntimeError('apply_vote_batch opens its own app context; use store_vote_batch')
+    with app.app_context():
+        store_vote_batch(entries)
+
+
+def store_vote_batch(entries):
+    """
+    Store votes with their rollups and audit entries in the current session
+    and commit, skipping voter/election pairs already stored
+
+    Returns:
+        Number of votes stored
+    """
+    if vote_router:
+        by_college = {}
+        for entry in entries:
+            by_college.setdefault(entry['college_code'], []).append(entry)
+        for college_code, college_entries in by_college.items():
+            vote_router.add_votes(college_code, college_entries)
+        # The shard commit above and the main database commit below are
+        # separate transactions. Rollups and audit entries go together in
+        # the second one, for every stored vote that has no audit entry yet,
+        # so replaying after a failed main commit completes them.
+        audited = set(db.session.query(AuditEntry.voter_id, AuditEntry.election_id).filter(
+            AuditEntry.election_id.in_({e['election_id'] for e in entries}),
+            AuditEntry.voter_id.in_({e['voter_id'] for e in entries})).all())
+        missing = []
+        for entry in entries:
+            key = (entry['voter_id'], entry['election_id'])
+            if key not in audited:
+                audited.add(key)
+                missing.append(entry)
+        if missing:
+            update_vote_rollups((e['election_id'], e['candidate_id'], e['timestamp']) for e in missing)
+            append_audit_entries(missing)
+        db.session.commit()
+        mark_voted(entries)
+        return len(missing)
+    existing = set(db.session.query(Vote.voter_id, Vote.election_id).filter(
+        Vote.election_id.in_({e['election_id'] for e in entries}),
+        Vote.voter_id.in_({e['voter_id'] for e in entries})).all())
+    # Voters/candidates deleted while their vote was queued would now
+    # violate the foreign keys; such votes are dropped
+    live_voters = set(db.session.scalars(select(Voter.id).where(
+        Voter.id.in_({e['voter_id'] for e in entries}))))
+    live_candidates = set(db.session.scalars(select(Candidate.id).where(
+        Candidate.id.in_({e['candidate_id'] for e in entries}))))
+    rows, audited = [], []
+    for entry in entries:
+        key = (entry['voter_id'], entry['election_id'])
+        if key not in existing and entry['voter_id'] in live_voters and entry['candidate_id'] in live_candidates:
+            existing.add(key)
+            rows.append({k: entry.get(k) for k in ('voter_id', 'election_id', 'candidate_id', 'timestamp', 'rankings')})
+            audited.append(entry)
+    if rows:
+        db.session.execute(insert(Vote), rows)
+        update_vote_rollups((row['election_id'], row['candidate_id'], row['timestamp']) for row in rows)
+        append_audit_entries(audited)
+    db.session.commit()
+    mark_voted(rows)
+    return len(rows)
+
+
+def load_voted_voter_ids(election_id):
+    """Voters with a stored vote in an election (builds the voted bitmap)"""
+    with app.app_context():
+        election = db.session.get(Election, election_id)
+        if election is None:
+            return []
+        if vote_router:
+            return [row.voter_id for row in vote_router.election_votes(election.college_code, election_id)]
+        return db.session.scalars(select(Vote.voter_id).where(Vote.election_id == election_id)).all()
+
+
+# Optional mmap-backed voted bitmaps shared by the workers on this host
+voted_index = VotedIndex(app.config['VOTED_INDEX_DIR'], load_voted_voter_ids) if app.config.get('VOTED_INDEX_DIR') else None
+
+
+def mark_voted(votes):
+    """Set the voted bits of committed votes (dicts with voter_id, election_id)"""
+    if not voted_index:
+        return
+    by_election = {}
+    for vote in votes:
+        by_election.setdefault(vote['election_id'], []).append(vote['voter_id'])
+    for election_id, voter_ids in by_election.items():
+        voted_index.mark(election_id, voter_ids)
+
+
+vote_wal = None
+if app.config.get('VOTE_WAL_PATH'):
+    vote_wal = VoteWriteAheadLog(
+        app.config['VOTE_WAL_PATH'],
+        apply_batch=apply_vote_batch,
+        batch_size=app.config['VOTE_WAL_BATCH_SIZE'],
+        flush_interval=app.config['VOTE_WAL_FLUSH_INTERVAL']
+    )
+    atexit.register(vote_wal.stop)
+
+
+def record_vote(voter, election, candidate_id, rankings=None):
+    """
+    Persist a vote in the shard (or table) that owns the election, together
+    with its audit log entry
+
+    With the write-ahead buffer enabled the vote is only appended (and
+    fsynced) here; the background flusher commits it in a batch.
+
+    Args:
+        rankings: Ordered candidate ids for ranked elections; candidate_id
+            must be the first of them
+
+    Returns:
+        The voter's receipt hash, or None if the voter already has a vote
+        for this election
+    """
+    rankings = format_rankings(rankings) if rankings else None
+    timestamp = datetime.now()
+    nonce = new_nonce()
+    receipt = leaf_hash(election.id, voter.id, candidate_id, rankings, timestamp, nonce)
+    if vote_wal:
+        appended = vote_wal.append(voter.id, election.id, candidate_id, election.college_code,
+                                   timestamp=timestamp, rankings=rankings, nonce=nonce)
+        return receipt if appended else None
+    audit_entry = {'voter_id': voter.id, 'election_id': election.id, 'candidate_id': candidate_id,
+                   'timestamp': timestamp, 'rankings': rankings, 'nonce': nonce}
+    if vote_router:
+        try:
+            vote_router.add_vote(election.college_code, voter.id, election.id, candidate_id,
+                                 timestamp=timestamp, rankings=rankings)
+        except IntegrityError:
+            return None
+        update_vote_rollups([(election.id, candidate_id, timestamp)])
+        append_audit_entries([audit_entry])
+        db.session.commit()
+        mark_voted([audit_entry])
+        return receipt
+    db.session.add(Vote(voter_id=voter.id, election_id=election.id, candidate_id=candidate_id,
+                        timestamp=timestamp, rankings=rankings))
+    try:
+        # Flush first so a duplicate vote fails before the rollup is touched;
+        # the vote, its rollup increment and audit entry commit together
+        db.session.flush()
+        update_vote_rollups([(election.id, candidate_id, timestamp)])
+        append_audit_entries([audit_entry])
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return None
+    mark_voted([audit_entry])
+    return receipt
+
+
+def count_votes(college_code=None):
+    """Total votes, optionally restricted to one college"""
+    if voted_index:
+        # One vote per voter and election: the sum of the elections' popcounts
+        query = db.session.query(Election.id)
+        if college_code:
+            query = query.filter(Election.college_code == college_code)
+        return sum(voted_index.count(election_id) for (election_id,) in query)
+    if vote_router:
+        codes = [college_code] if college_code else college_registry.codes()
+        return sum(vote_router.count_votes(code) for code in codes)
+    if college_code:
+        return db.session.query(Vote).join(Election).filter(
+            Election.college_code == college_code).count()
+    return Vote.query.count()
+
+
+def get_votes_per_voter(college_code=None):
+    """Return {voter_pk: votes cast} without loading vote objects"""
+    if vote_router:
+        codes = [college_code] if college_code else college_registry.codes()
+        counts = {}
+        for code in codes:
+            counts.update(vote_router.votes_per_voter(code))
+        return counts
+    query = db.session.query(Vote.voter_id, db.func.count(Vote.id))
+    if college_code:
+        query = query.join(Voter, Vote.voter_id == Voter.id).filter(Voter.college_code == college_code)
+    return dict(query.group_by(Vote.voter_id).all())
+
+
+def count_votes_cast(voter):
+    """Number of votes one voter cast (counted on the voter's shard)"""
+    if vote_router:
+        return vote_router.count_voter_votes(voter.college_code, voter.id)
+    return db.session.query(db.func.count(Vote.id)).filter(Vote.voter_id == voter.id).scalar()
+
+
+def delete_votes_for_voter(voter):
+    """Delete a voter's votes and take them back out of the turnout rollups"""
+    if vote_router:
+        removed = vote_router.votes_for_voter(voter.college_code, voter.id)
+    else:
+        removed = db.session.query(Vote.election_id, Vote.candidate_id, Vote.timestamp).filter(
+            Vote.voter_id == voter.id).all()
+    update_vote_rollups(removed, sign=-1)
+    if voted_index:
+        voted_index.unmark_voter(voter.id, {election_id for election_id, _, _ in removed})
+    if vote_router:
+        return vote_router.delete_for_voter(voter.college_code, voter.id)
+    return Vote.query.filter_by(voter_id=voter.id).delete()
+
+
+def count_election_votes(election):
+    if vote_router:
+        return vote_router.count_votes(election.college_code, [election.id])
+    return db.session.query(db.func.count(Vote.id)).filter(Vote.election_id == election.id).scalar()
+
+
+def delete_votes_for_candidate(candidate):
+    VoteRollup.query.filter_by(election_id=candidate.election_id, candidate_id=candidate.id).delete()
+    if voted_index:
+        # Their voters may vote again
+        if vote_router:
+            voter_ids = [row.voter_id for row in vote_router.election_votes(
+                candidate.election.college_code, candidate.election_id) if row.candidate_id == candidate.id]
+        else:
+            voter_ids = db.session.scalars(select(Vote.voter_id).where(Vote.candidate_id == candidate.id)).all()
+        voted_index.mark(candidate.election_id, voter_ids, voted=False)
+    if vote_router:
+        return vote_router.delete_for_candidate(candidate.election.college_code, candidate.id)
+    return Vote.query.filter_by(candidate_id=candidate.id).delete()
+
+
+# ==================== Turnout Timeline ====================
+# vote_rollups holds per-minute and per-hour vote counts per election and
+# candidate. They are incremented in the same transaction as the vote (or,
+# for shards, right after it) and can be rebuilt with `flask backfill-rollups`.
+
+_rollup_columns = ('election_id', 'granularity', 'bucket_start', 'candidate_id')
+
+
+def update_vote_rollups(votes, sign=1):
+    """
+    Add (or with sign=-1 remove) votes to the turnout rollups in the
+    current session; the caller commits
+
+    Args:
+        votes: Iterable of (election_id, candidate_id, timestamp)
+    """
+    apply_rollup_deltas(rollup_deltas(votes, sign))
+
+
+def rollup_rows(deltas):
+    """Rollup deltas as parameter dicts for rollup_upsert_statement()"""
+    return [{'election_id': election_id, 'candidate_id': candidate_id, 'granularity': granularity,
+             'bucket_start': bucket, 'votes': delta}
+            for (election_id, candidate_id, granularity, bucket), delta in deltas.items() if delta]
+
+
+def rollup_upsert_statement(dialect_name):
+    """INSERT ... ON CONFLICT that adds to existing buckets, or None if unsupported"""
+    dialect = {'sqlite': sqlite_dialect, 'postgresql': postgresql_dialect}.get(dialect_name)
+    if dialect is None:
+        return None
+    table = VoteRollup.__table__
+    statement = dialect.insert(table)
+    return statement.on_conflict_do_update(
+        index_elements=list(_rollup_columns),
+        set_={'votes': table.c.votes + statement.excluded.votes})
+
+
+def apply_rollup_deltas(deltas):
+    """Upsert a Counter produced by timeline.rollup_deltas()"""
+    rows = rollup_rows(deltas)
+    if not rows:
+        return
+    table = VoteRollup.__table__
+    statement = rollup_upsert_statement(db.engine.dialect.name)
+    if statement is not None:
+        db.session.execute(statement, rows)
+        return
+    # Other databases: update, insert the buckets that did not exist yet
+    for row in rows:
+        updated = db.session.execute(table.update().where(
+            *(table.c[name] == row[name] for name in _rollup_columns)
+        ).values(votes=table.c.votes + row['votes'])).rowcount
+        if not updated:
+            db.session.execute(table.insert().values(**row))
+
+
+def backfill_vote_rollups(elections=None, chunk_size=10000):
+    """
+    Rebuild the rollups of the given elections (default: all) from the
+    stored votes
+
+    Returns:
+        Number of votes counted
+    """
+    elections = elections if elections is not None else Election.query.all()
+    counted = 0
+    for election in elections:
+        VoteRollup.query.filter_by(election_id=election.id).delete()
+        if vote_router:
+            votes = ((row.election_id, row.candidate_id, row.timestamp)
+                     for row in vote_router.election_votes(election.college_code, election.id))
+        else:
+            votes = db.session.query(Vote.election_id, Vote.candidate_id, Vote.timestamp).filter(
+                Vote.election_id == election.id).execution_options(yield_per=chunk_size)
+        # Votes are streamed; only the bucket counters are held in memory
+        deltas = rollup_deltas(votes)
+        apply_rollup_deltas(deltas)
+        db.session.commit()
+        counted += sum(delta for key, delta in deltas.items() if key[2] == GRANULARITIES[0])
+    return counted
+
+
+_voter_count_cache = {}
+
+
+def get_eligible_voter_count(college_code):
+    """Registered voters of a college, cached for VOTER_COUNT_CACHE_TTL seconds"""
+    now = time.monotonic()
+    cached = _voter_count_cache.get(college_code)
+    if cached is not None and now - cached[1] < app.config['VOTER_COUNT_CACHE_TTL']:
+        return cached[0]
+    count = db.session.query(db.func.count(Voter.id)).filter(Voter.college_code == college_code).scalar()
+    _voter_count_cache[college_code] = (count, now)
+    return count
+
+
+def invalidate_voter_count(college_code):
+    _voter_count_cache.pop(college_code, None)
+
+
+def get_election_turnout(election):
+    """Voters who voted in an election against the college's registered voters"""
+    voted = voted_index.count(election.id) if voted_index else count_election_votes(election)
+    eligible = get_eligible_voter_count(election.college_code)
+    return {'election_id': election.id, 'voted': voted, 'eligible_voters': eligible,
+            'turnout': round(voted / eligible * 100, 2) if eligible else 0.0}
+
+
+def get_college_turnout(college_code):
+    """Distinct voters of a college who voted in any of its elections"""
+    election_ids = [election_id for (election_id,) in db.session.query(Election.id).filter(
+        Election.college_code == college_code)]
+    if voted_index:
+        voted = voted_index.count_any(election_ids)
+    elif vote_router:
+        voted = len(vote_router.votes_per_voter(college_code))
+    else:
+        voted = db.session.query(db.func.count(db.distinct(Vote.voter_id))).filter(
+            Vote.election_id.in_(election_ids)).scalar() if election_ids else 0
+    eligible = get_eligible_voter_count(college_code)
+    return {'college_code': college_code, 'voted': voted, 'eligible_voters': eligible,
+            'turnout': round(voted / eligible * 100, 2) if eligible else 0.0}
+
+
+def get_election_timeline(election, granularity='minute'):
+    """Turnout series for an election, read only from the rollup table"""
+    rows = db.session.query(VoteRollup.bucket_start, VoteRollup.candidate_id, VoteRollup.votes).filter(
+        VoteRollup.election_id == election.id, VoteRollup.granularity == granularity).all()
+    eligible = get_eligible_voter_count(election.college_code)
+    timeline = build_timeline(rows, eligible)
+    timeline.update(election_id=election.id, granularity=granularity, eligible_voters=eligible,
+                    total_votes=timeline['cumulative'][-1] if timeline['cumulative'] else 0)
+    return timeline
+
+
+# ==================== Result Snapshots ====================
+# Completed elections are counted once; the results page and API then serve
+# the stored snapshot instead of recounting raw votes on every view.
+
+# Decoded snapshots keyed by (election_id, checksum)
+snapshot_cache = SizedCache(64)
+
+
+def compute_result_payload(election):
+    """Count an election from the raw votes (results, ranked rounds, vote list, stats)"""
+    results = get_election_results(election)
+    total_votes = sum(r['votes'] for r in results)
+    ranked = get_ranked_results(election) if election.is_ranked else None
+    detailed_votes = sorted(({
+        'voter_name': vote.voter.name,
+        'voter_id': vote.voter.voter_id,
+        'candidate_name': vote.candidate.name,
+        'timestamp': vote.timestamp.isoformat()
+    } for vote in get_election_votes(election)), key=lambda v: (v['timestamp'], v['voter_id']))
+    eligible = db.session.query(db.func.count(Voter.id)).filter(
+        Voter.college_code == election.college_code).scalar()
+    return {
+        'election_id': election.id,
+        'results': results,
+        'ranked': ranked,
+        'total_votes': total_votes,
+        'detailed_votes': detailed_votes,
+        'stats': {
+            'eligible_voters': eligible,
+            'turnout': round(total_votes / eligible * 100, 2) if eligible else 0.0,
+            'computed_at': datetime.now().isoformat(),
+        },
+    }
+
+
+def finalize_election(election):
+    """
+    Store the result snapshot of a completed election (no-op if it exists)
+
+    Returns:
+        The ResultSnapshot, or None while votes for it are still buffered
+    """
+    if election.result_snapshot is not None:
+        return election.result_snapshot
+    if vote_wal and vote_wal.pending_count(election.id):
+        # Votes acknowledged before the close are still buffered; the
+        # flusher applies them and a later call finalizes
+        return None
+    # Seal the audit log: the final root covers every counted vote
+    build_audit_tree(election.id)
+    payload = compute_result_payload(election)
+    blob, checksum = encode_snapshot(payload)
+    snapshot = ResultSnapshot(election_id=election.id, payload=blob, checksum=checksum,
+                              total_votes=payload['total_votes'])
+    db.session.add(snapshot)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # Another worker finalized the election first
+        db.session.rollback()
+        snapshot = ResultSnapshot.query.filter_by(election_id=election.id).one()
+    return snapshot
+
+
+def payload_from_json(payload):
+    """Undo the JSON round trip: integer candidate ids in the ranked rounds"""
+    ranked = payload.get('ranked')
+    if ranked:
+        ranked['candidates'] = {int(k): v for k, v in ranked['candidates'].items()}
+        for round_info in ranked['rounds']:
+            round_info['counts'] = {int(k): v for k, v in round_info['counts'].items()}
+    return payload
+
+
+def finalize_completed_elections(elections):
+    """
+    Snapshot the completed elections that have none yet (run where the
+    status changes to completed and by the reconciliation job)
+
+    Returns:
+        Number of snapshots stored
+    """
+    finalized = 0
+    for election in elections:
+        if election.status == 'completed' and election.result_snapshot is None:
+            if finalize_election(election) is not None:
+                finalized += 1
+    return finalized
+
+
+def get_result_payload(election, finalize=False):
+    """
+    Results of an election: its snapshot once it is completed, a live count
+    otherwise. Only with finalize the missing snapshot is stored here; public
+    pages stay read-only and recount until the election is finalized.
+
+    Returns:
+        Tuple (payload, snapshot or None)
+    """
+    if election.current_status != 'completed':
+        return compute_result_payload(election), None
+    snapshot = finalize_election(election) if finalize else election.result_snapshot
+    if snapshot is None:
+        return compute_result_payload(election), None
+    try:
+        payload = snapshot_cache.get_or_compute(
+            (election.id, snapshot.checksum),
+            lambda key: payload_from_json(decode_snapshot(snapshot.payload, snapshot.checksum)))
+    except SnapshotIntegrityError as e:
+        app.logger.warning('Result snapshot of election %s is unusable (%s), recounting', election.id, e,
+                           extra={'event': 'snapshot_corrupt', 'election_id': election.id})
+        return compute_result_payload(election), snapshot
+    return payload, snapshot
+
+
+def verify_result_snapshot(snapshot):
+    """
+    Recount the election and compare with its snapshot
+
+    Returns:
+        List of problems (empty when the snapshot is intact and matches)
+    """
+    election = db.session.get(Election, snapshot.election_id)
+    try:
+        stored = decode_snapshot(snapshot.payload, snapshot.checksum)
+        problems = [f'{key} differs from a recount' for key in compare_results(stored, compute_result_payload(election))]
+    except SnapshotIntegrityError as e:
+        problems = [str(e)]
+    snapshot.verified_at = datetime.now()
+    snapshot.verified_ok = not problems
+    db.session.commit()
+    return problems
+
+
+# ==================== Vote Audit Log ====================
+# Every stored vote appends an entry whose receipt hash is a Merkle leaf.
+# Pending entries are hashed into the election's tree in batches (by the
+# reconciliation job, finalization or `flask build-audit-trees`; the public
+# endpoints only read the tree); all tree levels are stored, so an inclusion
+# proof reads O(log n) nodes.
+
+def audit_row(vote):
+    """vote_audit_log row for a stored vote dict (nonce generated if missing)"""
+    nonce = vote.get('nonce') or new_nonce()
+    return {
+        'election_id': vote['election_id'],
+        'voter_id': vote['voter_id'],
+        'candidate_id': vote['candidate_id'],
+        'rankings': vote.get('rankings'),
+        'timestamp': vote['timestamp'],
+        'nonce': nonce,
+        'receipt': leaf_hash(vote['election_id'], vote['voter_id'], vote['candidate_id'],
+                             vote.get('rankings'), vote['timestamp'], nonce),
+    }
+
+
+def append_audit_entries(votes):
+    """Append audit log entries for stored votes in the current session; the caller commits"""
+    rows = [audit_row(vote) for vote in votes]
+    if rows:
+        db.session.execute(insert(AuditEntry), rows)
+
+
+def get_audit_nodes(election_id, keys):
+    """Stored tree nodes {(level, position): hash} for the given keys, in one query"""
+    if not keys:
+        return {}
+    rows = db.session.query(AuditTreeNode.level, AuditTreeNode.position, AuditTreeNode.hash).filter(
+        AuditTreeNode.election_id == election_id,
+        or_(*(and_(AuditTreeNode.level == level, AuditTreeNode.position == position)
+              for level, position in keys))).all()
+    return {(level, position): value for level, position, value in rows}
+
+
+def _store_audit_nodes(election_id, nodes):
+    rows = [{'election_id': election_id, 'level': level, 'position': position, 'hash': value}
+            for (level, position), value in nodes.items()]
+    table = AuditTreeNode.__table__
+    dialect = {'sqlite': sqlite_dialect, 'postgresql': postgresql_dialect}.get(db.engine.dialect.name)
+    if dialect is not None:
+        statement = dialect.insert(table)
+        statement = statement.on_conflict_do_update(
+            index_elements=['election_id', 'level', 'position'], set_={'hash': statement.excluded.hash})
+        db.session.execute(statement, rows)
+        return
+    for row in rows:
+        updated = db.session.execute(table.update().where(
+            table.c.election_id == election_id, table.c.level == row['level'],
+            table.c.position == row['position']).values(hash=row['hash'])).rowcount
+        if not updated:
+            db.session.execute(table.insert().values(**row))
+
+
+def extend_audit_tree(election_id, batch_size=None):
+    """
+    Hash one batch of pending audit entries into the election's tree
+
+    The tree row is advanced with a compare-and-set on its size, so when two
+    workers extend the same tree concurrently one of them backs off.
+
+    Returns:
+        Number of entries added (0 when nothing is pending or another
+        worker got there first)
+    """
+    batch_size = batch_size or app.config['AUDIT_BATCH_SIZE']
+    tree = AuditTree.query.filter_by(election_id=election_id).first()
+    size = tree.size if tree else 0
+    pending = db.session.query(AuditEntry.id, AuditEntry.receipt).filter(
+        AuditEntry.election_id == election_id, AuditEntry.leaf_index.is_(None)
+    ).order_by(AuditEntry.id).limit(batch_size).all()
+    if not pending:
+        return 0
+    nodes, root = extend_tree(size, [receipt for _, receipt in pending],
+                              get_audit_nodes(election_id, frontier_keys(size)))
+    try:
+        if tree is None:
+            db.session.add(AuditTree(election_id=election_id, size=len(pending), root=root))
+            db.session.flush()
+        elif not db.session.execute(update(AuditTree).where(
+                AuditTree.id == tree.id, AuditTree.size == size).values(
+                size=size + len(pending), root=root, updated_at=datetime.now())
+                .execution_options(synchronize_session=False)).rowcount:
+            db.session.rollback()
+            return 0
+    except IntegrityError:
+        db.session.rollback()
+        return 0
+    db.session.execute(
+        update(AuditEntry.__table__).where(AuditEntry.__table__.c.id == bindparam('entry_id')).values(
+            leaf_index=bindparam('index')),
+        [{'entry_id': entry_id, 'index': size + i} for i, (entry_id, _) in enumerate(pending)])
+    _store_audit_nodes(election_id, nodes)
+    db.session.commit()
+    return len(pending)
+
+
+def build_audit_tree(election_id):
+    """Hash all pending audit entries of an election; returns the AuditTree (or None)"""
+    while extend_audit_tree(election_id):
+        pass
+    db.session.expire_all()
+    return AuditTree.query.filter_by(election_id=election_id).first()
+
+
+def get_receipt_proof(receipt):
+    """
+    Inclusion proof of a receipt against the current root of its election
+    (status "pending" until the entry is hashed into the tree)
+
+    Returns:
+        Proof dict, or None for an unknown receipt
+    """
+    entry = AuditEntry.query.filter_by(receipt=receipt).first()
+    if entry is None:
+        return None
+    tree = AuditTree.query.filter_by(election_id=entry.election_id).first()
+    if entry.leaf_index is None or tree is None or tree.size <= entry.leaf_index:
+        # Not hashed yet: the reconciliation job or the close of the election will
+        return {'receipt': receipt, 'election_id': entry.election_id, 'status': 'pending'}
+    nodes = get_audit_nodes(entry.election_id, proof_keys(entry.leaf_index, tree.size))
+    proof = build_proof(entry.leaf_index, tree.size, nodes)
+    return {
+        'receipt': receipt,
+        'election_id': entry.election_id,
+        'status': 'included',
+        'leaf_index': entry.leaf_index,
+        'tree_size': tree.size,
+        'root': tree.root,
+        'proof': proof,
+        'verified': verify_proof(receipt, proof, tree.root),
+    }
+
+
+def backfill_audit_log(elections=None, chunk_size=10000):
+    """
+    Add audit entries for votes stored before the audit log existed (they
+    get fresh nonces; their voters never received receipts)
+
+    Returns:
+        Number of entries added
+    """
+    elections = elections if elections is not None else Election.query.all()
+    added = 0
+    for election in elections:
+        if db.session.query(AuditEntry.id).filter_by(election_id=election.id).first():
+            continue
+        if vote_router:
+            votes = vote_router.election_votes(election.college_code, election.id)
+        else:
+            votes = db.session.query(Vote.voter_id, Vote.election_id, Vote.candidate_id, Vote.timestamp,
+                                     Vote.rankings).filter(Vote.election_id == election.id).order_by(
+                Vote.id).execution_options(yield_per=chunk_size)
+        chunk = []
+        for vote in votes:
+            chunk.append({'voter_id': vote.voter_id, 'election_id': vote.election_id,
+                          'candidate_id': vote.candidate_id, 'timestamp': vote.timestamp,
+                          'rankings': vote.rankings})
+            if len(chunk) == chunk_size:
+                append_audit_entries(chunk)
+                added += len(chunk)
+                chunk = []
+        append_audit_entries(chunk)
+        added += len(chunk)
+        db.session.commit()
+    return added
+
+
+# ==================== Candidate Photos ====================
+# Uploads are resized once into THUMBNAIL_SIZES and stored in the database
+# (durable on serverless); served thumbnails are also cached on local disk.
+
+def store_candidate_photo(upload):
+    """
+    Process an uploaded photo into thumbnails (deduplicated by content)
+
+    Returns:
+        The photo key; the caller commits
+
+    Raises:
+        PhotoError: if the file is too large or not an image
+    """
+    data = upload.read(app.config['CANDIDATE_PHOTO_MAX_BYTES'] + 1)
+    if len(data) > app.config['CANDIDATE_PHOTO_MAX_BYTES']:
+        raise PhotoError('Photo is too large')
+    key, thumbnails = make_thumbnails(data)
+    existing = set(db.session.scalars(select(CandidatePhoto.size).where(CandidatePhoto.photo_key == key)))
+    rows = [{'photo_key': key, 'size': size, 'data': jpeg}
+            for size, jpeg in thumbnails.items() if size not in existing]
+    if rows:
+        db.session.execute(insert(CandidatePhoto), rows)
+    return key
+
+
+def delete_unused_photos():
+    """Drop thumbnails no candidate refers to any more; the caller commits"""
+    used = select(Candidate.photo_key).where(Candidate.photo_key.isnot(None))
+    return _execute_delete(CandidatePhoto, CandidatePhoto.photo_key.notin_(used))
+
+
+def candidate_photo_path(key, size):
+    """Local cache file of a thumbnail, written from the database on first use"""
+    path = os.path.join(app.config.get('CANDIDATE_PHOTO_CACHE_DIR') or os.path.join(app.instance_path, 'photos'),
+                        f'{key}-{size}.jpg')
+    if not os.path.exists(path):
+        data = db.session.scalar(select(CandidatePhoto.data).where(
+            CandidatePhoto.photo_key == key, CandidatePhoto.size == size))
+        if data is None:
+            return None
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write-then-rename so concurrent requests never serve a partial file
+        temp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+    return path
+
+
+# ==================== Bulk Deletes ====================
+# Elections, candidates and voters are deleted with set-based DELETE ...
+# WHERE statements, children first, instead of loading every candidate and
+# vote into the session. ON DELETE CASCADE foreign keys back this up in the
+# database. Very large elections are deleted in batches by a background job.
+
+
+def _execute_delete(model, *criteria):
+    return db.session.execute(
+        delete(model).where(*criteria).execution_options(synchronize_session=False)).rowcount
+
+
+def delete_election_rows(election_id, college_code):
+    """Delete an election and everything that belongs to it; commits"""
+    if vote_router:
+        vote_router.delete_for_election(college_code, election_id)
+    _execute_delete(Vote, Vote.election_id == election_id)
+    _execute_delete(VoteRollup, VoteRollup.election_id == election_id)
+    _execute_delete(ResultSnapshot, ResultSnapshot.election_id == election_id)
+    _execute_delete(AuditTreeNode, AuditTreeNode.election_id == election_id)
+    _execute_delete(AuditEntry, AuditEntry.election_id == election_id)
+    _execute_delete(AuditTree, AuditTree.election_id == election_id)
+    _execute_delete(Candidate, Candidate.election_id == election_id)
+    _execute_delete(Election, Election.id == election_id)
+    delete_unused_photos()
+    db.session.commit()
+    if voted_index:
+        # Cleared in place (the id may be reused by a new election)
+        voted_index.rebuild(election_id)
+
+
+def _delete_batch(model, election_id, batch_size):
+    batch = select(model.id).where(model.election_id == election_id).limit(batch_size).scalar_subquery()
+    deleted = _execute_delete(model, model.id.in_(batch))
+    db.session.commit()
+    return deleted
+
+
+def delete_election_votes_batch(election_id, college_code, batch_size):
+    """Delete up to batch_size votes of an election in one short transaction"""
+    if vote_router:
+        return vote_router.delete_batch_for_election(college_code, election_id, batch_size)
+    return _delete_batch(Vote, election_id, batch_size)
+
+
+def delete_election_audit_batch(election_id, batch_size):
+    """Delete up to batch_size audit tree nodes or, once none are left, audit log entries"""
+    return (_delete_batch(AuditTreeNode, election_id, batch_size)
+            or _delete_batch(AuditEntry, election_id, batch_size))
+
+
+def start_election_deletion(election, total_votes):
+    """
+    Hide the election (status 'deleting') and delete its votes in batches
+    in a background job, then the election itself
+
+    Returns:
+        The job id
+    """
+    election.status = 'deleting'
+    db.session.commit()
+    return job_runner.submit('delete_election', {
+        'election_id': election.id, 'college_code': election.college_code, 'total_votes': total_votes,
+    }, created_by=current_user.id, college_code=election.college_code, title=f'Delete election "{election.title}"')
+
+
+# ==================== Background Jobs ====================
+# Long admin operations run through job_runner (jobs.py): the request stores
+# a job and returns its id, a worker thread runs it and records progress in
+# the jobs table, shown on /admin/jobs. Output files live in JOB_DIR.
+
+job_runner = JobRunner(app, db, Job, max_workers=app.config['JOB_WORKERS'],
+                       # Threads do not outlive the request on serverless platforms
+                       inline=app.config['DB_PROFILE'] == 'serverless',
+                       stale_after=app.config['JOB_STALE_SECONDS'])
+job_dir = app.config.get('JOB_DIR') or os.path.join(app.instance_path, 'jobs')
+
+# Rows per export query / import transaction
+JOB_CHUNK_SIZE = 1000
+
+
+def job_file(name):
+    os.makedirs(job_dir, exist_ok=True)
+    return os.path.join(job_dir, name)
+
+
+@job_runner.register('delete_election', 'Delete election', cancellable=False)
+def delete_election_job(ctx, election_id, college_code, total_votes):
+    # Not cancellable: deleted votes cannot be restored
+    batch_size = app.config['BULK_DELETE_BATCH_SIZE']
+    deleted = 0
+    while True:
+        count = delete_election_votes_batch(election_id, college_code, batch_size)
+        if not count:
+            break
+        deleted += count
+        ctx.progress(deleted, total_votes, f'{deleted} of {total_votes} votes deleted')
+    while delete_election_audit_batch(election_id, batch_size):
+        ctx.progress(deleted, total_votes, 'Deleting the audit log')
+    delete_election_rows(election_id, college_code)
+    return {'deleted_votes': deleted}
+
+
+def iter_export_votes(election):
+    """An election's votes in chunks, with voter and candidate attached"""
+    # The caller commits between chunks, so the election is not used afterwards
+    election_id, college_code = election.id, election.college_code
+    if vote_router:
+        rows = vote_router.election_votes(college_code, election_id)
+        for start in range(0, len(rows), JOB_CHUNK_SIZE):
+            yield _vote_views(rows[start:start + JOB_CHUNK_SIZE])
+        return
+    last_id = 0
+    while True:
+        # Keyset pagination: each chunk is one short indexed query
+        chunk = Vote.query.options(joinedload(Vote.voter), joinedload(Vote.candidate)).filter(
+            Vote.election_id == election_id, Vote.id > last_id).order_by(Vote.id).limit(JOB_CHUNK_SIZE).all()
+        if not chunk:
+            return
+        last_id = chunk[-1].id
+        yield chunk
+        db.session.expunge_all()
+
+
+@job_runner.register('export_votes', 'Export votes')
+def export_votes_job(ctx, election_id):
+    election = db.session.get(Election, election_id)
+    if election is None:
+        raise ValueError(f'Election {election_id} no longer exists')
+    total = count_election_votes(election)
+    name = f'job-{ctx.job_id}-election-{election_id}-votes.csv'
+    path = job_file(name)
+    written = 0
+    try:
+        with open(f'{path}.tmp', 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(['vote_id', 'voter_id', 'voter_name', 'voter_email', 'candidate', 'timestamp'])
+            for chunk in iter_export_votes(election):
+                writer.writerows([
+                    vote.id,
+                    vote.voter.voter_id if vote.voter else '',
+                    vote.voter.name if vote.voter else '',
+                    vote.voter.email if vote.voter else '',
+                    vote.candidate.name if vote.candidate else '',
+                    vote.timestamp.isoformat() if vote.timestamp else '',
+                ] for vote in chunk)
+                written += len(chunk)
+                ctx.progress(written, total, f'{written} of {total} votes written')
+        os.replace(f'{path}.tmp', path)
+    finally:
+        if os.path.exists(f'{path}.tmp'):
+            os.remove(f'{path}.tmp')
+    return {'file': name, 'rows': written}
+
+
+@job_runner.register('import_voters', 'Import voters')
+def import_voters_job(ctx, upload, college_code):
+    """
+    Register voters from an uploaded CSV (voter_id, name, email, password)
+
+    Rows are validated like the registration form; duplicates and invalid
+    rows are skipped and reported. Each chunk is committed on its own, so a
+    cancelled import keeps the chunks already imported.
+    """
+    path = job_file(upload)
+    imported, skipped, errors = 0, 0, []
+    ctx.result = {'imported': 0, 'skipped': 0, 'errors': errors}
+    try:
+        with open(path, newline='', encoding='utf-8-sig') as f:
+            rows = list(csv.DictReader(f))
+        for start in range(0, len(rows), JOB_CHUNK_SIZE):
+            chunk = []
+            # Batch validation checks the repeated college code once per chunk
+            validated = validate_batch(VOTER_REGISTRATION_SCHEMA, [
+                {key: (row.get(key) or '') for key in ('voter_id', 'name', 'email', 'password')}
+                | {'college_code': college_code}
+                for row in rows[start:start + JOB_CHUNK_SIZE]])
+            for line, (form, row_errors) in enumerate(validated, start=start + 2):
+                if row_errors:
+                    skipped += 1
+                    errors.append(f'Line {line}: {row_errors[0]}')
+                else:
+                    chunk.append((line, form))
+            voter_ids = {form['voter_id'] for _, form in chunk}
+            emails = {form['email'] for _, form in chunk}
+            taken_ids = set(db.session.scalars(select(Voter.voter_id).where(Voter.voter_id.in_(voter_ids))))
+            taken_emails = set(db.session.scalars(select(Voter.email).where(Voter.email.in_(emails))))
+            added = []
+            for line, form in chunk:
+                if form['voter_id'] in taken_ids or form['email'] in taken_emails:
+                    skipped += 1
+                    errors.append(f"Line {line}: voter ID or email already registered")
+                    continue
+                taken_ids.add(form['voter_id'])
+                taken_emails.add(form['email'])
+                voter = Voter(voter_id=form['voter_id'], name=form['name'], email=form['email'],
+                              college_code=college_code)
+                voter.set_password(form['password'])
+                db.session.add(voter)
+                added.append(voter)
+            try:
+                db.session.commit()
+            except IntegrityError:
+                # Some were registered meanwhile: retry one by one
+                db.session.rollback()
+                for voter in list(added):
+                    db.session.add(voter)
+                    try:
+                        db.session.commit()
+                    except IntegrityError:
+                        db.session.rollback()
+                        added.remove(voter)
+                        skipped += 1
+                        errors.append(f'Voter ID {voter.voter_id}: voter ID or email already registered')
+            imported += len(added)
+            if voter_filter:
+                for voter in added:
+                    voter_filter.add(voter.voter_id, voter.email)
+            del errors[100:]
+            ctx.result = {'imported': imported, 'skipped': skipped, 'errors': errors}
+            ctx.progress(start + JOB_CHUNK_SIZE, len(rows), f'{imported} imported, {skipped} skipped', force=True)
+    finally:
+        invalidate_voter_count(college_code)
+        os.remove(path)
+    return ctx.result
+
+
+@job_runner.register('reconcile_tallies', 'Reconcile tallies')
+def reconcile_tallies_job(ctx, college_code=None, election_id=None):
+    """
+    Recount elections from the stored votes and compare with the turnout
+    rollups (rebuilt on mismatch), the audit log and result snapshots;
+    pending audit entries are hashed into the Merkle trees and completed
+    elections without a snapshot are finalized
+    """
+    query = Election.query.filter(Election.status != 'deleting')
+    if election_id:
+        query = query.filter(Election.id == election_id)
+    elif college_code:
+        query = query.filter(Election.college_code == college_code)
+    elections = query.order_by(Election.id).all()
+    issues, repaired = [], []
+    for done, election in enumerate(elections):
+        counts = get_vote_counts(election)
+        rolled_up = dict(db.session.query(VoteRollup.candidate_id, db.func.sum(VoteRollup.votes)).filter(
+            VoteRollup.election_id == election.id, VoteRollup.granularity == GRANULARITIES[0]).group_by(
+            VoteRollup.candidate_id).all())
+        if {k: v for k, v in rolled_up.items() if v} != {k: v for k, v in counts.items() if v}:
+            issues.append(f'Election {election.id}: turnout rollups differ from the votes (rebuilt)')
+            backfill_vote_rollups([election])
+            repaired.append(election.id)
+        audited = db.session.query(db.func.count(AuditEntry.id)).filter(
+            AuditEntry.election_id == election.id).scalar()
+        if audited != sum(counts.values()):
+            issues.append(f'Election {election.id}: {audited} audit log entries for {sum(counts.values())} votes')
+        build_audit_tree(election.id)
+        if election.result_snapshot is not None:
+            issues.extend(f'Election {election.id}: {problem}'
+                          for problem in verify_result_snapshot(election.result_snapshot))
+        else:
+            election.update_status()
+            finalize_completed_elections([election])
+        db.session.commit()
+        ctx.progress(done + 1, len(elections), f'{done + 1} of {len(elections)} elections checked')
+    return {'checked': len(elections), 'issues': issues, 'repaired': repaired}
+
+
+@job_runner.register('generate_test_data', 'Generate test data')
+def generate_test_data_job(ctx, college_code, voters, vote_share=0.7):
+    """
+    Register `voters` test voters (password "password123") and let a
+    vote_share of them vote at random in the college's active elections
+    """
+    password_hash = generate_password_hash('password123')  # hashed once for all test voters
+    prefix = f'T{ctx.job_id}-'
+    elections = Election.query.filter_by(college_code=college_code, status='active').all()
+    candidates = {e.id: [c.id for c in Candidate.query.filter_by(election_id=e.id)] for e in elections}
+    rng = secrets.SystemRandom()
+    created = votes = 0
+    for start in range(0, voters, JOB_CHUNK_SIZE):
+        rows = [{'voter_id': f'{prefix}{n}', 'name': f'Test Voter {n}', 'email': f'test{ctx.job_id}.{n}@example.com',
+                 'password_hash': password_hash, 'college_code': college_code, 'created_at': datetime.now()}
+                for n in range(start, min(start + JOB_CHUNK_SIZE, voters))]
+        db.session.execute(insert(Voter), rows)
+        db.session.commit()
+        if voter_filter:
+            for row in rows:
+                voter_filter.add(row['voter_id'], row['email'])
+        created += len(rows)
+        ids = db.session.scalars(select(Voter.id).where(Voter.voter_id.in_([row['voter_id'] for row in rows]))).all()
+        entries = [{'college_code': college_code, 'voter_id': voter_id, 'election_id': election_id,
+                    'candidate_id': rng.choice(candidates[election_id]), 'timestamp': datetime.now(),
+                    'rankings': None, 'nonce': new_nonce()}
+                   for election_id in candidates if candidates[election_id]
+                   for voter_id in ids if rng.random() < vote_share]
+        if entries:
+            votes += store_vote_batch(entries)
+        ctx.progress(created, voters, f'{created} voters, {votes} votes')
+    invalidate_voter_count(college_code)
+    return {'voters': created, 'votes': votes}
+
+
+def can_access_job(job):
+    return current_user.is_super_admin() or job.college_code == current_user.college_code
 
 
 @login_manager.user_loader
@@ -236,6 +1779,9 @@ password_reset_tokens = {}
 
 def send_admin_access_email(email, token, base_url):
     """Send admin access link via email"""
+    import smtplib
+    from email.mime.text import MIMEText
+    from email.mime.multipart import MIMEMultipart
     try:
         access_link = f"{base_url}/admin/verify/{token}"
         
@@ -273,13 +1819,16 @@ def send_admin_access_email(email, token, base_url):
         server.send_message(msg)
         server.quit()
         return True
-    except Exception as e:
-        print(f"Email error: {e}")
+    except Exception:
+        app.logger.exception('Could not send email to %s', email, extra={'event': 'email_failed'})
         return False
 
 
 def send_password_reset_email(email, token, base_url):
     """Send password reset link via email"""
+    import smtplib
+    from email.mime.text import MIMEText
+    from email.mime.multipart import MIMEMultipart
     try:
         reset_link = f"{base_url}/voter/reset-password/{token}"
         
@@ -317,11 +1866,40 @@ def send_password_reset_email(email, token, base_url):
         server.send_message(msg)
         server.quit()
         return True
-    except Exception as e:
-        print(f"Email error: {e}")
+    except Exception:
+        app.logger.exception('Could not send email to %s', email, extra={'event': 'email_failed'})
         return False
 
 
+@app.route('/assets/<path:filename>')
+def serve_asset(filename):
+    """Fingerprinted static file, precompressed variant if the client accepts it"""
+    resolved = app.extensions['assets'].resolve(filename, request.accept_encodings)
+    if resolved is None:
+        return 'Not Found', 404
+    path, mimetype, encoding = resolved
+    response = send_from_directory(app.extensions['assets'].build_dir, path, mimetype=mimetype,
+                                   max_age=31536000, conditional=True)
+    response.cache_control.immutable = True
+    response.cache_control.public = True
+    response.vary.add('Accept-Encoding')
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    return response
+
+
+@app.route('/photos/<key>/<int:size>.jpg')
+def candidate_photo(key, size):
+    """Candidate thumbnail; the URL is content-addressed, so it is cached for good"""
+    path = candidate_photo_path(key, size) if size in THUMBNAIL_SIZES and key.isalnum() else None
+    if path is None:
+        return 'Not Found', 404
+    response = send_file(path, mimetype='image/jpeg', etag=f'{key}-{size}', max_age=31536000, conditional=True)
+    response.cache_control.immutable = True
+    response.cache_control.public = True
+    return response
+
+
 @app.route('/admin', methods=['GET', 'POST'])
 def admin_email_verify():
     """Admin access - require email verification first"""
@@ -417,6 +1995,13 @@ def login():
         password = request.form.get('password')
         college_code = request.form.get('college_code', '').strip()
         
+        # Locked accounts are refused before the lookup and password hash
+        account = ('admin', college_code, username or '')
+        locked = login_throttle.locked_for(*account)
+        if locked:
+            flash(f'Too many failed login attempts. Try again in {locked} seconds.', 'danger')
+            return render_template('admin/login.html'), 429
+        
         # Super admin login (no college code)
         if not college_code:
             admin = Admin.query.filter_by(username=username, college_code=None).first()
@@ -425,10 +2010,12 @@ def login():
             admin = Admin.query.filter_by(username=username, college_code=college_code).first()
         
         if admin and admin.check_password(password):
+            login_throttle.record_success(*account)
             login_user(admin)
             flash('Login successful!', 'success')
             return redirect(url_for('admin_dashboard'))
         else:
+            login_throttle.record_failure(*account)
             flash('Invalid credentials or college code', 'danger')
     
     return render_template('admin/login.html')
@@ -455,19 +2042,19 @@ def admin_dashboard():
     for election in elections:
         election.update_status()
     db.session.commit()
+    finalize_completed_elections(elections)
     
     if current_user.is_super_admin():
         total_elections = Election.query.count()
         total_candidates = Candidate.query.count()
         total_voters = Voter.query.count()
-        total_votes = Vote.query.count()
+        total_votes = count_votes()
     else:
         total_elections = Election.query.filter_by(college_code=current_user.college_code).count()
         total_candidates = db.session.query(Candidate).join(Election).filter(
             Election.college_code == current_user.college_code).count()
         total_voters = Voter.query.filter_by(college_code=current_user.college_code).count()
-        total_votes = db.session.query(Vote).join(Election).filter(
-            Election.college_code == current_user.college_code).count()
+        total_votes = count_votes(current_user.college_code)
     
     return render_template('admin/dashboard.html', 
                          elections=elections,
@@ -482,13 +2069,24 @@ def admin_dashboard():
 def manage_elections():
     if current_user.is_super_admin():
         elections = Election.query.all()
-        colleges = College.query.all()
+        colleges = college_registry.all()
     else:
         elections = Election.query.filter_by(college_code=current_user.college_code).all()
         colleges = []
     return render_template('admin/elections.html', elections=elections, colleges=colleges)
 
 
+def get_voting_method_form():
+    """Read voting method and seat count from the election form"""
+    voting_method = request.form.get('voting_method', 'plurality')
+    if voting_method not in VOTING_METHODS:
+        voting_method = 'plurality'
+    seats = request.form.get('seats', 1, type=int) or 1
+    if voting_method != 'stv':
+        seats = 1
+    return voting_method, max(seats, 1)
+
+
 @app.route('/admin/elections/add', methods=['GET', 'POST'])
 @login_required
 def add_election():
@@ -497,10 +2095,14 @@ def add_election():
         description = request.form.get('description')
         start_date = datetime.strptime(request.form.get('start_date'), '%Y-%m-%dT%H:%M')
         end_date = datetime.strptime(request.form.get('end_date'), '%Y-%m-%dT%H:%M')
+        voting_method, seats = get_voting_method_form()
         
         # Super admin can select college, teachers use their own college
         if current_user.is_super_admin():
             college_code = request.form.get('college_code')
+            if not college_registry.get(college_code):
+                flash('Invalid college code!', 'danger')
+                return redirect(url_for('add_election'))
         else:
             college_code = current_user.college_code
         
@@ -510,6 +2112,8 @@ def add_election():
             start_date=start_date,
             end_date=end_date,
             college_code=college_code,
+            voting_method=voting_method,
+            seats=seats,
             created_by=current_user.id
         )
         election.update_status()
@@ -520,8 +2124,8 @@ def add_election():
         return redirect(url_for('manage_elections'))
     
     # Get colleges for super admin
-    colleges = College.query.all() if current_user.is_super_admin() else []
-    return render_template('admin/add_election.html', colleges=colleges)
+    colleges = college_registry.all() if current_user.is_super_admin() else []
+    return render_template('admin/add_election.html', colleges=colleges, voting_methods=VOTING_METHODS)
 
 
 @app.route('/admin/elections/<int:election_id>/edit', methods=['GET', 'POST'])
@@ -534,25 +2138,57 @@ def edit_election(election_id):
         election.description = request.form.get('description')
         election.start_date = datetime.strptime(request.form.get('start_date'), '%Y-%m-%dT%H:%M')
         election.end_date = datetime.strptime(request.form.get('end_date'), '%Y-%m-%dT%H:%M')
+        election.voting_method, election.seats = get_voting_method_form()
         election.update_status()
+        # Dates or counting method changed: the results are recounted (and,
+        # if the election is still completed, re-finalized by the admin pages
+        # or the reconciliation job)
+        election.result_snapshot = None
         
         db.session.commit()
         flash('Election updated successfully!', 'success')
         return redirect(url_for('manage_elections'))
     
-    return render_template('admin/edit_election.html', election=election)
+    return render_template('admin/edit_election.html', election=election, voting_methods=VOTING_METHODS)
 
 
 @app.route('/admin/elections/<int:election_id>/delete', methods=['POST'])
 @login_required
 def delete_election(election_id):
     election = Election.query.get_or_404(election_id)
-    db.session.delete(election)
-    db.session.commit()
+    if election.status == 'deleting':
+        flash('This election is already being deleted.', 'info')
+        return redirect(url_for('manage_elections'))
+    
+    total_votes = count_election_votes(election)
+    # Background threads do not outlive the request on serverless platforms
+    if (total_votes >= app.config['BULK_DELETE_ASYNC_THRESHOLD']
+            and app.config['DB_PROFILE'] != 'serverless'):
+        job_id = start_election_deletion(election, total_votes)
+        flash(f'Deleting election with {total_votes} votes in the background (job #{job_id}).', 'info')
+        return redirect(url_for('manage_jobs'))
+    
+    delete_election_rows(election.id, election.college_code)
     flash('Election deleted successfully!', 'success')
     return redirect(url_for('manage_elections'))
 
 
+@app.route('/admin/elections/<int:election_id>/delete/progress')
+@login_required
+def election_deletion_progress(election_id):
+    """Progress of a background election deletion as JSON"""
+    for job in Job.query.filter_by(kind='delete_election').order_by(Job.id.desc()).limit(50):
+        if json.loads(job.params).get('election_id') == election_id and can_access_job(job):
+            return jsonify(dict(job.to_dict(), election_id=election_id))
+    election = db.session.get(Election, election_id)
+    if election is None:
+        return jsonify({'election_id': election_id, 'state': 'done'})
+    if election.status != 'deleting':
+        return jsonify({'error': 'Election is not being deleted'}), 404
+    return jsonify({'election_id': election_id, 'state': 'running',
+                    'remaining_votes': count_election_votes(election)})
+
+
 @app.route('/admin/elections/<int:election_id>/candidates')
 @login_required
 def manage_candidates(election_id):
@@ -571,11 +2207,21 @@ def add_candidate(election_id):
         description = request.form.get('description')
         photo_url = request.form.get('photo_url')
         
+        photo_key = None
+        upload = request.files.get('photo')
+        if upload and upload.filename:
+            try:
+                photo_key = store_candidate_photo(upload)
+            except PhotoError as e:
+                flash(str(e), 'danger')
+                return redirect(url_for('add_candidate', election_id=election_id))
+        
         candidate = Candidate(
             name=name,
             party=party,
             description=description,
             photo_url=photo_url,
+            photo_key=photo_key,
             election_id=election_id
         )
         
@@ -598,6 +2244,20 @@ def edit_candidate(candidate_id):
         candidate.description = request.form.get('description')
         candidate.photo_url = request.form.get('photo_url')
         
+        upload = request.files.get('photo')
+        if upload and upload.filename:
+            try:
+                candidate.photo_key = store_candidate_photo(upload)
+            except PhotoError as e:
+                db.session.rollback()
+                flash(str(e), 'danger')
+                return redirect(url_for('edit_candidate', candidate_id=candidate_id))
+        elif request.form.get('remove_photo'):
+            candidate.photo_key = None
+        
+        db.session.flush()
+        # The replaced photo may now be unused
+        delete_unused_photos()
         db.session.commit()
         flash('Candidate updated successfully!', 'success')
         return redirect(url_for('manage_candidates', election_id=candidate.election_id))
@@ -610,7 +2270,9 @@ def edit_candidate(candidate_id):
 def delete_candidate(candidate_id):
     candidate = Candidate.query.get_or_404(candidate_id)
     election_id = candidate.election_id
-    db.session.delete(candidate)
+    delete_votes_for_candidate(candidate)
+    _execute_delete(Candidate, Candidate.id == candidate.id)
+    delete_unused_photos()
     db.session.commit()
     flash('Candidate deleted successfully!', 'success')
     return redirect(url_for('manage_candidates', election_id=election_id))
@@ -620,89 +2282,149 @@ def delete_candidate(candidate_id):
 @login_required
 def view_results(election_id):
     election = Election.query.get_or_404(election_id)
-    candidates = Candidate.query.filter_by(election_id=election_id).all()
-    
-    results = []
-    for candidate in candidates:
-        results.append({
-            'id': candidate.id,
-            'name': candidate.name,
-            'party': candidate.party,
-            'votes': candidate.get_vote_count()
-        })
-    
-    total_votes = sum(r['votes'] for r in results)
+    # Completed elections are served from their stored snapshot
+    payload, snapshot = get_result_payload(election, finalize=True)
     
-    # Get detailed vote information (who voted for whom) - for admin and teachers only
-    detailed_votes = []
-    votes = Vote.query.filter_by(election_id=election_id).all()
-    for vote in votes:
-        detailed_votes.append({
-            'voter_name': vote.voter.name,
-            'voter_id': vote.voter.voter_id,
-            'candidate_name': vote.candidate.name,
-            'timestamp': vote.timestamp
-        })
+    # Detailed vote information (who voted for whom) - for admin and teachers only
+    detailed_votes = [dict(vote, timestamp=datetime.fromisoformat(vote['timestamp']))
+                      for vote in payload['detailed_votes']]
     
     return render_template('admin/results.html', 
                          election=election, 
-                         results=results,
-                         total_votes=total_votes,
+                         results=payload['results'],
+                         total_votes=payload['total_votes'],
+                         ranked=payload['ranked'],
+                         snapshot=snapshot,
                          detailed_votes=detailed_votes)
 
 
+@app.route('/admin/elections/<int:election_id>/results/verify', methods=['POST'])
+@login_required
+def verify_results(election_id):
+    """Recount a completed election and compare it with its stored snapshot"""
+    election = Election.query.get_or_404(election_id)
+    if election.result_snapshot is None:
+        flash('This election has no result snapshot yet.', 'warning')
+        return redirect(url_for('view_results', election_id=election_id))
+    problems = verify_result_snapshot(election.result_snapshot)
+    if problems:
+        flash('Result snapshot verification FAILED: ' + '; '.join(problems), 'danger')
+    else:
+        flash('Result snapshot verified: checksum intact and recount matches.', 'success')
+    return redirect(url_for('view_results', election_id=election_id))
+
+
 @app.route('/api/elections/<int:election_id>/results')
 def api_results(election_id):
     election = Election.query.get_or_404(election_id)
-    candidates = Candidate.query.filter_by(election_id=election_id).all()
-    
-    results = []
-    for candidate in candidates:
-        results.append({
-            'id': candidate.id,
-            'name': candidate.name,
-            'party': candidate.party,
-            'votes': candidate.get_vote_count()
-        })
-    
-    return jsonify(results)
+    payload, _ = get_result_payload(election)
+    results = payload['results']
+    ranked = payload['ranked']
+    if not ranked:
+        return jsonify(results)
+    return jsonify({
+        'results': results,
+        'method': ranked['method'],
+        'seats': ranked['seats'],
+        'quota': ranked['quota'],
+        'winners': ranked['winners'],
+        'rounds': ranked['rounds']
+    })
+
+
+@app.route('/admin/elections/<int:election_id>/export', methods=['POST'])
+@login_required
+def export_election_votes(election_id):
+    """Write the election's votes to a CSV file in a background job"""
+    election = Election.query.get_or_404(election_id)
+    if not current_user.is_super_admin() and election.college_code != current_user.college_code:
+        flash('Access denied!', 'danger')
+        return redirect(url_for('view_results', election_id=election_id))
+    job_id = job_runner.submit('export_votes', {'election_id': election.id}, created_by=current_user.id,
+                               college_code=election.college_code, title=f'Export votes of "{election.title}"')
+    flash(f'Export started (job #{job_id}). The CSV can be downloaded here when it is done.', 'info')
+    return redirect(url_for('manage_jobs'))
+
+
+@app.route('/api/receipts/<receipt>')
+def verify_receipt(receipt):
+    """Merkle inclusion proof of a voter's receipt against the election's audit root"""
+    proof = get_receipt_proof(receipt.lower())
+    if proof is None:
+        return jsonify({'error': 'Unknown receipt'}), 404
+    return jsonify(proof)
+
+
+@app.route('/api/elections/<int:election_id>/audit')
+def election_audit_root(election_id):
+    """Audit log size and Merkle root of an election, as of its last hashed batch"""
+    election = Election.query.get_or_404(election_id)
+    tree = AuditTree.query.filter_by(election_id=election.id).first()
+    return jsonify({
+        'election_id': election.id,
+        'tree_size': tree.size if tree else 0,
+        'root': tree.root if tree else None,
+    })
+
+
+@app.route('/api/elections/<int:election_id>/turnout')
+def api_turnout(election_id):
+    election = Election.query.get_or_404(election_id)
+    return jsonify(get_election_turnout(election))
+
+
+@app.route('/admin/turnout')
+@login_required
+def college_turnout():
+    """Turnout of the admin's college (super admins: ?college_code=, default all colleges)"""
+    if current_user.is_super_admin():
+        codes = [request.args['college_code']] if request.args.get('college_code') else college_registry.codes()
+    else:
+        codes = [current_user.college_code]
+    return jsonify([get_college_turnout(code) for code in codes])
+
+
+@app.route('/admin/elections/<int:election_id>/timeline')
+@login_required
+def election_timeline(election_id):
+    """Turnout over time (?granularity=minute|hour) as chart-ready JSON"""
+    election = Election.query.get_or_404(election_id)
+    if not current_user.is_super_admin() and election.college_code != current_user.college_code:
+        return jsonify({'error': 'Access denied'}), 403
+    granularity = request.args.get('granularity', 'minute')
+    if granularity not in GRANULARITIES:
+        return jsonify({'error': f'granularity must be one of {", ".join(GRANULARITIES)}'}), 400
+    return jsonify(get_election_timeline(election, granularity))
 
 
 @app.route('/voter/register', methods=['GET', 'POST'])
 @limiter.limit("10 per hour", error_message="Too many registration attempts. Please try again later.")
 def voter_register():
     if request.method == 'POST':
-        voter_id = sanitize_input(request.form.get('voter_id'))
-        name = sanitize_input(request.form.get('name'))
-        email = request.form.get('email', '').strip().lower()
-        password = request.form.get('password')
-        college_code = sanitize_input(request.form.get('college_code'))
-        
-        # Validate password strength
-        is_strong, password_error = is_strong_password(password)
-        if not is_strong:
-            flash(password_error, 'danger')
-            return redirect(url_for('voter_register'))
-        
-        # Validate email format and check for disposable emails
-        is_valid, email_error = is_valid_email(email)
-        if not is_valid:
-            flash(email_error, 'danger')
+        # Sanitize and validate all fields (password strength, email format,
+        # disposable domains, lengths) in one schema-driven pass
+        form, errors = validate_form(VOTER_REGISTRATION_SCHEMA, request.form)
+        if errors:
+            flash(errors[0], 'danger')
             return redirect(url_for('voter_register'))
+        voter_id, name, email = form['voter_id'], form['name'], form['email']
+        password, college_code = form['password'], form['college_code']
         
         # Check if college exists
-        college = College.query.filter_by(college_code=college_code).first()
-        if not college:
+        if not college_registry.get(college_code):
             flash('Invalid college code!', 'danger')
             return redirect(url_for('voter_register'))
         
+        # Voter IDs and emails the filter has never seen skip their query
+        id_taken, email_taken = voter_filter.may_exist(voter_id, email) if voter_filter else (True, True)
+        
         # Check if voter ID already exists (globally unique)
-        if Voter.query.filter_by(voter_id=voter_id).first():
+        if id_taken and Voter.query.filter_by(voter_id=voter_id).first():
             flash('Voter ID already exists! Please use a different Voter ID.', 'danger')
             return redirect(url_for('voter_register'))
         
         # Check if email already exists
-        if Voter.query.filter_by(email=email).first():
+        if email_taken and Voter.query.filter_by(email=email).first():
             flash('Email already registered! Please use a different email or login.', 'danger')
             return redirect(url_for('voter_register'))
         
@@ -710,7 +2432,19 @@ def voter_register():
         voter.set_password(password)
         
         db.session.add(voter)
-        db.session.commit()
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # Registered concurrently (or through a worker whose filter
+            # was not yet synced): the unique indexes have the final say
+            db.session.rollback()
+            if voter_filter:
+                voter_filter.add(voter_id, email)
+            flash('Voter ID or email already registered! Please use different details or login.', 'danger')
+            return redirect(url_for('voter_register'))
+        if voter_filter:
+            voter_filter.add(voter_id, email)
+        invalidate_voter_count(college_code)
         flash('Registration successful! Please login to vote.', 'success')
         return redirect(url_for('voter_login'))
     
@@ -721,17 +2455,25 @@ def voter_register():
 @limiter.limit("5 per minute", error_message="Too many login attempts. Please wait a minute.")
 def voter_login():
     if request.method == 'POST':
-        voter_id = sanitize_input(request.form.get('voter_id'))
-        password = request.form.get('password')
-        college_code = sanitize_input(request.form.get('college_code'))
+        form, _ = validate_form(VOTER_LOGIN_SCHEMA, request.form)
+        voter_id, password, college_code = form['voter_id'], form['password'], form['college_code']
+        
+        # Locked accounts are refused before the lookup and password hash
+        account = ('voter', college_code, voter_id)
+        locked = login_throttle.locked_for(*account)
+        if locked:
+            flash(f'Too many failed login attempts. Try again in {locked} seconds.', 'danger')
+            return render_template('voter/login.html'), 429
         
         voter = Voter.query.filter_by(voter_id=voter_id, college_code=college_code).first()
         
         if voter and voter.check_password(password):
+            login_throttle.record_success(*account)
             session['voter_id'] = voter.id
             flash('Login successful!', 'success')
             return redirect(url_for('voter_dashboard'))
         else:
+            login_throttle.record_failure(*account)
             flash('Invalid voter ID, password, or college code', 'danger')
     
     return render_template('voter/login.html')
@@ -829,8 +2571,9 @@ def voter_dashboard():
         status='active', 
         college_code=voter.college_code
     ).all()
+    votes_cast = count_votes_cast(voter)
     
-    return render_template('voter/dashboard.html', voter=voter, elections=elections)
+    return render_template('voter/dashboard.html', voter=voter, elections=elections, votes_cast=votes_cast)
 
 
 @app.route('/voter/logout')
@@ -840,6 +2583,34 @@ def voter_logout():
     return redirect(url_for('index'))
 
 
+def parse_ranked_ballot(candidates, form):
+    """
+    Turn the rank_<candidate_id> fields of a ranked ballot into an ordered
+    list of candidate ids
+
+    Args:
+        form: Any mapping of field names to strings (werkzeug and Starlette
+            form data both work)
+
+    Returns:
+        Tuple (rankings, error_message or None)
+    """
+    ranks = {}
+    for candidate in candidates:
+        try:
+            rank = int(form.get(f'rank_{candidate.id}') or 0)
+        except ValueError:
+            # Ignored like an empty field (werkzeug's get(type=int) behaviour)
+            rank = 0
+        if rank:
+            if rank in ranks:
+                return None, 'Each rank can only be given to one candidate!'
+            ranks[rank] = candidate.id
+    if not ranks:
+        return None, 'Please rank at least one candidate!'
+    return [ranks[rank] for rank in sorted(ranks)], None
+
+
 @app.route('/voter/vote/<int:election_id>', methods=['GET', 'POST'])
 def vote(election_id):
     if 'voter_id' not in session:
@@ -849,6 +2620,14 @@ def vote(election_id):
     voter = Voter.query.get(session['voter_id'])
     election = Election.query.get_or_404(election_id)
     
+    # Votes are stored with the election's college, so voters may only vote there
+    if election.college_code != voter.college_code:
+        flash('This election is not available for your college!', 'danger')
+        return redirect(url_for('voter_dashboard'))
+    
+    # The stored status is only refreshed on some pages; never accept a vote
+    # after the end date (the results may already be finalized)
+    election.update_status()
     if election.status != 'active':
         flash('This election is not currently active!', 'warning')
         return redirect(url_for('voter_dashboard'))
@@ -858,17 +2637,29 @@ def vote(election_id):
         return redirect(url_for('voter_dashboard'))
     
     if request.method == 'POST':
-        candidate_id = request.form.get('candidate_id')
-        
-        vote = Vote(
-            voter_id=voter.id,
-            election_id=election_id,
-            candidate_id=candidate_id
-        )
+        rankings = None
+        if election.is_ranked:
+            rankings, error = parse_ranked_ballot(
+                Candidate.query.filter_by(election_id=election_id).all(), request.form)
+            if error:
+                flash(error, 'danger')
+                return redirect(url_for('vote', election_id=election_id))
+            candidate_id = rankings[0]
+        else:
+            candidate_id = request.form.get('candidate_id', type=int)
+            if not Candidate.query.filter_by(id=candidate_id, election_id=election_id).first():
+                flash('Please select a valid candidate!', 'danger')
+                return redirect(url_for('vote', election_id=election_id))
         
-        db.session.add(vote)
-        db.session.commit()
+        receipt = record_vote(voter, election, candidate_id, rankings)
+        if not receipt:
+            flash('You have already voted in this election!', 'warning')
+            return redirect(url_for('voter_dashboard'))
+        app.logger.info('Vote recorded', extra={'event': 'vote_recorded', 'election_id': election_id,
+                                                'voter_id': voter.id})
         flash('Your vote has been recorded successfully!', 'success')
+        flash(f'Your vote receipt: {receipt} (keep it to verify your vote at '
+              f'{url_for("verify_receipt", receipt=receipt)})', 'info')
         return redirect(url_for('voter_dashboard'))
     
     candidates = Candidate.query.filter_by(election_id=election_id).all()
@@ -884,7 +2675,7 @@ def manage_colleges():
         flash('Access denied!', 'danger')
         return redirect(url_for('admin_dashboard'))
     
-    colleges = College.query.all()
+    colleges = college_registry.all()
     return render_template('admin/colleges.html', colleges=colleges)
 
 
@@ -898,13 +2689,14 @@ def add_college():
     college_code = request.form.get('college_code').strip().upper()
     college_name = request.form.get('college_name')
     
-    if College.query.filter_by(college_code=college_code).first():
+    if college_registry.get(college_code):
         flash('College code already exists!', 'danger')
         return redirect(url_for('manage_colleges'))
     
     college = College(college_code=college_code, college_name=college_name)
     db.session.add(college)
     db.session.commit()
+    college_registry.invalidate()
     flash(f'College {college_name} added successfully!', 'success')
     return redirect(url_for('manage_colleges'))
 
@@ -917,7 +2709,7 @@ def manage_teachers():
         return redirect(url_for('admin_dashboard'))
     
     teachers = Admin.query.filter_by(role='teacher').all()
-    colleges = College.query.all()
+    colleges = college_registry.all()
     return render_template('admin/teachers.html', teachers=teachers, colleges=colleges)
 
 
@@ -934,7 +2726,7 @@ def add_teacher():
     college_code = request.form.get('college_code')
     
     # Check if college exists
-    if not College.query.filter_by(college_code=college_code).first():
+    if not college_registry.get(college_code):
         flash('Invalid college code!', 'danger')
         return redirect(url_for('manage_teachers'))
     
@@ -959,15 +2751,16 @@ def add_teacher():
 def manage_voters():
     """View and manage registered voters"""
     if current_user.is_super_admin():
-        # Use joinedload for eager loading to avoid N+1 queries
-        voters = Voter.query.options(joinedload(Voter.votes)).order_by(Voter.created_at.desc()).all()
-        colleges = College.query.all()
+        voters = Voter.query.order_by(Voter.created_at.desc()).all()
+        colleges = college_registry.all()
+        vote_counts = get_votes_per_voter()
     else:
         # Teachers can only see voters from their college
-        voters = Voter.query.options(joinedload(Voter.votes)).filter_by(college_code=current_user.college_code).order_by(Voter.created_at.desc()).all()
+        voters = Voter.query.filter_by(college_code=current_user.college_code).order_by(Voter.created_at.desc()).all()
         colleges = []
+        vote_counts = get_votes_per_voter(current_user.college_code)
     
-    return render_template('admin/voters.html', voters=voters, colleges=colleges)
+    return render_template('admin/voters.html', voters=voters, colleges=colleges, vote_counts=vote_counts)
 
 
 @app.route('/admin/voters/<int:voter_id>/delete', methods=['POST'])
@@ -983,16 +2776,129 @@ def delete_voter(voter_id):
     
     voter_name = voter.name
     voter_email = voter.email
+    voter_code = voter.voter_id
+    voter_college = voter.college_code
     
-    # Delete associated votes first (cascade should handle this, but being explicit)
-    Vote.query.filter_by(voter_id=voter.id).delete()
+    # Delete associated votes first (routed to the voter's shard when sharding is on)
+    delete_votes_for_voter(voter)
     
-    db.session.delete(voter)
+    _execute_delete(Voter, Voter.id == voter.id)
     db.session.commit()
+    if voter_filter:
+        voter_filter.remove(voter_code, voter_email)
+    invalidate_voter_count(voter_college)
     flash(f'Voter "{voter_name}" ({voter_email}) deleted successfully!', 'success')
     return redirect(url_for('manage_voters'))
 
 
+@app.route('/admin/voters/import', methods=['POST'])
+@login_required
+def import_voters():
+    """Register voters from an uploaded CSV file in a background job"""
+    college_code = request.form.get('college_code') if current_user.is_super_admin() else current_user.college_code
+    if not college_registry.get(college_code):
+        flash('Invalid college code!', 'danger')
+        return redirect(url_for('manage_jobs'))
+    upload = request.files.get('file')
+    if not upload or not upload.filename:
+        flash('Choose a CSV file to import.', 'warning')
+        return redirect(url_for('manage_jobs'))
+    name = f'import-{secrets.token_hex(8)}.csv'
+    upload.save(job_file(name))
+    job_id = job_runner.submit('import_voters', {'upload': name, 'college_code': college_code},
+                               created_by=current_user.id, college_code=college_code,
+                               title=f'Import voters into {college_code} ({upload.filename[:100]})')
+    flash(f'Import started (job #{job_id}).', 'info')
+    return redirect(url_for('manage_jobs'))
+
+
+# ==================== Background Jobs ====================
+
+@app.route('/admin/jobs')
+@login_required
+def manage_jobs():
+    job_runner.expire_stale()
+    query = Job.query
+    if not current_user.is_super_admin():
+        query = query.filter_by(college_code=current_user.college_code)
+    jobs = query.order_by(Job.id.desc()).limit(100).all()
+    colleges = college_registry.all() if current_user.is_super_admin() else []
+    elections = Election.query.filter(Election.status != 'deleting')
+    if not current_user.is_super_admin():
+        elections = elections.filter_by(college_code=current_user.college_code)
+    return render_template('admin/jobs.html', jobs=jobs, colleges=colleges, elections=elections.all(),
+                           kinds=job_runner.kinds,
+                           active=any(job.status in ('queued', 'running', 'cancelling') for job in jobs))
+
+
+@app.route('/admin/jobs/<int:job_id>')
+@login_required
+def job_status(job_id):
+    job = Job.query.get_or_404(job_id)
+    if not can_access_job(job):
+        return jsonify({'error': 'Access denied'}), 403
+    return jsonify(job.to_dict())
+
+
+@app.route('/admin/jobs/<int:job_id>/cancel', methods=['POST'])
+@login_required
+def cancel_job(job_id):
+    job = Job.query.get_or_404(job_id)
+    if not can_access_job(job):
+        flash('Access denied!', 'danger')
+    elif job_runner.cancel(job.id):
+        flash(f'Cancelling job #{job.id}.', 'info')
+    else:
+        flash(f'Job #{job.id} cannot be cancelled.', 'warning')
+    return redirect(url_for('manage_jobs'))
+
+
+@app.route('/admin/jobs/<int:job_id>/download')
+@login_required
+def download_job_file(job_id):
+    job = Job.query.get_or_404(job_id)
+    result = job.result_data or {}
+    if not can_access_job(job) or job.status != 'done' or 'file' not in result:
+        return 'Not found', 404
+    return send_from_directory(job_dir, result['file'], as_attachment=True)
+
+
+@app.route('/admin/jobs/reconcile', methods=['POST'])
+@login_required
+def start_reconcile_job():
+    """Recount elections and check rollups, audit log and snapshots"""
+    election_id = request.form.get('election_id', type=int)
+    college_code = None if current_user.is_super_admin() else current_user.college_code
+    if election_id:
+        election = Election.query.get_or_404(election_id)
+        if college_code and election.college_code != college_code:
+            flash('Access denied!', 'danger')
+            return redirect(url_for('manage_jobs'))
+        college_code = election.college_code
+    job_id = job_runner.submit('reconcile_tallies', {'college_code': college_code, 'election_id': election_id},
+                               created_by=current_user.id, college_code=college_code)
+    flash(f'Reconciliation started (job #{job_id}).', 'info')
+    return redirect(url_for('manage_jobs'))
+
+
+@app.route('/admin/jobs/test-data', methods=['POST'])
+@login_required
+def start_test_data_job():
+    if not current_user.is_super_admin():
+        flash('Access denied! Super admin only.', 'danger')
+        return redirect(url_for('manage_jobs'))
+    college_code = request.form.get('college_code')
+    voters = request.form.get('voters', 1000, type=int) or 0
+    if not college_registry.get(college_code) or not 0 < voters <= 1000000:
+        flash('Choose a college and between 1 and 1,000,000 voters.', 'warning')
+        return redirect(url_for('manage_jobs'))
+    job_id = job_runner.submit('generate_test_data', {'college_code': college_code, 'voters': voters},
+                               created_by=current_user.id, college_code=college_code,
+                               title=f'Generate {voters} test voters in {college_code}')
+    flash(f'Test data generation started (job #{job_id}).', 'info')
+    return redirect(url_for('manage_jobs'))
+
+
 # ==================== Database Viewer ====================
 
 @app.route('/admin/database')
@@ -1008,7 +2914,7 @@ def view_database():
     voters = Voter.query.all()
     elections = Election.query.all()
     candidates = Candidate.query.all()
-    votes = Vote.query.all()
+    votes = get_all_votes()
     
     return render_template('admin/database.html',
                          colleges=colleges,
@@ -1019,11 +2925,245 @@ def view_database():
                          votes=votes)
 
 
+# ==================== Metrics ====================
+
+@app.route('/admin/metrics/pool')
+@login_required
+def pool_metrics_view():
+    """Connection pool telemetry (super admin only)"""
+    if not current_user.is_super_admin():
+        return jsonify({'error': 'Access denied'}), 403
+    
+    pool = db.engine.pool
+    stats = pool_metrics.snapshot()
+    stats.update({
+        'profile': app.config['DB_PROFILE'],
+        'pool_size': pool.size() if hasattr(pool, 'size') else None,
+        'checked_out': pool.checkedout() if hasattr(pool, 'checkedout') else None,
+        'overflow_in_use': max(pool.overflow(), 0) if hasattr(pool, 'overflow') else 0
+    })
+    return jsonify(stats)
+
+
+@app.route('/admin/metrics/logins')
+@login_required
+def login_metrics_view():
+    """Failed-login throttle counters (super admin only)"""
+    if not current_user.is_super_admin():
+        return jsonify({'error': 'Access denied'}), 403
+    
+    return jsonify(login_throttle.metrics())
+
+
+@app.route('/admin/metrics/validation')
+@login_required
+def validation_metrics_view():
+    """Email validation cache and blocklist statistics (super admin only)"""
+    if not current_user.is_super_admin():
+        return jsonify({'error': 'Access denied'}), 403
+    
+    return jsonify({
+        'email_cache': email_validation_cache.info(),
+        'blocklist': {
+            'domains': len(email_blocklist),
+            'memory_bytes': email_blocklist.memory_bytes(),
+            'loaded_at': datetime.fromtimestamp(email_blocklist.loaded_at).isoformat() if email_blocklist.loaded_at else None,
+            'path': email_blocklist.path
+        }
+    })
+
+
+# ==================== Profiler ====================
+# Super admins can cProfile the next requests to an endpoint or sample all
+# threads for a time window. Only the worker process that handles the admin
+# request is profiled; output files are stored under PROFILE_DIR.
+
+@app.route('/admin/profiler')
+@login_required
+def profiler_dashboard():
+    if not current_user.is_super_admin():
+        flash('Access denied! Super admin only.', 'danger')
+        return redirect(url_for('admin_dashboard'))
+    request_profiler = app.extensions['request_profiler']
+    return render_template('admin/profiler.html',
+                           endpoints=sorted(app.view_functions),
+                           armed=dict(request_profiler.armed),
+                           sampling=app.extensions['sampling_profiler'].current,
+                           profiles=list_profiles(request_profiler.output_dir),
+                           pid=os.getpid())
+
+
+@app.route('/admin/profiler/requests', methods=['POST'])
+@login_required
+def profile_requests():
+    """Arm cProfile for the next N requests to an endpoint"""
+    if not current_user.is_super_admin():
+        flash('Access denied! Super admin only.', 'danger')
+        return redirect(url_for('admin_dashboard'))
+    endpoint = request.form.get('endpoint', '')
+    count = request.form.get('count', 5, type=int) or 0
+    if endpoint not in app.view_functions:
+        flash('Unknown endpoint!', 'danger')
+    elif not 1 <= count <= app.config['PROFILE_MAX_REQUESTS']:
+        flash(f"Profile between 1 and {app.config['PROFILE_MAX_REQUESTS']} requests.", 'danger')
+    else:
+        app.extensions['request_profiler'].arm(endpoint, count)
+        flash(f'Profiling the next {count} requests to {endpoint} (worker {os.getpid()}).', 'success')
+    return redirect(url_for('profiler_dashboard'))
+
+
+@app.route('/admin/profiler/disarm', methods=['POST'])
+@login_required
+def disarm_profiler():
+    if not current_user.is_super_admin():
+        flash('Access denied! Super admin only.', 'danger')
+        return redirect(url_for('admin_dashboard'))
+    app.extensions['request_profiler'].disarm(request.form.get('endpoint') or None)
+    flash('Request profiling disarmed.', 'info')
+    return redirect(url_for('profiler_dashboard'))
+
+
+@app.route('/admin/profiler/sample', methods=['POST'])
+@login_required
+def start_sampling_profile():
+    """Sample every thread's stack for a time window (folded flame-graph output)"""
+    if not current_user.is_super_admin():
+        flash('Access denied! Super admin only.', 'danger')
+        return redirect(url_for('admin_dashboard'))
+    seconds = request.form.get('seconds', 10, type=int) or 0
+    interval_ms = request.form.get('interval_ms', 10, type=int) or 0
+    if not 1 <= seconds <= app.config['PROFILE_MAX_SECONDS'] or not 1 <= interval_ms <= 1000:
+        flash(f"Sample for 1-{app.config['PROFILE_MAX_SECONDS']} seconds every 1-1000 ms.", 'danger')
+        return redirect(url_for('profiler_dashboard'))
+    try:
+        path = app.extensions['sampling_profiler'].start(seconds, interval_ms / 1000)
+    except RuntimeError as e:
+        flash(str(e), 'warning')
+    else:
+        flash(f'Sampling worker {os.getpid()} for {seconds}s into {os.path.basename(path)}.', 'success')
+    return redirect(url_for('profiler_dashboard'))
+
+
+@app.route('/admin/profiler/files/<name>')
+@login_required
+def download_profile(name):
+    if not current_user.is_super_admin():
+        flash('Access denied! Super admin only.', 'danger')
+        return redirect(url_for('admin_dashboard'))
+    return send_from_directory(app.extensions['request_profiler'].output_dir, name, as_attachment=True)
+
+
+# ==================== Process Lifecycle ====================
+
+def warm_shared_state():
+    """
+    Build read-only state once in the gunicorn master so forked workers
+    share it copy-on-write instead of rebuilding it: compile every template
+    into the Jinja cache (and the on-disk bytecode cache).
+    """
+    for name in app.jinja_env.list_templates(extensions=['html']):
+        app.jinja_env.get_template(name)
+
+
+def warm_up_templates():
+    """
+    Render the critical voter pages once with sample data so the first real
+    request does not pay for template loading, compilation or first-render
+    setup. No database access: the sample objects are never persisted.
+    """
+    now = datetime.now()
+    election = Election(id=0, title='Warm-up', description='', status='active',
+                        start_date=now, end_date=now, college_code='')
+    candidate = Candidate(id=0, name='Warm-up', party='', description='', photo_url='', election_id=0)
+    voter = SimpleNamespace(id=0, name='Warm-up', voter_id='', has_voted=lambda election_id: False)
+    with app.test_request_context('/'):
+        render_template('index.html', elections=[election])
+        render_template('voter/dashboard.html', voter=voter, elections=[election], votes_cast=0)
+        render_template('voter/vote.html', election=election, candidates=[candidate])
+
+
+@app.cli.command('precompile-templates')
+def precompile_templates_command():
+    """Compile all templates into the bytecode cache (run at build/deploy time)"""
+    warm_shared_state()
+    print(f"Compiled {len(app.jinja_env.list_templates(extensions=['html']))} templates "
+          f"into {app.jinja_env.bytecode_cache.directory}")
+
+
+@app.cli.command('build-assets')
+def build_assets_command():
+    """Fingerprint and precompress static files (run at build/deploy time)"""
+    assets = app.extensions['assets']
+    written = assets.build()
+    print(f"{len(assets.manifest)} assets ({written} new) in {assets.build_dir}")
+
+
+@app.cli.command('rebuild-voted-index')
+def rebuild_voted_index_command():
+    """Reload every election's voted bitmap from the stored votes"""
+    if not voted_index:
+        print("VOTED_INDEX_DIR is not set")
+        return
+    with app.app_context():
+        for election in Election.query.all():
+            voted_index.rebuild(election.id)
+            print(f"Election {election.id}: {voted_index.count(election.id)} voters")
+
+
+@app.cli.command('backfill-rollups')
+def backfill_rollups_command():
+    """Rebuild the turnout timeline rollups from the stored votes"""
+    with app.app_context():
+        counted = backfill_vote_rollups()
+    print(f"Rebuilt turnout rollups from {counted} votes")
+
+
+@app.cli.command('build-audit-trees')
+def build_audit_trees_command():
+    """Hash pending vote audit log entries into every election's Merkle tree"""
+    with app.app_context():
+        for election in Election.query.all():
+            tree = build_audit_tree(election.id)
+            if tree:
+                print(f"Election {election.id}: {tree.size} leaves, root {tree.root}")
+
+
+def init_worker():
+    """
+    (Re)initialize per-process state: drop connections inherited through
+    fork and start background threads. Called from gunicorn's post_fork hook
+    when the app is preloaded, otherwise at import.
+    """
+    with app.app_context():
+        db.engine.dispose(close=False)
+        read_engine = app.extensions.get('sqlite_read_engine')
+        if read_engine is not None:
+            read_engine.dispose(close=False)
+    if vote_router:
+        vote_router.dispose(close=False)
+    if voted_index:
+        # flock needs per-process file descriptions
+        voted_index.reset()
+    login_throttle.reset()
+    app.extensions['log_pipeline'].start()
+    if vote_wal:
+        vote_wal.start()
+    if app.config['TEMPLATE_WARMUP']:
+        warm_up_templates()
+
+
+if not os.environ.get('APP_PRELOAD'):
+    init_worker()
+
+
 # ==================== Initialize Database ====================
 
 def init_db():
+    from migrations import Migrator
+
     with app.app_context():
         db.create_all()
+        Migrator(db.engine).migrate()
         
         # Create default super admin if not exists (no college code)
         if not Admin.query.filter_by(username='admin', college_code=None).first():
@@ -0,0 +1,365 @@
+"""
+Optional ASGI deployment
+The voter hot paths (login, dashboard, voting, live results API) run as
+async views on an async SQLAlchemy engine (aiosqlite / asyncpg), so a voter
+waiting on the database no longer holds a worker thread. Every other route,
+including the whole admin area, is the unchanged Flask app mounted as WSGI.
+
+Templates, sessions, flash messages, CSRF tokens and security headers still
+come from Flask: each async view renders inside a lightweight Flask request
+context built from the ASGI request, and the Flask response (with its
+session cookie) is handed back to the ASGI server.
+
+Usage: pip install -r requirements-asgi.txt
+       uvicorn asgi:application --workers 4
+"""
+from contextlib import asynccontextmanager, contextmanager
+from datetime import datetime
+from types import SimpleNamespace
+
+from a2wsgi import WSGIMiddleware
+from flask import flash, redirect, render_template, session, url_for, jsonify
+from flask_wtf.csrf import validate_csrf
+from limits import parse as parse_limit
+from sqlalchemy import select, insert, func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.orm import selectinload
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import Response
+from starlette.routing import Mount, Route
+from werkzeug.exceptions import HTTPException
+from wtforms import ValidationError
+
+from app import (app, limiter, login_throttle, Voter, Election, Candidate, Vote, vote_router, vote_wal, voted_index, mark_voted,
+                 voter_has_voted, record_vote, parse_ranked_ballot,
+                 rollup_rows, rollup_upsert_statement, AuditEntry, audit_row)
+from config import get_async_database_url, SQLITE_PRAGMAS
+from db_pool import install_sqlite_pragmas
+from tally import format_rankings
+from timeline import rollup_deltas
+from validation import validate_form, VOTER_LOGIN_SCHEMA
+
+# Same budget as the @limiter.limit on the Flask voter_login view
+VOTER_LOGIN_LIMIT = parse_limit('5 per minute')
+
+
+def create_async_db(config):
+    """Async engine and session factory for the configured database"""
+    url = get_async_database_url(config['SQLALCHEMY_DATABASE_URI'])
+    options = {'pool_size': config['ASYNC_DB_POOL_SIZE'], 'max_overflow': 0, 'pool_timeout': 30}
+    if url.startswith('sqlite'):
+        options['connect_args'] = {'timeout': 30}
+    engine = create_async_engine(url, **options)
+    if url.startswith('sqlite'):
+        install_sqlite_pragmas(engine.sync_engine, SQLITE_PRAGMAS)
+    return engine, async_sessionmaker(engine, expire_on_commit=False)
+
+
+async_engine, AsyncSession = create_async_db(app.config)
+
+
+# ==================== Flask bridge ====================
+
+@contextmanager
+def flask_request(request):
+    """Flask request context (session, url_for, flash) for an ASGI request"""
+    with app.test_request_context(
+        request.url.path,
+        method=request.method,
+        base_url=f'{request.url.scheme}://{request.url.netloc}',
+        query_string=request.url.query,
+        headers=[(key, value) for key, value in request.headers.items() if key.lower() != 'content-length'],
+    ):
+        yield
+
+
+def to_asgi(flask_response):
+    """Run after_request handlers (security headers, session cookie) and convert"""
+    flask_response = app.process_response(app.make_response(flask_response))
+    response = Response(flask_response.get_data(), status_code=flask_response.status_code)
+    # raw_headers keeps repeated headers such as several Set-Cookie lines
+    response.raw_headers = [(key.lower().encode('latin-1'), value.encode('latin-1'))
+                            for key, value in flask_response.headers.items()]
+    return response
+
+
+def csrf_error(form):
+    """Flask-WTF's check of the form token against the session; None when valid"""
+    if not app.config.get('WTF_CSRF_ENABLED', True):
+        return None
+    try:
+        validate_csrf(form.get('csrf_token'))
+    except ValidationError as e:
+        return Response(f'Bad Request: {e.args[0]}', status_code=400)
+    return None
+
+
+def login_rate_limited(request):
+    if not app.config['RATELIMIT_ENABLED'] or not limiter.enabled:
+        return False
+    client = request.client.host if request.client else 'unknown'
+    return not limiter.limiter.hit(VOTER_LOGIN_LIMIT, 'asgi-voter-login', client)
+
+
+def sync_storage():
+    """Shards and the WAL buffer keep their sync code paths (run in a thread)"""
+    return vote_router is not None or vote_wal is not None
+
+
+def _in_app_context(function, *args):
+    with app.app_context():
+        return function(*args)
+
+
+# ==================== Async vote storage ====================
+
+async def async_voted_elections(db, voter, election_ids):
+    """Ids of the given elections in which the voter has voted"""
+    if not election_ids:
+        return set()
+    if voted_index and vote_wal is None:
+        return {election_id for election_id in election_ids if voted_index.has_voted(election_id, voter.id)}
+    if sync_storage():
+        return {election_id for election_id in election_ids
+                if await run_in_threadpool(_in_app_context, voter_has_voted, voter, election_id)}
+    result = await db.execute(select(Vote.election_id).where(
+        Vote.voter_id == voter.id, Vote.election_id.in_(election_ids)))
+    return set(result.scalars())
+
+
+async def async_count_votes_cast(db, voter):
+    if sync_storage():
+        from app import count_votes_cast
+        voter_ref = SimpleNamespace(id=voter.id, college_code=voter.college_code)
+        return await run_in_threadpool(_in_app_context, count_votes_cast, voter_ref)
+    return await db.scalar(select(func.count(Vote.id)).where(Vote.voter_id == voter.id))
+
+
+async def async_record_vote(voter, election, candidate_id, rankings=None):
+    """Async counterpart of app.record_vote; the receipt, or None if the voter already voted"""
+    if sync_storage():
+        voter_ref = SimpleNamespace(id=voter.id, college_code=voter.college_code)
+        election_ref = SimpleNamespace(id=election.id, college_code=election.college_code)
+        return await run_in_threadpool(_in_app_context, record_vote, voter_ref, election_ref, candidate_id, rankings)
+    timestamp = datetime.now()
+    rankings = format_rankings(rankings) if rankings else None
+    audit_entry = audit_row({'voter_id': voter.id, 'election_id': election.id, 'candidate_id': candidate_id,
+                             'timestamp': timestamp, 'rankings': rankings})
+    rows = rollup_rows(rollup_deltas([(election.id, candidate_id, timestamp)]))
+    upsert = rollup_upsert_statement(async_engine.dialect.name)
+    try:
+        async with AsyncSession.begin() as db:
+            await db.execute(insert(Vote).values(
+                voter_id=voter.id, election_id=election.id, candidate_id=candidate_id,
+                timestamp=timestamp, rankings=rankings))
+            if upsert is not None:
+                await db.execute(upsert, rows)
+            await db.execute(insert(AuditEntry), [audit_entry])
+    except IntegrityError:
+        return None
+    mark_voted([audit_entry])
+    if upsert is None:
+        # Rollups on other databases go through the portable sync path
+        from app import update_vote_rollups, db as flask_db
+
+        def _update_rollups():
+            update_vote_rollups([(election.id, candidate_id, timestamp)])
+            flask_db.session.commit()
+        await run_in_threadpool(_in_app_context, _update_rollups)
+    return audit_entry['receipt']
+
+
+# ==================== Async voter routes ====================
+
+async def voter_login(request):
+    form = await request.form() if request.method == 'POST' else {}
+    voter = None
+    if request.method == 'POST':
+        if login_rate_limited(request):
+            return Response('Too many login attempts. Please wait a minute.', status_code=429)
+        with flask_request(request):
+            error = csrf_error(form)
+        if error:
+            return error
+        cleaned, _ = validate_form(VOTER_LOGIN_SCHEMA, form)
+        account = ('voter', cleaned['college_code'], cleaned['voter_id'])
+        locked = login_throttle.locked_for(*account)
+        if locked:
+            with flask_request(request):
+                flash(f'Too many failed login attempts. Try again in {locked} seconds.', 'danger')
+                return to_asgi((render_template('voter/login.html'), 429))
+        async with AsyncSession() as db:
+            voter = await db.scalar(select(Voter).where(
+                Voter.voter_id == cleaned['voter_id'], Voter.college_code == cleaned['college_code']).limit(1))
+        # Password hashing is CPU bound; keep it off the event loop
+        if voter and not await run_in_threadpool(voter.check_password, cleaned['password']):
+            voter = None
+        if voter:
+            login_throttle.record_success(*account)
+        else:
+            login_throttle.record_failure(*account)
+
+    with flask_request(request):
+        if request.method == 'POST':
+            if voter:
+                session['voter_id'] = voter.id
+                flash('Login successful!', 'success')
+                return to_asgi(redirect(url_for('voter_dashboard')))
+            flash('Invalid voter ID, password, or college code', 'danger')
+        return to_asgi(render_template('voter/login.html'))
+
+
+def _session_voter_id(request):
+    with flask_request(request):
+        return session.get('voter_id')
+
+
+def _login_redirect(request):
+    with flask_request(request):
+        flash('Please login first!', 'warning')
+        return to_asgi(redirect(url_for('voter_login')))
+
+
+async def voter_dashboard(request):
+    voter_id = _session_voter_id(request)
+    if voter_id is None:
+        return _login_redirect(request)
+    async with AsyncSession() as db:
+        voter = await db.get(Voter, voter_id)
+        if voter is None:
+            return _login_redirect(request)
+        # Show only active elections from voter's college
+        elections = (await db.scalars(select(Election).options(selectinload(Election.candidates)).where(
+            Election.status == 'active', Election.college_code == voter.college_code))).all()
+        voted = await async_voted_elections(db, voter, [election.id for election in elections])
+        votes_cast = await async_count_votes_cast(db, voter)
+    voter_view = SimpleNamespace(id=voter.id, name=voter.name, voter_id=voter.voter_id,
+                                 college_code=voter.college_code,
+                                 has_voted=lambda election_id: election_id in voted)
+    with flask_request(request):
+        return to_asgi(render_template('voter/dashboard.html', voter=voter_view, elections=elections,
+                                       votes_cast=votes_cast))
+
+
+async def vote(request):
+    election_id = request.path_params['election_id']
+    form = await request.form() if request.method == 'POST' else {}
+    voter_id = _session_voter_id(request)
+    if voter_id is None:
+        return _login_redirect(request)
+
+    async with AsyncSession() as db:
+        voter = await db.get(Voter, voter_id)
+        election = await db.get(Election, election_id)
+        if voter is None:
+            return _login_redirect(request)
+        if election is None:
+            return Response('Not Found', status_code=404)
+        candidates = (await db.scalars(select(Candidate).where(Candidate.election_id == election_id))).all()
+
+        message, receipt = None, None
+        # Votes are stored with the election's college, so voters may only vote there
+        if election.college_code != voter.college_code:
+            message = ('This election is not available for your college!', 'danger')
+        else:
+            # Never accept a vote after the end date (results may be final)
+            election.update_status()
+            if election.status != 'active':
+                message = ('This election is not currently active!', 'warning')
+            elif await async_voted_elections(db, voter, [election_id]):
+                message = ('You have already voted in this election!', 'warning')
+
+        if message is None and request.method == 'POST':
+            with flask_request(request):
+                error = csrf_error(form)
+            if error:
+                return error
+            rankings = None
+            if election.is_ranked:
+                rankings, ballot_error = parse_ranked_ballot(candidates, form)
+                if ballot_error:
+                    with flask_request(request):
+                        flash(ballot_error, 'danger')
+                        return to_asgi(redirect(url_for('vote', election_id=election_id)))
+                candidate_id = rankings[0]
+            else:
+                try:
+                    candidate_id = int(form.get('candidate_id'))
+                except (TypeError, ValueError):
+                    candidate_id = None
+                if candidate_id not in {candidate.id for candidate in candidates}:
+                    with flask_request(request):
+                        flash('Please select a valid candidate!', 'danger')
+                        return to_asgi(redirect(url_for('vote', election_id=election_id)))
+            receipt = await async_record_vote(voter, election, candidate_id, rankings)
+            if receipt:
+                app.logger.info('Vote recorded', extra={'event': 'vote_recorded', 'route': 'vote',
+                                                        'election_id': election_id, 'voter_id': voter.id})
+                message = ('Your vote has been recorded successfully!', 'success')
+            else:
+                message = ('You have already voted in this election!', 'warning')
+
+    with flask_request(request):
+        if message is not None:
+            flash(*message)
+            if receipt:
+                flash(f'Your vote receipt: {receipt} (keep it to verify your vote at '
+                      f'{url_for("verify_receipt", receipt=receipt)})', 'info')
+            return to_asgi(redirect(url_for('voter_dashboard')))
+        return to_asgi(render_template('voter/vote.html', election=election, candidates=candidates))
+
+
+def _sync_api_results(election_id):
+    """Completed (snapshot) and ranked elections use the sync results code"""
+    from app import api_results
+    with app.test_request_context(f'/api/elections/{election_id}/results'):
+        return api_results(election_id)
+
+
+async def api_results(request):
+    election_id = request.path_params['election_id']
+    async with AsyncSession() as db:
+        election = await db.get(Election, election_id)
+        if election is None:
+            return Response('Not Found', status_code=404)
+        live = election.current_status != 'completed' and not election.is_ranked and vote_router is None
+        if live:
+            counts = dict((await db.execute(
+                select(Vote.candidate_id, func.count(Vote.id)).where(Vote.election_id == election_id)
+                .group_by(Vote.candidate_id))).all())
+            candidates = (await db.scalars(select(Candidate).where(Candidate.election_id == election_id))).all()
+    if live:
+        results = [{'id': c.id, 'name': c.name, 'party': c.party, 'votes': counts.get(c.id, 0)}
+                   for c in candidates]
+        with flask_request(request):
+            return to_asgi(jsonify(results))
+    response = await run_in_threadpool(_sync_api_results, election_id)
+    with flask_request(request):
+        return to_asgi(response)
+
+
+def handle_http_exception(request, exc):
+    with flask_request(request):
+        return to_asgi(exc.get_response())
+
+
+@asynccontextmanager
+async def lifespan(starlette_app):
+    yield
+    await async_engine.dispose()
+
+
+application = Starlette(
+    routes=[
+        Route('/voter/login', voter_login, methods=['GET', 'POST']),
+        Route('/voter/dashboard', voter_dashboard, methods=['GET']),
+        Route('/voter/vote/{election_id:int}', vote, methods=['GET', 'POST']),
+        Route('/api/elections/{election_id:int}/results', api_results, methods=['GET']),
+        # Everything else (admin area, registration, static files) stays WSGI
+        Mount('/', WSGIMiddleware(app)),
+    ],
+    exception_handlers={HTTPException: handle_http_exception},
+    lifespan=lifespan,
+)
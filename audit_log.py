@@ -0,0 +1,130 @@
+"""
+Merkle-tree vote audit log
+Every stored vote appends a leaf (the voter's receipt hash) to its
+election's audit log. Leaves are hashed into a Merkle tree in batches; all
+tree levels are stored, so appending k leaves rewrites only O(k + log n)
+nodes and an inclusion proof is the O(log n) siblings on the leaf's path.
+
+A level with an odd number of nodes promotes its last node unchanged to the
+next level, so the tree never needs padding.
+"""
+import hashlib
+import json
+import secrets
+
+# Domain separation keeps a leaf from being passed off as an inner node
+LEAF_PREFIX = b'\x00'
+NODE_PREFIX = b'\x01'
+
+
+def new_nonce():
+    """Random salt so a receipt cannot be matched to a candidate by guessing"""
+    return secrets.token_hex(16)
+
+
+def leaf_hash(election_id, voter_id, candidate_id, rankings, timestamp, nonce):
+    """Receipt of one vote: SHA-256 over its canonical JSON"""
+    data = json.dumps([election_id, voter_id, candidate_id, rankings or None, timestamp.isoformat(), nonce],
+                      separators=(',', ':'))
+    return hashlib.sha256(LEAF_PREFIX + data.encode('utf-8')).hexdigest()
+
+
+def node_hash(left, right):
+    return hashlib.sha256(NODE_PREFIX + bytes.fromhex(left) + bytes.fromhex(right)).hexdigest()
+
+
+def frontier_keys(size):
+    """
+    Stored nodes an append to a tree of `size` leaves reads: at each level,
+    the left sibling of the first node that changes
+
+    Returns:
+        List of (level, position)
+    """
+    keys = []
+    level = 0
+    while size >> level:
+        start = size >> level
+        if start % 2:
+            keys.append((level, start - 1))
+        level += 1
+    return keys
+
+
+def extend_tree(size, leaves, frontier):
+    """
+    Append leaves to a tree of `size` leaves
+
+    Args:
+        size: Current number of leaves
+        leaves: New leaf hashes, in order
+        frontier: {(level, position): hash} for every key of frontier_keys(size)
+
+    Returns:
+        Tuple (changed_nodes {(level, position): hash}, root)
+    """
+    if not leaves:
+        raise ValueError('No leaves to append')
+    width = size + len(leaves)
+    current = {size + i: leaf for i, leaf in enumerate(leaves)}
+    changed = {}
+    level = 0
+    while True:
+        changed.update(((level, position), value) for position, value in current.items())
+        if width == 1:
+            return changed, current[0]
+        start = min(current)
+        parents = {}
+        for parent in range(start // 2, (width + 1) // 2):
+            left = 2 * parent
+            left_hash = current[left] if left in current else frontier[(level, left)]
+            right = left + 1
+            parents[parent] = node_hash(left_hash, current[right]) if right < width else left_hash
+        current = parents
+        width = (width + 1) // 2
+        level += 1
+
+
+def proof_keys(index, size):
+    """
+    Siblings on the path from leaf `index` to the root of a tree of `size`
+    leaves (levels where the node is promoted have none)
+
+    Returns:
+        List of (level, position)
+    """
+    if not 0 <= index < size:
+        raise ValueError(f'Leaf {index} is not in a tree of {size} leaves')
+    keys = []
+    level = 0
+    width = size
+    while width > 1:
+        sibling = index ^ 1
+        if sibling < width:
+            keys.append((level, sibling))
+        index //= 2
+        width = (width + 1) // 2
+        level += 1
+    return keys
+
+
+def build_proof(index, size, nodes):
+    """
+    Inclusion proof from the stored nodes
+
+    Args:
+        nodes: {(level, position): hash} covering proof_keys(index, size)
+
+    Returns:
+        List of {'hash', 'side'} from the leaf upwards
+    """
+    return [{'hash': nodes[(level, position)], 'side': 'left' if position < index >> level else 'right'}
+            for level, position in proof_keys(index, size)]
+
+
+def verify_proof(leaf, proof, root):
+    """Fold the proof over the leaf and compare with the root"""
+    value = leaf
+    for step in proof:
+        value = node_hash(step['hash'], value) if step['side'] == 'left' else node_hash(value, step['hash'])
+    return value == root
@@ -0,0 +1,177 @@
+"""
+ASGI vs WSGI Voter Capacity Benchmark
+Seeds a SQLite database with one active election and many voters, then runs
+the same concurrent voter flow (login, dashboard, ballot, vote, live results)
+against one sync gunicorn worker and one uvicorn worker serving asgi.py, and
+reports completed voters per second and request latency for each.
+Usage: python benchmarks/bench_asgi.py [--voters 2000] [--concurrency 200] [--threads 8]
+(needs requirements-asgi.txt and httpx)
+"""
+import argparse
+import asyncio
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+CSRF_FIELD = re.compile(r'name="csrf_token"[^>]*value="([^"]+)"')
+PASSWORD = 'Passw0rdX'
+
+SEED = """
+import sys
+from datetime import datetime, timedelta
+from werkzeug.security import generate_password_hash
+import app as A
+A.init_db()
+voters = int(sys.argv[1])
+with A.app.app_context():
+    A.db.session.add(A.College(college_code='BENCH', college_name='Benchmark College'))
+    admin = A.Admin.query.filter_by(username='admin').first()
+    election = A.Election(title='Benchmark', description='', college_code='BENCH', created_by=admin.id,
+                          start_date=datetime.now() - timedelta(hours=1),
+                          end_date=datetime.now() + timedelta(hours=6))
+    A.db.session.add(election)
+    A.db.session.flush()
+    for name in ('Alpha', 'Beta', 'Gamma'):
+        A.db.session.add(A.Candidate(election_id=election.id, name=name, party='', description=''))
+    # Cheap hashes: the benchmark measures request handling, not pbkdf2 rounds
+    password_hash = generate_password_hash(%r, method='pbkdf2:sha256:1000')
+    A.db.session.execute(A.insert(A.Voter), [
+        {'voter_id': f'BV{i:06d}', 'name': f'Voter {i}', 'email': f'bv{i}@example.com',
+         'password_hash': password_hash, 'college_code': 'BENCH'} for i in range(voters)])
+    election.update_status()
+    A.db.session.commit()
+    print(election.id)
+""" % PASSWORD
+
+
+def seed(env, voters):
+    result = subprocess.run([sys.executable, '-c', SEED, str(voters)], cwd=ROOT, env=env,
+                            capture_output=True, text=True, check=True)
+    return int(result.stdout.strip().splitlines()[-1])
+
+
+def session_cookie(response, cookie):
+    """The session cookie is Secure, so httpx would not send it over http"""
+    for header in response.headers.get_list('set-cookie'):
+        name, _, rest = header.partition('=')
+        if name == 'session':
+            return rest.split(';', 1)[0]
+    return cookie
+
+
+async def voter_flow(client, voter_number, election_id, latencies):
+    cookie = None
+
+    async def request(method, url, **kwargs):
+        nonlocal cookie
+        headers = {'Cookie': f'session={cookie}'} if cookie else {}
+        start = time.perf_counter()
+        response = await client.request(method, url, headers=headers, **kwargs)
+        latencies.append(time.perf_counter() - start)
+        cookie = session_cookie(response, cookie)
+        if response.status_code >= 400:
+            raise RuntimeError(f'{method} {url} -> {response.status_code}')
+        return response
+
+    page = await request('GET', '/voter/login')
+    token = CSRF_FIELD.search(page.text).group(1)
+    await request('POST', '/voter/login', data={
+        'voter_id': f'BV{voter_number:06d}', 'password': PASSWORD, 'college_code': 'BENCH', 'csrf_token': token})
+    await request('GET', '/voter/dashboard')
+    page = await request('GET', f'/voter/vote/{election_id}')
+    token = CSRF_FIELD.search(page.text).group(1)
+    candidate_ids = re.findall(r'name="candidate_id"[^>]*value="(\d+)"', page.text)
+    await request('POST', f'/voter/vote/{election_id}', data={
+        'candidate_id': candidate_ids[voter_number % len(candidate_ids)], 'csrf_token': token})
+    await request('GET', f'/api/elections/{election_id}/results')
+
+
+async def drive(port, voters, concurrency, election_id):
+    queue = asyncio.Queue()
+    for number in range(voters):
+        queue.put_nowait(number)
+    latencies, errors = [], []
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=f'http://127.0.0.1:{port}', limits=limits, timeout=120) as client:
+        async def worker():
+            while not queue.empty():
+                number = queue.get_nowait()
+                try:
+                    await voter_flow(client, number, election_id, latencies)
+                except Exception as e:
+                    errors.append(str(e))
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    return elapsed, sorted(latencies), errors
+
+
+def wait_until_up(port, proc, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(proc.stderr.read())
+        try:
+            if httpx.get(f'http://127.0.0.1:{port}/voter/login', timeout=2).status_code == 200:
+                return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError('server did not start')
+
+
+def run(mode, args, port):
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ,
+                   DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+                   RATELIMIT_ENABLED='0',
+                   WEB_CONCURRENCY='1',
+                   GUNICORN_THREADS=str(args.threads),
+                   PORT=str(port))
+        for name in ('VOTE_SHARD_URL', 'VOTE_WAL_PATH', 'APP_PRELOAD'):
+            env.pop(name, None)
+        election_id = seed(env, args.voters)
+        if mode == 'wsgi':
+            command = [sys.executable, '-m', 'gunicorn', '-c', os.path.join(ROOT, 'gunicorn.conf.py'), 'app:app']
+        else:
+            command = [sys.executable, '-m', 'uvicorn', 'asgi:application', '--port', str(port),
+                       '--workers', '1', '--no-access-log', '--log-level', 'warning']
+        proc = subprocess.Popen(command, cwd=ROOT, env=env, stdout=subprocess.DEVNULL,
+                                stderr=subprocess.PIPE, text=True)
+        try:
+            wait_until_up(port, proc)
+            return asyncio.run(drive(port, args.voters, args.concurrency, election_id))
+        finally:
+            proc.terminate()
+            proc.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--voters', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=200, help='simultaneous voters')
+    parser.add_argument('--threads', type=int, default=8, help='gunicorn threads for the sync worker')
+    parser.add_argument('--port', type=int, default=8766)
+    args = parser.parse_args()
+
+    print(f"{args.voters} voters, {args.concurrency} concurrent, one worker process each")
+    for mode in ('wsgi', 'asgi'):
+        elapsed, latencies, errors = run(mode, args, args.port)
+        done = args.voters - len(errors)
+        p50 = latencies[len(latencies) // 2] * 1000 if latencies else 0
+        p99 = latencies[int(len(latencies) * 0.99)] * 1000 if latencies else 0
+        label = f'gunicorn gthread x{args.threads}' if mode == 'wsgi' else 'uvicorn asgi'
+        print(f"  {label:<22} {done / elapsed:8.1f} voters/s  {len(latencies) / elapsed:8.1f} req/s  "
+              f"p50 {p50:7.1f} ms  p99 {p99:7.1f} ms  errors {len(errors)}"
+              + (f"  (first: {errors[0]})" if errors else ''))
+
+
+if __name__ == '__main__':
+    main()
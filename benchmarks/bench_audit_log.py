@@ -0,0 +1,84 @@
+"""
+Vote Audit Log Merkle Tree Benchmark
+Appends receipts to an audit tree in batches with the incremental builder
+from audit_log.py (stored levels kept in a dict standing in for the
+audit_tree_nodes table), compares the last batch with rebuilding the root
+from all leaves, then times and checks inclusion proofs for random receipts.
+Usage: python benchmarks/bench_audit_log.py [--votes 1000000] [--batch 5000] [--proofs 10000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from audit_log import (new_nonce, leaf_hash, node_hash, frontier_keys, extend_tree, proof_keys,
+                       build_proof, verify_proof)
+
+
+def full_root(leaves):
+    """Reference: hash every level from scratch"""
+    level = leaves
+    while len(level) > 1:
+        level = [node_hash(level[i], level[i + 1]) if i + 1 < len(level) else level[i]
+                 for i in range(0, len(level), 2)]
+    return level[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--votes', type=int, default=1000000)
+    parser.add_argument('--batch', type=int, default=5000, help='pending entries hashed per transaction')
+    parser.add_argument('--proofs', type=int, default=10000)
+    args = parser.parse_args()
+    rng = random.Random(42)
+
+    start = time.perf_counter()
+    now = datetime.now()
+    leaves = [leaf_hash(1, voter_id, rng.randint(1, 10), None, now, new_nonce())
+              for voter_id in range(args.votes)]
+    print(f"{args.votes} receipts hashed in {time.perf_counter() - start:.2f} s")
+
+    nodes = {}
+    size = 0
+    written = 0
+    slowest = 0.0
+    start = time.perf_counter()
+    while size < len(leaves):
+        batch = leaves[size:size + args.batch]
+        batch_start = time.perf_counter()
+        changed, root = extend_tree(size, batch, {key: nodes[key] for key in frontier_keys(size)})
+        slowest = max(slowest, time.perf_counter() - batch_start)
+        nodes.update(changed)
+        written += len(changed)
+        size += len(batch)
+    incremental = time.perf_counter() - start
+    batches = -(-len(leaves) // args.batch)
+    print(f"  incremental  {incremental:8.2f} s total  {incremental / batches * 1000:8.1f} ms/batch avg  "
+          f"{slowest * 1000:8.1f} ms slowest  {written / len(leaves):.2f} node writes/vote  "
+          f"{len(nodes)} stored nodes")
+
+    start = time.perf_counter()
+    expected = full_root(leaves)
+    rebuild = time.perf_counter() - start
+    match = expected == root
+    print(f"  full rebuild {rebuild:8.2f} s for one batch ({rebuild / (incremental / batches):.0f}x an "
+          f"incremental batch)  root {'OK' if match else 'MISMATCH'}")
+
+    indexes = [rng.randrange(size) for _ in range(args.proofs)]
+    start = time.perf_counter()
+    proofs = [build_proof(index, size, {key: nodes[key] for key in proof_keys(index, size)}) for index in indexes]
+    built = time.perf_counter() - start
+    start = time.perf_counter()
+    valid = all(verify_proof(leaves[index], proof, root) for index, proof in zip(indexes, proofs))
+    checked = time.perf_counter() - start
+    print(f"  proofs       {built / args.proofs * 1e6:8.1f} us build  {checked / args.proofs * 1e6:8.1f} us verify  "
+          f"{max(len(p) for p in proofs)} siblings max  {'OK' if valid else 'INVALID'}")
+    sys.exit(0 if match and valid else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""
+Email Blocklist Benchmark
+Builds the disposable-domain blocklist from synthetic files of 100k and 1M
+domains and reports build time, memory and lookup time (exact hits,
+subdomain hits and misses), compared with a plain frozenset.
+Usage: python benchmarks/bench_blocklist.py [--sizes 100000 1000000]
+"""
+import argparse
+import os
+import random
+import string
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from email_blocklist import DomainBlocklist
+
+TLDS = ['com', 'net', 'org', 'io', 'email', 'info', 'co.uk', 'de', 'ru', 'xyz']
+
+
+def random_domain(rng):
+    label = ''.join(rng.choice(string.ascii_lowercase + string.digits) for _ in range(rng.randint(5, 14)))
+    return f'{label}.{rng.choice(TLDS)}'
+
+
+def measure(fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    current = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, elapsed, current, peak
+
+
+def per_lookup_us(fn, keys):
+    start = time.perf_counter()
+    for key in keys:
+        fn(key)
+    return (time.perf_counter() - start) / len(keys) * 1e6
+
+
+def run(size, rng):
+    domains = {random_domain(rng) for _ in range(size)}
+    while len(domains) < size:
+        domains.add(random_domain(rng))
+    domains = list(domains)
+
+    with tempfile.NamedTemporaryFile('w', suffix='.txt', delete=False) as f:
+        f.write('\n'.join(domains))
+        path = f.name
+    try:
+        blocklist, build_time, current, peak = measure(lambda: DomainBlocklist(path))
+        frozen, _, frozen_bytes, _ = measure(lambda: frozenset(domains))
+    finally:
+        os.unlink(path)
+
+    hits = rng.sample(domains, 10000)
+    subdomains = [f'mx{i}.{d}' for i, d in enumerate(hits)]
+    misses = [random_domain(rng) + '.test' for _ in range(10000)]
+
+    print(f"{size:>9,} domains: build {build_time:6.2f}s, structure {blocklist.memory_bytes() / 2**20:7.1f} MiB "
+          f"(traced {current / 2**20:7.1f} MiB, peak {peak / 2**20:7.1f} MiB; frozenset table alone {frozen_bytes / 2**20:7.1f} MiB + strings)")
+    print(f"{'':>19}lookup exact {per_lookup_us(blocklist.is_blocked, hits):5.2f} us, "
+          f"subdomain {per_lookup_us(blocklist.is_blocked, subdomains):5.2f} us, "
+          f"miss {per_lookup_us(blocklist.is_blocked, misses):5.2f} us "
+          f"(frozenset exact-only {per_lookup_us(frozen.__contains__, hits):5.2f} us)")
+    assert all(blocklist.is_blocked(d) for d in hits + subdomains)
+    assert not any(blocklist.is_blocked(d) for d in misses)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100000, 1000000])
+    args = parser.parse_args()
+    rng = random.Random(7)
+    for size in args.sizes:
+        run(size, rng)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""
+Cold Start Benchmark
+Measures import time of the Vercel entry point (api/index.py) and latency of
+the first request, each in a fresh interpreter, against a bootstrapped
+SQLite database.
+Usage: python benchmarks/bench_cold_start.py [--runs 5] [--path /]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+CHILD = """
+import json, sys, time
+start = time.perf_counter()
+sys.path.insert(0, {root!r})
+sys.path.insert(0, {api!r})
+import index
+imported = time.perf_counter()
+response = index.app.test_client().get({path!r})
+first = time.perf_counter()
+print(json.dumps({{'import_ms': (imported - start) * 1000,
+                   'first_request_ms': (first - imported) * 1000,
+                   'status': response.status_code}}))
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--path', default='/')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'cold.db')}")
+        # Deploy step: run the bootstrap once, like the real deployment
+        subprocess.run([sys.executable, os.path.join(ROOT, 'bootstrap.py')],
+                       env=env, cwd=tmp, check=True, capture_output=True)
+
+        code = CHILD.format(root=ROOT, api=os.path.join(ROOT, 'api'), path=args.path)
+        results = []
+        for _ in range(args.runs):
+            output = subprocess.run([sys.executable, '-c', code], env=env, cwd=tmp,
+                                    check=True, capture_output=True, text=True).stdout
+            results.append(json.loads(output.strip().splitlines()[-1]))
+
+    imports = [r['import_ms'] for r in results]
+    firsts = [r['first_request_ms'] for r in results]
+    print(f"Cold start over {args.runs} fresh interpreters (GET {args.path} -> {results[0]['status']})")
+    print(f"  import api/index.py   median {statistics.median(imports):7.1f} ms   min {min(imports):7.1f} ms")
+    print(f"  first request         median {statistics.median(firsts):7.1f} ms   min {min(firsts):7.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""
+Voter Registration Benchmark
+Registers new voters through the Flask app on top of an existing voter
+table and reports registrations/second and SQL statements per registration,
+with the registered-voter Bloom filter on and off. Password hashing is part
+of every registration, so the uniqueness checks are also timed on their own.
+Usage: python benchmarks/bench_registration.py [--existing 200000] [--registrations 300] [--duplicates 0.1]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def run_once(existing, registrations, duplicates):
+    """Run inside a child process configured through environment variables"""
+    sys.path.insert(0, ROOT)
+    import random
+    from sqlalchemy import event, insert
+    from sqlalchemy.engine import Engine
+    from werkzeug.security import generate_password_hash
+    import app as app_module
+    from app import app, db, limiter, College, Voter
+
+    app.config['WTF_CSRF_ENABLED'] = False
+    limiter.enabled = False
+    rng = random.Random(42)
+
+    with app.app_context():
+        db.create_all()
+        db.session.add(College(college_code='BENCH', college_name='Benchmark College'))
+        password_hash = generate_password_hash('unused')
+        for start in range(0, existing, 10000):
+            db.session.execute(insert(Voter), [
+                {'voter_id': f'E{i:07d}', 'name': f'Voter {i}', 'email': f'e{i}@example.com',
+                 'password_hash': password_hash, 'college_code': 'BENCH'}
+                for i in range(start, min(start + 10000, existing))])
+        db.session.commit()
+
+        statements = []
+        # Every engine: reads go to the SQLite read pool
+        event.listen(Engine, 'before_cursor_execute', lambda *args: statements.append(1))
+
+        # Uniqueness checks alone: what registration did before the insert
+        probes = [(f'N{i:07d}', f'n{i}@example.com') for i in range(2000)]
+        app_module.voter_filter and app_module.voter_filter.may_exist('warm', 'up@example.com')
+        start = time.perf_counter()
+        for voter_id, email in probes:
+            id_taken, email_taken = (app_module.voter_filter.may_exist(voter_id, email)
+                                     if app_module.voter_filter else (True, True))
+            if id_taken:
+                Voter.query.filter_by(voter_id=voter_id).first()
+            if email_taken:
+                Voter.query.filter_by(email=email).first()
+        check_us = (time.perf_counter() - start) / len(probes) * 1e6
+
+    client = app.test_client()
+    statements.clear()
+    accepted = 0
+    start = time.perf_counter()
+    for i in range(registrations):
+        if rng.random() < duplicates:
+            voter_id = f'E{rng.randrange(existing):07d}'  # taken: must be rejected
+        else:
+            voter_id = f'R{i:07d}'
+        response = client.post('/voter/register', base_url='https://localhost', data={
+            'voter_id': voter_id, 'name': 'Bench Voter', 'email': f'{voter_id.lower()}@example.com',
+            'password': 'Bench-Passw0rd!', 'college_code': 'BENCH'})
+        accepted += response.headers.get('Location', '').endswith('/voter/login')
+    elapsed = time.perf_counter() - start
+    print(json.dumps({'registrations': registrations, 'accepted': accepted, 'seconds': elapsed,
+                      'per_second': registrations / elapsed, 'statements': len(statements) / registrations,
+                      'check_us': check_us}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--existing', type=int, default=200000)
+    parser.add_argument('--registrations', type=int, default=300)
+    parser.add_argument('--duplicates', type=float, default=0.1, help='share of attempts with a taken voter ID')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_once(args.existing, args.registrations, args.duplicates)
+        return
+
+    print(f"{args.registrations} registrations ({args.duplicates:.0%} duplicates) over {args.existing} voters")
+    for label, enabled in (('without filter', '0'), ('with filter', '1')):
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+                       VOTER_FILTER_ENABLED=enabled)
+            output = subprocess.run(
+                [sys.executable, __file__, '--child', '--existing', str(args.existing),
+                 '--registrations', str(args.registrations), '--duplicates', str(args.duplicates)],
+                env=env, cwd=tmp, capture_output=True, text=True, check=True
+            ).stdout.strip().splitlines()[-1]
+            result = json.loads(output)
+            print(f"  {label:<15} {result['per_second']:8.1f} registrations/s  "
+                  f"{result['statements']:.1f} SQL statements each  "
+                  f"uniqueness check {result['check_us']:.1f} us  ({result['accepted']} accepted)")
+
+
+if __name__ == '__main__':
+    main()
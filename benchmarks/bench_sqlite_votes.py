@@ -0,0 +1,104 @@
+"""
+SQLite Concurrency Benchmark
+Casts votes from many threads through the Flask app and reports votes/second,
+with SQLite performance mode (WAL pragmas + read/write split) on and off.
+Usage: python benchmarks/bench_sqlite_votes.py [--voters 2000] [--threads 16]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def run_once(voters, threads):
+    """Run inside a child process configured through environment variables"""
+    sys.path.insert(0, ROOT)
+    from datetime import datetime, timedelta
+    from werkzeug.security import generate_password_hash
+    from app import app, db, limiter, College, Admin, Election, Candidate, Voter
+
+    app.config['WTF_CSRF_ENABLED'] = False
+    limiter.enabled = False
+
+    with app.app_context():
+        db.create_all()
+        db.session.add(College(college_code='BENCH', college_name='Benchmark College'))
+        admin = Admin(username='bench', email='bench@example.com', password_hash='x')
+        db.session.add(admin)
+        db.session.flush()
+        election = Election(title='Benchmark', start_date=datetime.now() - timedelta(hours=1),
+                            end_date=datetime.now() + timedelta(hours=1), status='active',
+                            college_code='BENCH', created_by=admin.id)
+        db.session.add(election)
+        db.session.flush()
+        candidates = [Candidate(name=f'Candidate {i}', election_id=election.id) for i in range(4)]
+        db.session.add_all(candidates)
+        password_hash = generate_password_hash('unused')
+        db.session.add_all([Voter(voter_id=f'B{i:07d}', name=f'Voter {i}', email=f'b{i}@example.com',
+                                  password_hash=password_hash, college_code='BENCH')
+                            for i in range(voters)])
+        db.session.commit()
+        election_id = election.id
+        candidate_ids = [c.id for c in candidates]
+        voter_pks = [v.id for v in Voter.query.all()]
+
+    errors = []
+
+    def worker(pks):
+        client = app.test_client()
+        for pk in pks:
+            with client.session_transaction() as sess:
+                sess['voter_id'] = pk
+            response = client.post(f'/voter/vote/{election_id}',
+                                   data={'candidate_id': candidate_ids[pk % len(candidate_ids)]})
+            if response.status_code != 302:
+                errors.append(response.status_code)
+
+    chunks = [voter_pks[i::threads] for i in range(threads)]
+    workers = [threading.Thread(target=worker, args=(chunk,)) for chunk in chunks]
+    start = time.perf_counter()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    elapsed = time.perf_counter() - start
+    print(json.dumps({'votes': len(voter_pks), 'seconds': elapsed,
+                      'votes_per_second': len(voter_pks) / elapsed, 'errors': len(errors)}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--voters', type=int, default=2000)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_once(args.voters, args.threads)
+        return
+
+    print(f"Casting {args.voters} votes from {args.threads} threads")
+    for label, mode in (('default', '0'), ('performance mode', '1')):
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(os.environ,
+                       DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+                       SQLITE_PERFORMANCE_MODE=mode)
+            env.pop('VOTE_SHARD_URL', None)
+            env.pop('VOTE_WAL_PATH', None)
+            output = subprocess.run(
+                [sys.executable, __file__, '--child', '--voters', str(args.voters), '--threads', str(args.threads)],
+                env=env, cwd=tmp, capture_output=True, text=True, check=True
+            ).stdout.strip().splitlines()[-1]
+            result = json.loads(output)
+            print(f"  {label:<17} {result['votes_per_second']:8.1f} votes/s "
+                  f"({result['seconds']:.2f}s, {result['errors']} errors)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""
+Ranked-Choice Tally Benchmark
+Generates random ranked ballots, runs the grouped/vectorized IRV and STV
+counts from tally.py and a straightforward per-ballot reference count, checks
+both elect the same candidates and reports the timings.
+Usage: python benchmarks/bench_tally.py [--ballots 100000] [--candidates 20] [--seats 3]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tally import tally
+
+
+def make_ballots(n, candidates, rng):
+    """Ballots with skewed first preferences and 1..5 ranked candidates"""
+    ids = list(range(1, candidates + 1))
+    popularity = [1.0 / (i + 1) for i in range(candidates)]
+    ballots = []
+    for _ in range(n):
+        first = rng.choices(ids, weights=popularity)[0]
+        rest = rng.sample([c for c in ids if c != first], rng.randint(0, min(4, candidates - 1)))
+        ballots.append((first, *rest))
+    return ids, ballots
+
+
+def reference_stv(ballots, candidate_ids, seats):
+    """Per-ballot STV (Droop quota, Gregory transfer); seats=1 with majority check is IRV"""
+    weights = [1.0] * len(ballots)
+    active = set(candidate_ids)
+    elected = []
+    quota = len(ballots) // (seats + 1) + 1
+    history = []
+    while len(elected) < seats and active:
+        counts = {c: 0.0 for c in active}
+        holder = []
+        for ballot, weight in zip(ballots, weights):
+            top = next((c for c in ballot if c in active), None)
+            holder.append(top)
+            if top is not None:
+                counts[top] += weight
+        if len(active) <= seats - len(elected):
+            elected.extend(sorted(active, key=lambda c: -counts[c]))
+            break
+        if seats == 1:
+            leader = max(active, key=lambda c: (counts[c], -candidate_ids.index(c)))
+            if counts[leader] * 2 > sum(counts.values()):
+                elected.append(leader)
+                break
+            winners = []
+        else:
+            winners = sorted((c for c in active if counts[c] >= quota), key=lambda c: -counts[c])
+        if winners:
+            for c in winners[:seats - len(elected)]:
+                elected.append(c)
+                active.discard(c)
+                factor = (counts[c] - quota) / counts[c]
+                weights = [w * factor if h == c else w for w, h in zip(weights, holder)]
+        else:
+            def key(c):
+                return (counts[c],) + tuple(h.get(c, 0) for h in reversed(history)) + (-candidate_ids.index(c),)
+            active.discard(min(active, key=key))
+        history.append(counts)
+    return elected
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--ballots', type=int, default=100000)
+    parser.add_argument('--candidates', type=int, default=20)
+    parser.add_argument('--seats', type=int, default=3)
+    args = parser.parse_args()
+    rng = random.Random(42)
+
+    ids, ballots = make_ballots(args.ballots, args.candidates, rng)
+    grouped = Counter(ballots)
+    print(f"{len(ballots)} ballots, {len(grouped)} distinct rankings, {len(ids)} candidates")
+
+    ok = True
+    for method, seats in (('irv', 1), ('stv', args.seats)):
+        start = time.perf_counter()
+        result = tally(method, grouped.items(), ids, seats)
+        fast = time.perf_counter() - start
+        start = time.perf_counter()
+        expected = reference_stv(ballots, ids, seats)
+        slow = time.perf_counter() - start
+        match = result['winners'] == expected
+        ok = ok and match
+        print(f"  {method.upper():<4} seats={seats}  rounds={len(result['rounds']):<3} "
+              f"grouped {fast * 1000:8.1f} ms   per-ballot {slow * 1000:9.1f} ms   "
+              f"({slow / fast:6.1f}x)  winners {result['winners']} {'OK' if match else 'MISMATCH ' + str(expected)}")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
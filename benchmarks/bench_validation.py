@@ -0,0 +1,93 @@
+"""
+Validation Microbenchmark
+Compares sanitize_input (fast path + reused Cleaner) with calling bleach.clean
+on every value, checks that both produce identical output over a corpus of
+plain and hostile inputs, and times single-form vs batch validation.
+Usage: python benchmarks/bench_validation.py [--rows 20000]
+"""
+import argparse
+import os
+import random
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import bleach
+
+from validation import sanitize_input, validate_form, validate_batch, VOTER_REGISTRATION_SCHEMA
+
+HOSTILE = [
+    '<script>alert(1)</script>', 'a & b', 'Tom &amp; Jerry', '<b>bold</b> name', '1 < 2 > 0',
+    '<img src=x onerror=alert(1)>', '&lt;escaped&gt;', 'tab\there', 'line\nbreak', 'cr\rlf\r\n',
+    'nul\x00byte', 'bell\x07', 'vt\x0bff\x0c', '\x1cfile\x1fsep', '  padded  ', '', 'ünïcödé 名前',
+    '<!-- comment -->text', '<<>>', '&', '&#60;', 'x￾y', '"quoted" \'single\'', '<a href="javascript:x">y</a>',
+]
+
+
+def reference(text):
+    """Original implementation: bleach on every value"""
+    if text is None:
+        return None
+    return bleach.clean(str(text).strip(), tags=[], strip=True)
+
+
+def corpus(n, rng):
+    alphabet = string.ascii_letters + string.digits + ' .-_@\t&<>\x00\x01\r\n'
+    values = [None] + HOSTILE + [chr(cp) for cp in range(0, 0x250)]
+    values += [''.join(rng.choice(alphabet) for _ in range(rng.randint(0, 30))) for _ in range(n)]
+    return values
+
+
+def check_equivalence(values):
+    mismatches = [v for v in values if sanitize_input(v) != reference(v)]
+    for value in mismatches[:10]:
+        print(f"  MISMATCH {value!r}: {sanitize_input(value)!r} != {reference(value)!r}")
+    return not mismatches
+
+
+def timed(fn, values, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for value in values:
+            fn(value)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=20000)
+    args = parser.parse_args()
+    rng = random.Random(42)
+
+    values = corpus(args.rows, rng)
+    ok = check_equivalence(values)
+    print(f"Equivalence with bleach.clean over {len(values)} values: {'OK' if ok else 'FAILED'}")
+
+    plain = [f'STU{i:05d}' for i in range(args.rows)]
+    marked = [f'<b>Name {i}</b> & co' for i in range(args.rows // 10)]
+    for label, sample in (('plain voter IDs', plain), ('values with markup', marked)):
+        old = timed(reference, sample)
+        new = timed(sanitize_input, sample)
+        print(f"  {label:<20} bleach.clean {old / len(sample) * 1e6:7.2f} us/value   "
+              f"sanitize_input {new / len(sample) * 1e6:7.2f} us/value   ({old / new:5.1f}x)")
+
+    rows = [{'voter_id': f'STU{i:05d}', 'name': f'Student {i}', 'email': f's{i}@college.edu',
+             'password': 'Passw0rdX', 'college_code': f'COL{i % 5}'} for i in range(args.rows)]
+    start = time.perf_counter()
+    single = [validate_form(VOTER_REGISTRATION_SCHEMA, row) for row in rows]
+    single_time = time.perf_counter() - start
+    start = time.perf_counter()
+    batch = validate_batch(VOTER_REGISTRATION_SCHEMA, rows)
+    batch_time = time.perf_counter() - start
+    assert single == batch
+    print(f"  {len(rows)} registration rows: validate_form {single_time * 1000:7.1f} ms   "
+          f"validate_batch {batch_time * 1000:7.1f} ms")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
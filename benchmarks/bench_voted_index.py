@@ -0,0 +1,78 @@
+"""
+Voted Bitmap Benchmark
+Builds a voted bitmap for one election with 1M registered voters (half of
+them voted) using voted_index.py, and compares memory, has_voted latency
+and turnout counting with a Python set and with an indexed SQLite lookup on
+a votes table of the same size.
+Usage: python benchmarks/bench_voted_index.py [--voters 1000000] [--lookups 200000]
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from voted_index import VotedIndex
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--voters', type=int, default=1000000)
+    parser.add_argument('--lookups', type=int, default=200000)
+    args = parser.parse_args()
+    rng = random.Random(42)
+    voted = rng.sample(range(1, args.voters + 1), args.voters // 2)
+    probes = [rng.randint(1, args.voters) for _ in range(args.lookups)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        index = VotedIndex(directory, lambda election_id: voted)
+        start = time.perf_counter()
+        index.count(1)
+        print(f"bitmap built from {len(voted)} votes in {time.perf_counter() - start:.2f} s, "
+              f"{index.memory_bytes() / 1024:.0f} KiB")
+        voted_set = set(voted)
+        set_bytes = sys.getsizeof(voted_set) + sum(sys.getsizeof(v) for v in voted)
+        print(f"Python set of voter ids: {set_bytes / 1024:.0f} KiB")
+
+        start = time.perf_counter()
+        hits = sum(index.has_voted(1, voter_id) for voter_id in probes)
+        bitmap_time = time.perf_counter() - start
+        assert hits == sum(voter_id in voted_set for voter_id in probes)
+
+        db = sqlite3.connect(os.path.join(directory, 'votes.db'))
+        db.execute('CREATE TABLE votes (id INTEGER PRIMARY KEY, voter_id INTEGER, election_id INTEGER, '
+                   'UNIQUE (voter_id, election_id))')
+        db.executemany('INSERT INTO votes (voter_id, election_id) VALUES (?, 1)', ((v,) for v in voted))
+        db.commit()
+        start = time.perf_counter()
+        db_hits = sum(db.execute('SELECT 1 FROM votes WHERE voter_id = ? AND election_id = 1',
+                                 (voter_id,)).fetchone() is not None for voter_id in probes)
+        sqlite_time = time.perf_counter() - start
+        assert db_hits == hits
+        print(f"has_voted x{args.lookups}:")
+        print(f"  bitmap   {bitmap_time / args.lookups * 1e6:8.2f} us/lookup")
+        print(f"  sqlite   {sqlite_time / args.lookups * 1e6:8.2f} us/lookup  "
+              f"({sqlite_time / bitmap_time:.1f}x slower)")
+
+        start = time.perf_counter()
+        count = index.count(1)
+        popcount_time = time.perf_counter() - start
+        start = time.perf_counter()
+        db_count = db.execute('SELECT COUNT(*) FROM votes WHERE election_id = 1').fetchone()[0]
+        count_time = time.perf_counter() - start
+        assert count == db_count == len(voted)
+        print(f"turnout count: popcount {popcount_time * 1000:.2f} ms, sqlite COUNT(*) {count_time * 1000:.2f} ms")
+
+        start = time.perf_counter()
+        index.mark(1, [args.voters + 1000])
+        print(f"mark a new voter (grows the file): {(time.perf_counter() - start) * 1e6:.0f} us")
+        db.close()
+        index.reset()
+
+
+if __name__ == '__main__':
+    main()
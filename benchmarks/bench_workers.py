@@ -0,0 +1,66 @@
+"""
+Gunicorn Worker Benchmark
+Starts gunicorn with and without --preload and reports per-worker boot time
+and memory (RSS and PSS) from the post_worker_init log line.
+Usage: python benchmarks/bench_workers.py [--workers 4]
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+BOOT_LINE = re.compile(r'booted in ([\d.]+) ms \(RSS (\d+) KiB, PSS (\d+) KiB')
+
+
+def run(workers, preload, port):
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ,
+                   DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'workers.db')}",
+                   WEB_CONCURRENCY=str(workers),
+                   GUNICORN_PRELOAD='1' if preload else '0',
+                   PORT=str(port))
+        env.pop('APP_PRELOAD', None)
+        proc = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', '-c', os.path.join(ROOT, 'gunicorn.conf.py'), 'app:app'],
+            cwd=ROOT, env=env, stderr=subprocess.PIPE, text=True
+        )
+        started = time.perf_counter()
+        boots = []
+        try:
+            for line in proc.stderr:
+                match = BOOT_LINE.search(line)
+                if match:
+                    boots.append(tuple(float(x) for x in match.groups()))
+                if len(boots) == workers or time.perf_counter() - started > 60:
+                    break
+            total = time.perf_counter() - started
+        finally:
+            proc.terminate()
+            proc.wait()
+    return boots, total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+
+    for preload in (False, True):
+        boots, total = run(args.workers, preload, args.port)
+        if not boots:
+            print(f"preload={preload}: no workers booted")
+            continue
+        n = len(boots)
+        print(f"preload={str(preload):<5}  all workers up in {total:5.2f}s  "
+              f"boot avg {sum(b[0] for b in boots) / n:7.1f} ms  "
+              f"RSS avg {sum(b[1] for b in boots) / n / 1024:6.1f} MiB  "
+              f"PSS avg {sum(b[2] for b in boots) / n / 1024:6.1f} MiB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+"""
+Bloom filter
+A compact set that answers "definitely absent" or "possibly present": a
+key's k bit positions are derived from one blake2b digest (double hashing),
+so a lookup is one hash and k bit tests. Keys cannot be removed; callers
+rebuild the filter once too many stale keys or additions have accumulated.
+"""
+import hashlib
+import math
+import threading
+
+
+class BloomFilter:
+    """
+    Args:
+        capacity: Keys the filter is sized for
+        error_rate: False positive rate at capacity
+    """
+
+    def __init__(self, capacity, error_rate=0.01):
+        self.capacity = max(int(capacity), 1)
+        self.error_rate = error_rate
+        self.size = max(64, int(-self.capacity * math.log(error_rate) / math.log(2) ** 2))  # bits
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+        # Setting a bit is a read-modify-write of its byte
+        self._lock = threading.Lock()
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, key):
+        positions = self._positions(key)
+        with self._lock:
+            for position in positions:
+                self.bits[position >> 3] |= 1 << (position & 7)
+            self.count += 1
+
+    def __contains__(self, key):
+        bits = self.bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+    @property
+    def saturated(self):
+        """More keys than the filter was sized for (false positive rate rising)"""
+        return self.count > self.capacity
+
+    def memory_bytes(self):
+        return len(self.bits)
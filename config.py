@@ -1,5 +1,6 @@
 import os
 from dotenv import load_dotenv
+from db_pool import InstrumentedQueuePool
 
 load_dotenv()
 
@@ -12,6 +13,147 @@ def get_database_url():
         return database_url
     return 'sqlite:///voting_system.db'
 
+def get_async_database_url(database_url):
+    """
+    Map the sync database URL to its async driver for the ASGI voter routes
+    (sqlite -> aiosqlite, postgresql -> asyncpg)
+    """
+    if database_url.startswith('sqlite:'):
+        return 'sqlite+aiosqlite:' + database_url[len('sqlite:'):]
+    if database_url.startswith('postgresql'):
+        from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+        parts = urlsplit(database_url)
+        # asyncpg takes ssl= instead of libpq's sslmode= and has no channel_binding
+        query = []
+        for key, value in parse_qsl(parts.query):
+            if key == 'sslmode':
+                query.append(('ssl', value))
+            elif key != 'channel_binding':
+                query.append((key, value))
+        return urlunsplit(('postgresql+asyncpg', parts.netloc, parts.path, urlencode(query), parts.fragment))
+    return database_url
+
+def get_db_profile(database_url):
+    """
+    Pick the deployment profile: DB_PROFILE if set, otherwise inferred
+    (sqlite URL -> sqlite, Vercel/Lambda -> serverless, else long-running)
+    """
+    profile = os.environ.get('DB_PROFILE', '').strip().lower()
+    if profile in ('serverless', 'long-running', 'sqlite'):
+        return profile
+    if database_url.startswith('sqlite'):
+        return 'sqlite'
+    if os.environ.get('VERCEL') or os.environ.get('AWS_LAMBDA_FUNCTION_NAME'):
+        return 'serverless'
+    return 'long-running'
+
+
+def sqlite_performance_mode(database_url):
+    """
+    Opt-in (SQLITE_PERFORMANCE_MODE=1) single-writer pool, read pool and
+    larger cache/mmap settings; needs a file database (in-memory has no readers)
+    """
+    enabled = os.environ.get('SQLITE_PERFORMANCE_MODE', '0').lower() in ('1', 'true', 'yes')
+    return enabled and database_url.startswith('sqlite:///') and ':memory:' not in database_url
+
+
+def background_db_threads(profile):
+    """
+    Threads of a worker process that hold database connections besides the
+    request threads: JobRunner threads (jobs run inline on serverless) and
+    the vote WAL flusher
+    """
+    jobs = 0 if profile == 'serverless' else int(os.environ.get('JOB_WORKERS') or 2)
+    flusher = 1 if os.environ.get('VOTE_WAL_PATH') else 0
+    return jobs + flusher
+
+
+def get_engine_options(database_url, profile):
+    """Build SQLALCHEMY_ENGINE_OPTIONS for the given deployment profile"""
+    background = background_db_threads(profile)
+    if profile == 'sqlite':
+        if sqlite_performance_mode(database_url):
+            # Single writer connection: writes queue on the pool in-process
+            # instead of retrying on "database is locked" (job and WAL
+            # flusher threads included); reads use the separate read pool
+            # (see SQLITE_READ_POOL_SIZE)
+            return {
+                'poolclass': InstrumentedQueuePool,
+                'pool_size': 1,
+                'max_overflow': 0,
+                'pool_timeout': 30,
+                'connect_args': {'check_same_thread': False, 'timeout': 30}
+            }
+        return {
+            'poolclass': InstrumentedQueuePool,
+            'pool_size': 5 + background,
+            'max_overflow': 10,
+            'connect_args': {'check_same_thread': False, 'timeout': 30}
+        }
+    
+    if profile == 'serverless':
+        # Optimized for Neon Pooler + Serverless: tiny pool, connections may
+        # have been dropped while the instance was frozen, so pre-ping
+        return {
+            'poolclass': InstrumentedQueuePool,
+            'pool_pre_ping': True,
+            'pool_size': 2 + background,
+            'max_overflow': 3,
+            'pool_recycle': 300,
+            'pool_timeout': 20,
+            'connect_args': {
+                'connect_timeout': 10,
+                'application_name': 'voting_system'
+            }
+        }
+    
+    # Long-running gunicorn host: one pooled connection per request and
+    # background thread, capped so workers * (pool + overflow) stays under
+    # DB_MAX_CONNECTIONS
+    workers = int(os.environ.get('WEB_CONCURRENCY') or os.environ.get('GUNICORN_WORKERS') or 2)
+    threads = int(os.environ.get('GUNICORN_THREADS') or os.environ.get('PYTHON_MAX_THREADS') or 1)
+    max_connections = int(os.environ.get('DB_MAX_CONNECTIONS') or 0)
+    pool_size = threads + background + 1
+    max_overflow = threads + background
+    if max_connections:
+        per_worker = max(1, max_connections // max(workers, 1))
+        pool_size = max(1, min(pool_size, per_worker))
+        max_overflow = max(0, min(max_overflow, per_worker - pool_size))
+    return {
+        'poolclass': InstrumentedQueuePool,
+        # Stale connections are recycled and invalidated on disconnect errors
+        # instead of paying a pre-ping round trip on every checkout
+        'pool_pre_ping': os.environ.get('DB_POOL_PRE_PING', '').lower() in ('1', 'true', 'yes'),
+        'pool_size': pool_size,
+        'max_overflow': max_overflow,
+        'pool_recycle': 1800,
+        'pool_timeout': 30,
+        'connect_args': {
+            'connect_timeout': 10,
+            'application_name': 'voting_system'
+        }
+    }
+
+
+# journal_mode=WAL lets readers proceed while a vote is being written;
+# synchronous=NORMAL is durable in WAL mode except on power loss;
+# foreign_keys=ON enforces the ON DELETE CASCADE rules (off by default)
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'foreign_keys': 'ON',
+}
+
+# Extra settings for SQLite performance mode: 256 MB memory-mapped I/O and a
+# 64 MB page cache per connection (negative cache_size is in KiB)
+SQLITE_PERFORMANCE_PRAGMAS = {
+    'mmap_size': 268435456,
+    'cache_size': -64000,
+    'temp_store': 'MEMORY',
+}
+
+
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-secret-key-change-in-production'
     
@@ -25,21 +167,118 @@ class Config:
     # Database Configuration
     SQLALCHEMY_DATABASE_URI = get_database_url()
     
+    # Optional vote sharding: one database per college when the URL contains
+    # {college_code} (e.g. sqlite:///shards/votes_{college_code}.db), otherwise
+    # one votes_<college> schema per college in the given database
+    VOTE_SHARD_URL = os.environ.get('VOTE_SHARD_URL')
+    
+    # Optional write-ahead vote buffer: votes are fsynced to this local file
+    # and group-committed to the database by a background flusher
+    VOTE_WAL_PATH = os.environ.get('VOTE_WAL_PATH')
+    VOTE_WAL_BATCH_SIZE = int(os.environ.get('VOTE_WAL_BATCH_SIZE') or 500)
+    VOTE_WAL_FLUSH_INTERVAL = float(os.environ.get('VOTE_WAL_FLUSH_INTERVAL') or 0.2)
+    
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SQLALCHEMY_ECHO = False
     
-    # Optimized for Neon Pooler + Serverless
-    SQLALCHEMY_ENGINE_OPTIONS = {
-        'pool_pre_ping': True,
-        'pool_size': 2,
-        'max_overflow': 3,
-        'pool_recycle': 300,
-        'pool_timeout': 20,
-        'connect_args': {
-            'connect_timeout': 10,
-            'application_name': 'voting_system'
-        }
-    }
+    # Pool settings depend on where we run (serverless / long-running / sqlite)
+    DB_PROFILE = get_db_profile(SQLALCHEMY_DATABASE_URI)
+    SQLALCHEMY_ENGINE_OPTIONS = get_engine_options(SQLALCHEMY_DATABASE_URI, DB_PROFILE)
+    SQLITE_PERFORMANCE_MODE = DB_PROFILE == 'sqlite' and sqlite_performance_mode(SQLALCHEMY_DATABASE_URI)
+    SQLITE_READ_POOL_SIZE = int(os.environ.get('SQLITE_READ_POOL_SIZE') or (8 + background_db_threads(DB_PROFILE)))
+    
+    # Compiled-template (Jinja bytecode) cache shared by all workers on a host;
+    # defaults to <instance_path>/jinja_cache
+    TEMPLATE_CACHE_DIR = os.environ.get('TEMPLATE_CACHE_DIR')
+    # Render the critical voter pages once before a worker accepts traffic
+    # (enabled by gunicorn.conf.py; off by default so serverless imports stay cheap)
+    TEMPLATE_WARMUP = os.environ.get('TEMPLATE_WARMUP', '0').lower() in ('1', 'true', 'yes')
+    
+    # Fingerprinted and gzip/brotli-compressed copies of static/ served from
+    # /assets. Built at deploy time (`python static_assets.py` or `flask
+    # build-assets`); workers only read its manifest
+    ASSET_BUILD_DIR = os.environ.get('ASSET_BUILD_DIR') or os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), 'static_build')
+    
+    # Uploaded candidate photos: upload limit and the local thumbnail cache
+    # (thumbnails live in the database; defaults to <instance_path>/photos)
+    CANDIDATE_PHOTO_MAX_BYTES = int(os.environ.get('CANDIDATE_PHOTO_MAX_BYTES') or 5 * 1024 * 1024)
+    CANDIDATE_PHOTO_CACHE_DIR = os.environ.get('CANDIDATE_PHOTO_CACHE_DIR')
+    MAX_CONTENT_LENGTH = CANDIDATE_PHOTO_MAX_BYTES + 1024 * 1024
+    
+    # Disposable email domain blocklist (one domain per line, reloaded on change)
+    EMAIL_BLOCKLIST_PATH = os.environ.get('EMAIL_BLOCKLIST_PATH') or os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), 'data', 'disposable_email_domains.txt')
+    EMAIL_VALIDATION_CACHE_SIZE = int(os.environ.get('EMAIL_VALIDATION_CACHE_SIZE') or 4096)
+    
+    # Optional per-election voted bitmaps (has_voted / turnout without a query),
+    # mmap-backed files shared by all workers; must be host-local and used by
+    # every process that writes votes
+    VOTED_INDEX_DIR = os.environ.get('VOTED_INDEX_DIR')
+    
+    # Bloom filter of registered voter IDs/emails so new ones skip the
+    # existence queries at registration (off by default on serverless, where
+    # every cold start would have to load it)
+    VOTER_FILTER_ENABLED = os.environ.get(
+        'VOTER_FILTER_ENABLED', '0' if DB_PROFILE == 'serverless' else '1').lower() in ('1', 'true', 'yes')
+    VOTER_FILTER_ERROR_RATE = float(os.environ.get('VOTER_FILTER_ERROR_RATE') or 0.01)
+    VOTER_FILTER_SYNC_INTERVAL = float(os.environ.get('VOTER_FILTER_SYNC_INTERVAL') or 5)
+    
+    # Colleges are cached per process (see CollegeRegistry); other workers see
+    # a newly added college after this many seconds, or on its first lookup
+    COLLEGE_REGISTRY_TTL = float(os.environ.get('COLLEGE_REGISTRY_TTL') or 300)
+    
+    # Eligible-voter counts used for turnout percentages are cached this long
+    VOTER_COUNT_CACHE_TTL = float(os.environ.get('VOTER_COUNT_CACHE_TTL') or 60)
+    
+    # Elections with at least this many votes are deleted in batches of
+    # BULK_DELETE_BATCH_SIZE by a background job (not on serverless)
+    BULK_DELETE_ASYNC_THRESHOLD = int(os.environ.get('BULK_DELETE_ASYNC_THRESHOLD') or 20000)
+    BULK_DELETE_BATCH_SIZE = int(os.environ.get('BULK_DELETE_BATCH_SIZE') or 5000)
+    
+    # Background jobs (/admin/jobs): threads per worker process, directory for
+    # exports and uploads (defaults to <instance_path>/jobs), and seconds
+    # without a progress heartbeat before a running job counts as interrupted
+    JOB_WORKERS = int(os.environ.get('JOB_WORKERS') or 2)
+    JOB_DIR = os.environ.get('JOB_DIR')
+    JOB_STALE_SECONDS = int(os.environ.get('JOB_STALE_SECONDS') or 300)
+    
+    # Connection pool of the async engine used by the ASGI voter routes (asgi.py)
+    ASYNC_DB_POOL_SIZE = int(os.environ.get('ASYNC_DB_POOL_SIZE') or 10)
+    
+    # Pending vote audit log entries hashed into the Merkle tree per transaction
+    AUDIT_BATCH_SIZE = int(os.environ.get('AUDIT_BATCH_SIZE') or 5000)
+    
+    # Structured JSON logging through a background queue listener: stdout,
+    # plus a size-rotated file when LOG_FILE is set (e.g. logs/voting_system.log)
+    LOG_LEVEL = (os.environ.get('LOG_LEVEL') or 'INFO').upper()
+    LOG_FILE = os.environ.get('LOG_FILE')
+    LOG_MAX_BYTES = int(os.environ.get('LOG_MAX_BYTES') or 10 * 1024 * 1024)
+    LOG_BACKUP_COUNT = int(os.environ.get('LOG_BACKUP_COUNT') or 5)
+    # Fraction of INFO records kept per high-volume event ('event=rate,...')
+    LOG_SAMPLE_RATES = os.environ.get('LOG_SAMPLE_RATES', 'request=0.1,vote_recorded=0.1')
+    # Requests slower than this are always logged, as warnings
+    LOG_SLOW_REQUEST_MS = float(os.environ.get('LOG_SLOW_REQUEST_MS') or 1000)
+    
+    # Admin profiler output (cProfile .prof files and folded sampling stacks);
+    # defaults to <instance_path>/profiles
+    PROFILE_DIR = os.environ.get('PROFILE_DIR')
+    PROFILE_MAX_REQUESTS = int(os.environ.get('PROFILE_MAX_REQUESTS') or 50)
+    PROFILE_MAX_SECONDS = int(os.environ.get('PROFILE_MAX_SECONDS') or 60)
+    
+    # Per-account failed-login throttle (login_throttle.py): LOGIN_MAX_FAILURES
+    # within LOGIN_FAILURE_WINDOW seconds lock the account for
+    # LOGIN_LOCKOUT_BASE seconds, doubling per lockout up to LOGIN_LOCKOUT_MAX.
+    # State file defaults to <instance_path>/login_throttle.bin
+    LOGIN_THROTTLE_PATH = os.environ.get('LOGIN_THROTTLE_PATH')
+    LOGIN_THROTTLE_SLOTS = int(os.environ.get('LOGIN_THROTTLE_SLOTS') or 65536)
+    LOGIN_MAX_FAILURES = int(os.environ.get('LOGIN_MAX_FAILURES') or 5)
+    LOGIN_FAILURE_WINDOW = int(os.environ.get('LOGIN_FAILURE_WINDOW') or 900)
+    LOGIN_LOCKOUT_BASE = int(os.environ.get('LOGIN_LOCKOUT_BASE') or 30)
+    LOGIN_LOCKOUT_MAX = int(os.environ.get('LOGIN_LOCKOUT_MAX') or 3600)
+    
+    # Flask-Limiter switch (e.g. RATELIMIT_ENABLED=0 for load tests)
+    RATELIMIT_ENABLED = os.environ.get('RATELIMIT_ENABLED', '1').lower() not in ('0', 'false', 'no')
     
     # Session configuration
     SESSION_COOKIE_SECURE = True
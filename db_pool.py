@@ -0,0 +1,157 @@
+"""
+Connection pool instrumentation and SQLite connection tuning
+Exposes checkout wait time, overflow usage and invalidations as metrics,
+and splits SQLite reads and writes across separate pools
+"""
+import threading
+import time
+
+from flask import current_app, has_app_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.pool import QueuePool
+
+
+class PoolMetrics:
+    """Thread-safe counters describing connection pool behaviour"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.checkouts = 0
+            self.checkout_wait_total = 0.0
+            self.checkout_wait_max = 0.0
+            self.checkout_timeouts = 0
+            self.overflow_in_use = 0
+            self.overflow_peak = 0
+            self.checked_out_peak = 0
+            self.connects = 0
+            self.invalidations = 0
+            self.soft_invalidations = 0
+
+    def record_checkout(self, wait, overflow, checked_out):
+        with self._lock:
+            self.checkouts += 1
+            self.checkout_wait_total += wait
+            self.checkout_wait_max = max(self.checkout_wait_max, wait)
+            self.overflow_in_use = max(overflow, 0)
+            self.overflow_peak = max(self.overflow_peak, self.overflow_in_use)
+            self.checked_out_peak = max(self.checked_out_peak, checked_out)
+
+    def record_timeout(self):
+        with self._lock:
+            self.checkout_timeouts += 1
+
+    def record_connect(self):
+        with self._lock:
+            self.connects += 1
+
+    def record_invalidation(self, soft=False):
+        with self._lock:
+            if soft:
+                self.soft_invalidations += 1
+            else:
+                self.invalidations += 1
+
+    def snapshot(self):
+        """Return the current counters as a JSON-serializable dict"""
+        with self._lock:
+            return {
+                'checkouts': self.checkouts,
+                'checkout_wait_avg_ms': round(self.checkout_wait_total / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+                'checkout_wait_max_ms': round(self.checkout_wait_max * 1000, 3),
+                'checkout_timeouts': self.checkout_timeouts,
+                'overflow_in_use': self.overflow_in_use,
+                'overflow_peak': self.overflow_peak,
+                'checked_out_peak': self.checked_out_peak,
+                'connects': self.connects,
+                'invalidations': self.invalidations,
+                'soft_invalidations': self.soft_invalidations,
+            }
+
+
+pool_metrics = PoolMetrics()
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that times how long each checkout waits for a connection"""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except Exception:
+            pool_metrics.record_timeout()
+            raise
+        pool_metrics.record_checkout(time.perf_counter() - start, self.overflow(), self.checkedout())
+        return connection
+
+
+def install_pool_listeners(engine):
+    """Count new connections and invalidations on an engine's pool"""
+    @event.listens_for(engine, 'connect')
+    def _on_connect(dbapi_connection, connection_record):
+        pool_metrics.record_connect()
+
+    @event.listens_for(engine, 'invalidate')
+    def _on_invalidate(dbapi_connection, connection_record, exception):
+        pool_metrics.record_invalidation()
+
+    @event.listens_for(engine, 'soft_invalidate')
+    def _on_soft_invalidate(dbapi_connection, connection_record, exception):
+        pool_metrics.record_invalidation(soft=True)
+
+
+def install_sqlite_pragmas(engine, pragmas):
+    """
+    Apply PRAGMA settings to every new SQLite connection
+
+    Args:
+        engine: SQLAlchemy engine using the sqlite dialect
+        pragmas: Mapping of pragma name to value, e.g. {'journal_mode': 'WAL'}
+    """
+    statements = [f'PRAGMA {name}={value}' for name, value in pragmas.items()]
+
+    @event.listens_for(engine, 'connect')
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for statement in statements:
+            cursor.execute(statement)
+        cursor.close()
+
+
+class ReadWriteSession(Session):
+    """
+    Session that sends plain reads to a separate read-only engine
+
+    Used in SQLite performance mode: all writes go through the (single
+    connection) default engine, so they are serialized in-process instead of
+    fighting over the database lock, while reads use a pool of query_only
+    connections that WAL lets run concurrently with the writer. Once a
+    transaction has written, it sticks to the writer until commit/rollback
+    so it always reads its own uncommitted changes.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and not self.info.get('wrote'):
+            is_dml = clause is not None and getattr(clause, 'is_dml', False)
+            reader = current_app.extensions.get('sqlite_read_engine') if has_app_context() else None
+            if reader is not None and not is_dml:
+                return reader
+        if clause is not None and getattr(clause, 'is_dml', False):
+            self.info['wrote'] = True
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+@event.listens_for(ReadWriteSession, 'after_flush')
+def _mark_session_wrote(session, flush_context):
+    session.info['wrote'] = True
+
+
+@event.listens_for(ReadWriteSession, 'after_commit')
+@event.listens_for(ReadWriteSession, 'after_rollback')
+def _reset_session_wrote(session):
+    session.info.pop('wrote', None)
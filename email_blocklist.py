@@ -0,0 +1,188 @@
+"""
+Disposable email domain blocklist
+Domains are loaded from a text file (one per line, '#' comments) into a
+compact sorted structure: every domain is stored with its labels reversed
+('mailinator.com' -> 'com.mailinator') in one newline-joined string plus an
+array of offsets, and looked up by binary search. Subdomains of a blocked
+domain are blocked too, and the file is re-read when it changes.
+"""
+import os
+import sys
+import threading
+import time
+from array import array
+from collections import OrderedDict
+
+
+def reverse_labels(domain):
+    """'x.mailinator.com' -> 'com.mailinator.x'"""
+    return '.'.join(reversed(domain.split('.')))
+
+
+class DomainBlocklist:
+    """
+    Suffix-matching domain blocklist with hot reload
+
+    Args:
+        path: Text file with one domain per line
+        check_interval: Minimum seconds between file modification checks
+    """
+
+    def __init__(self, path, check_interval=30):
+        self.path = path
+        self.check_interval = check_interval
+        self.loaded_at = None
+        self._mtime = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self._listeners = []
+        self._data = ('', array('I', [0]))
+        self.reload()
+
+    @staticmethod
+    def build(domains):
+        """
+        Build the (blob, offsets) pair from an iterable of domains
+
+        Returns:
+            Tuple (blob, offsets): entry i is blob[offsets[i]:offsets[i + 1] - 1]
+        """
+        keys = sorted({reverse_labels(d.strip().lower().rstrip('.')) for d in domains if d and d.strip()})
+        offsets = array('I', [0])
+        position = 0
+        for key in keys:
+            position += len(key) + 1
+            offsets.append(position)
+        blob = '\n'.join(keys) + ('\n' if keys else '')
+        return blob, offsets
+
+    def load_domains(self, domains):
+        """Replace the blocklist with an in-memory iterable of domains"""
+        data = self.build(domains)
+        with self._lock:
+            self._data = data
+            self.loaded_at = time.time()
+        for listener in self._listeners:
+            listener()
+
+    def reload(self):
+        """Re-read the data file (missing file = empty blocklist)"""
+        try:
+            mtime = os.path.getmtime(self.path)
+            with open(self.path, encoding='utf-8') as f:
+                domains = [line.split('#', 1)[0] for line in f]
+        except OSError:
+            mtime, domains = None, []
+        self._mtime = mtime
+        self._checked_at = time.monotonic()
+        self.load_domains(domains)
+
+    def maybe_reload(self):
+        """Reload if the file changed; checks the mtime at most every check_interval"""
+        now = time.monotonic()
+        if now - self._checked_at < self.check_interval:
+            return False
+        self._checked_at = now
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            mtime = None
+        if mtime == self._mtime:
+            return False
+        self.reload()
+        return True
+
+    def on_reload(self, callback):
+        """Register a callback run after every (re)load, e.g. to clear caches"""
+        self._listeners.append(callback)
+
+    def __len__(self):
+        return len(self._data[1]) - 1
+
+    def _contains_key(self, blob, offsets, key):
+        low, high = 0, len(offsets) - 1
+        while low < high:
+            mid = (low + high) // 2
+            entry = blob[offsets[mid]:offsets[mid + 1] - 1]
+            if entry < key:
+                low = mid + 1
+            elif entry > key:
+                high = mid
+            else:
+                return True
+        return False
+
+    def is_blocked(self, domain):
+        """
+        Check a domain and every parent domain against the blocklist
+
+        Args:
+            domain: Lower-case domain, e.g. 'x.mailinator.com'
+
+        Returns:
+            True if the domain or one of its parents is blocked
+        """
+        self.maybe_reload()
+        blob, offsets = self._data
+        labels = domain.split('.')
+        key = ''
+        for label in reversed(labels):
+            key = f'{key}.{label}' if key else label
+            if self._contains_key(blob, offsets, key):
+                return True
+        return False
+
+    def memory_bytes(self):
+        """Approximate size of the lookup structure"""
+        blob, offsets = self._data
+        return sys.getsizeof(blob) + sys.getsizeof(offsets)
+
+
+class SizedCache:
+    """
+    Thread-safe LRU cache with hit/miss/eviction counters
+
+    Args:
+        maxsize: Maximum number of cached entries
+    """
+
+    def __init__(self, maxsize=4096):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    def get_or_compute(self, key, compute):
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+            else:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return value
+        value = compute(key)
+        with self._lock:
+            self._data[key] = value
+            if len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def info(self):
+        """Return cache statistics as a JSON-serializable dict"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            }
@@ -0,0 +1,64 @@
+"""
+Gunicorn configuration
+The app is preloaded in the master so templates and other read-only state
+are built once and shared copy-on-write; each worker then reopens its own
+database connections and background threads in post_fork.
+"""
+import gc
+import os
+import sys
+import time
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get('WEB_CONCURRENCY') or 2)
+threads = int(os.environ.get('GUNICORN_THREADS') or 1)
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1').lower() not in ('0', 'false', 'no')
+
+# Render the critical templates in each worker before it accepts traffic
+os.environ.setdefault('TEMPLATE_WARMUP', '1')
+
+if preload_app:
+    # Tell app.py to leave per-process initialization to post_fork
+    os.environ['APP_PRELOAD'] = '1'
+
+
+def read_memory_kb():
+    """Return (rss, pss) of this process in KiB; PSS splits shared pages fairly"""
+    rss = pss = None
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    rss = int(line.split()[1])
+        with open('/proc/self/smaps_rollup') as f:
+            for line in f:
+                if line.startswith('Pss:'):
+                    pss = int(line.split()[1])
+    except OSError:
+        pass
+    return rss, pss
+
+
+def when_ready(server):
+    app_module = sys.modules.get('app')
+    if app_module is not None:
+        start = time.perf_counter()
+        app_module.warm_shared_state()
+        server.log.info("Warmed shared state in %.1f ms", (time.perf_counter() - start) * 1000)
+    # Keep preloaded objects out of the collector so gc does not touch (and
+    # un-share) their pages in the workers
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    worker.boot_started = time.perf_counter()
+    app_module = sys.modules.get('app')
+    if app_module is not None:
+        app_module.init_worker()
+
+
+def post_worker_init(worker):
+    boot_ms = (time.perf_counter() - getattr(worker, 'boot_started', time.perf_counter())) * 1000
+    rss, pss = read_memory_kb()
+    worker.log.info("Worker %s booted in %.1f ms (RSS %s KiB, PSS %s KiB, preload=%s)",
+                    worker.pid, boot_ms, rss, pss, preload_app)
@@ -1,5 +1,6 @@
 # Initialize Supabase Database
 from app import app, db, Admin
+from migrations import Migrator
 
 def init_database():
     """Create database tables and default admin"""
@@ -10,6 +11,11 @@ def init_database():
         db.create_all()
         print("✅ Database tables created successfully!")
         
+        # Indexes and data fixes for tables that already existed
+        applied = Migrator(db.engine).migrate()
+        if applied:
+            print(f"✅ Applied migrations: {', '.join(map(str, applied))}")
+        
         # Create default admin if doesn't exist
         if not Admin.query.filter_by(username='admin').first():
             admin = Admin(
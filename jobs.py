@@ -0,0 +1,192 @@
+"""
+In-process background jobs
+Long admin operations (deletions, exports, imports, reconciliation) run on a
+thread pool inside the worker process that accepted them, so the request
+returns a job id at once instead of hitting the gunicorn timeout. The job's
+state lives in the jobs table: any worker can show its progress, and a
+cancellation requested through another worker is seen at the handler's next
+progress report. No broker is involved; a job whose worker dies is marked
+interrupted once its heartbeat goes stale.
+"""
+import json
+import os
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+FINISHED = ('done', 'failed', 'cancelled', 'interrupted')
+
+
+class JobCancelled(Exception):
+    """Raised inside a handler once cancellation was requested"""
+
+
+class JobContext:
+    """
+    Handed to a job handler
+
+    Handlers call progress() regularly; it stores the progress at most every
+    `progress_interval` seconds (which doubles as the heartbeat) and raises
+    JobCancelled when the job was cancelled in the meantime. Storing commits
+    the session, so call it between the handler's own transactions. A
+    handler's return value is kept in `result` (JSON).
+    """
+
+    def __init__(self, runner, job_id, params):
+        self.runner = runner
+        self.job_id = job_id
+        self.params = params
+        self.result = None
+        self._last_flush = 0.0
+
+    def progress(self, done, total=None, message=None, force=False):
+        now = time.monotonic()
+        if not force and now - self._last_flush < self.runner.progress_interval:
+            return
+        self._last_flush = now
+        fields = {'progress_done': done, 'updated_at': datetime.now()}
+        if total is not None:
+            fields['progress_total'] = total
+        if message is not None:
+            fields['message'] = message[:255]
+        status = self.runner.update(self.job_id, **fields)
+        if status == 'cancelling':
+            raise JobCancelled()
+
+    def check_cancelled(self):
+        """Raise JobCancelled if requested (also refreshes the heartbeat)"""
+        if self.runner.update(self.job_id, updated_at=datetime.now()) == 'cancelling':
+            raise JobCancelled()
+
+
+class JobRunner:
+    """
+    Thread pool running registered job kinds
+
+    Args:
+        app: Flask app (handlers run inside its app context)
+        db: Flask-SQLAlchemy extension
+        model: The Job model
+        max_workers: Jobs running at once in this process
+        inline: Run jobs inside the submitting request (serverless
+            platforms, where threads do not outlive the request)
+        stale_after: Seconds without a heartbeat before a running job
+            is considered interrupted
+    """
+
+    def __init__(self, app, db, model, max_workers=2, inline=False, progress_interval=1.0, stale_after=300):
+        self.app = app
+        self.db = db
+        self.model = model
+        self.max_workers = max_workers
+        self.inline = inline
+        self.progress_interval = progress_interval
+        self.stale_after = stale_after
+        self.kinds = {}  # kind -> {'handler', 'title', 'cancellable'}
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def register(self, kind, title, cancellable=True):
+        """Decorator registering handler(ctx, **params) for a job kind"""
+        def decorator(handler):
+            self.kinds[kind] = {'handler': handler, 'title': title, 'cancellable': cancellable}
+            return handler
+        return decorator
+
+    def _get_executor(self):
+        with self._lock:
+            # A pool inherited through fork has no threads: start a new one
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='job')
+                self._pid = os.getpid()
+            return self._executor
+
+    def submit(self, kind, params, created_by=None, college_code=None, title=None):
+        """
+        Store a queued job and start it
+
+        Returns:
+            The job id
+        """
+        spec = self.kinds[kind]
+        job = self.model(kind=kind, title=(title or spec['title'])[:200], status='queued',
+                         params=json.dumps(params), created_by=created_by, college_code=college_code,
+                         progress_done=0, updated_at=datetime.now())
+        self.db.session.add(job)
+        self.db.session.commit()
+        if self.inline:
+            self._run(job.id)
+        else:
+            self._get_executor().submit(self._run, job.id)
+        return job.id
+
+    def update(self, job_id, **fields):
+        """Write job fields in their own transaction; returns the job's status"""
+        session = self.db.session
+        job = session.get(self.model, job_id, populate_existing=True)
+        if job is None:
+            return None
+        for name, value in fields.items():
+            setattr(job, name, value)
+        session.commit()
+        return job.status
+
+    def cancel(self, job_id):
+        """
+        Request cancellation: queued jobs never start, running ones stop at
+        their next progress report
+
+        Returns:
+            False if the job is finished or cannot be cancelled
+        """
+        job = self.db.session.get(self.model, job_id)
+        if job is None or job.status in FINISHED or not self.kinds.get(job.kind, {}).get('cancellable'):
+            return False
+        job.status = 'cancelling'
+        self.db.session.commit()
+        return True
+
+    def _run(self, job_id):
+        with self.app.app_context():
+            try:
+                job = self.db.session.get(self.model, job_id)
+                if job.status == 'cancelling':
+                    self.update(job_id, status='cancelled', finished_at=datetime.now())
+                    return
+                if job.status != 'queued':
+                    return
+                spec = self.kinds[job.kind]
+                params = json.loads(job.params or '{}')
+                self.update(job_id, status='running', started_at=datetime.now(), updated_at=datetime.now())
+                ctx = JobContext(self, job_id, params)
+                try:
+                    ctx.result = spec['handler'](ctx, **params)
+                except JobCancelled:
+                    self.db.session.rollback()
+                    self.update(job_id, status='cancelled', finished_at=datetime.now(),
+                                result=json.dumps(ctx.result) if ctx.result is not None else None)
+                    return
+                self.update(job_id, status='done', finished_at=datetime.now(), updated_at=datetime.now(),
+                            result=json.dumps(ctx.result) if ctx.result is not None else None)
+            except Exception as e:
+                self.db.session.rollback()
+                self.app.logger.exception('Job %s failed', job_id, extra={'event': 'job_failed', 'job_id': job_id})
+                self.update(job_id, status='failed', error=f'{e}\n{traceback.format_exc(limit=5)}',
+                            finished_at=datetime.now())
+            finally:
+                self.db.session.remove()
+
+    def expire_stale(self):
+        """Mark running jobs without a recent heartbeat (dead worker) as interrupted"""
+        cutoff = datetime.now() - timedelta(seconds=self.stale_after)
+        stale = self.model.query.filter(self.model.status.in_(('running', 'cancelling')),
+                                        self.model.updated_at < cutoff).all()
+        for job in stale:
+            job.status = 'interrupted'
+            job.finished_at = datetime.now()
+        if stale:
+            self.db.session.commit()
+        return len(stale)
@@ -0,0 +1,219 @@
+"""
+Per-account failed-login throttle
+Failures are counted per account in a sliding window (current and previous
+window counters, the previous one weighted by how much of it still
+overlaps). Reaching max_failures locks the account for base_lockout
+seconds, doubling with every further lockout up to max_lockout; a locked
+account is rejected before its password hash is computed, whatever IP the
+attempts come from.
+
+State is a fixed-size open-addressing table in a file mapped with
+mmap(MAP_SHARED): 32 bytes per account slot, shared by every worker on the
+host and kept across worker restarts. Slots of idle accounts are reused,
+slots of locked accounts never are: an account whose probe chain is full of
+locked slots is treated as locked itself (fail closed). Counters of failures, lockouts and avoided hash computations sit in the
+header. As with voted_index.py, writers hold an flock plus a thread lock,
+and reset() must run after fork.
+"""
+import fcntl
+import hashlib
+import mmap
+import os
+import struct
+import threading
+import time
+from contextlib import contextmanager
+
+MAGIC = b'LOGINTH1'
+HEADER = struct.Struct('<8sQQQ')  # magic, failures, lockouts, hashes_avoided
+# key hash, window number, failures in that window, in the one before,
+# lockout level, locked until (epoch seconds)
+SLOT = struct.Struct('<QIHHId4x')
+PROBES = 16
+
+
+def account_key(*parts):
+    """64-bit slot key of an account (0 marks an empty slot)"""
+    digest = hashlib.blake2b(':'.join(parts).encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'little') or 1
+
+
+class LoginThrottle:
+    """
+    Args:
+        path: Host-local state file
+        slots: Accounts tracked at once (file size is 32 bytes per slot)
+        max_failures: Failures within `window` seconds that lock the account
+        base_lockout / max_lockout: First and longest lockout in seconds
+    """
+
+    def __init__(self, path, slots=65536, max_failures=5, window=900, base_lockout=30, max_lockout=3600):
+        self.path = path
+        self.slots = slots
+        self.max_failures = max_failures
+        self.window = window
+        self.base_lockout = base_lockout
+        self.max_lockout = max_lockout
+        self._lock = threading.Lock()
+        self._fd = None
+        self._map = None
+
+    def _open(self):
+        if self._map is not None:
+            return
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        size = HEADER.size + self.slots * SLOT.size
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        try:
+            current = os.fstat(fd).st_size
+            if current != size:
+                # New file, or the slot count changed: start empty
+                os.ftruncate(fd, 0)
+                os.ftruncate(fd, size)
+            self._map = mmap.mmap(fd, size, mmap.MAP_SHARED, mmap.PROT_READ | mmap.PROT_WRITE)
+            if self._map[:len(MAGIC)] != MAGIC:
+                HEADER.pack_into(self._map, 0, MAGIC, 0, 0, 0)
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+        self._fd = fd
+
+    @contextmanager
+    def _locked(self):
+        with self._lock:
+            self._open()
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                yield self._map
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def _count(self, data, field, amount=1):
+        values = list(HEADER.unpack_from(data, 0))
+        values[field] += amount
+        HEADER.pack_into(data, 0, *values)
+
+    def _probe_offsets(self, key):
+        start = key % self.slots
+        return [HEADER.size + ((start + probe) % self.slots) * SLOT.size for probe in range(PROBES)]
+
+    def _find(self, data, key, now, create):
+        """
+        Offset of the account's slot (or of a reusable one if create), or
+        None; with create, None means every probed slot is locked
+        """
+        reusable = None
+        oldest = None
+        for offset in self._probe_offsets(key):
+            slot_key, window, _, _, _, locked_until = SLOT.unpack_from(data, offset)
+            if slot_key == key:
+                return offset
+            if not create:
+                continue
+            if slot_key == 0 or (locked_until <= now and window < int(now // self.window) - 1):
+                # Empty, or no lock and no failures left in the window
+                if reusable is None:
+                    reusable = offset
+            elif locked_until <= now and (oldest is None or window < oldest[0]):
+                oldest = (window, offset)
+        if not create:
+            return None
+        if reusable is None and oldest is None:
+            return None
+        # Every probed slot is busy: evict the unlocked one idle the longest
+        offset = reusable if reusable is not None else oldest[1]
+        SLOT.pack_into(data, offset, key, 0, 0, 0, 0, 0.0)
+        return offset
+
+    def _chain_locked_until(self, data, key, now):
+        """When the first probed slot of an untracked account unlocks (0 if one is free now)"""
+        until = None
+        for offset in self._probe_offsets(key):
+            slot_key, _, _, _, _, locked_until = SLOT.unpack_from(data, offset)
+            if slot_key == 0 or locked_until <= now:
+                return 0
+            until = locked_until if until is None else min(until, locked_until)
+        return until
+
+    def locked_for(self, *account):
+        """
+        Seconds the account stays locked (0 if it may log in); a locked
+        attempt is counted as a hash computation avoided
+        """
+        key = account_key(*account)
+        now = time.time()
+        with self._locked() as data:
+            offset = self._find(data, key, now, create=False)
+            if offset is None:
+                # Untracked, but no slot could track it: refuse until one unlocks
+                locked_until = self._chain_locked_until(data, key, now)
+            else:
+                locked_until = SLOT.unpack_from(data, offset)[5]
+            if locked_until <= now:
+                return 0
+            self._count(data, 3)
+            return int(locked_until - now) + 1
+
+    def record_failure(self, *account):
+        """Count a failed login; returns the lockout in seconds if it locked the account"""
+        key = account_key(*account)
+        now = time.time()
+        current_window = int(now // self.window)
+        with self._locked() as data:
+            offset = self._find(data, key, now, create=True)
+            self._count(data, 1)
+            if offset is None:
+                # Every probed slot is locked; locked_for refuses the account
+                return 0
+            _, window, failures, previous, level, locked_until = SLOT.unpack_from(data, offset)
+            if window != current_window:
+                previous = failures if window == current_window - 1 else 0
+                failures = 0
+            failures += 1
+            overlap = 1 - (now % self.window) / self.window
+            lockout = 0
+            if previous * overlap + failures >= self.max_failures:
+                lockout = min(self.base_lockout * 2 ** level, self.max_lockout)
+                locked_until = now + lockout
+                level, failures, previous = level + 1, 0, 0
+                self._count(data, 2)
+            SLOT.pack_into(data, offset, key, current_window, min(failures, 0xFFFF), min(previous, 0xFFFF),
+                           level, locked_until)
+            return lockout
+
+    def record_success(self, *account):
+        """Forget the account's failures and lockout level"""
+        key = account_key(*account)
+        with self._locked() as data:
+            offset = self._find(data, key, time.time(), create=False)
+            if offset is not None:
+                SLOT.pack_into(data, offset, 0, 0, 0, 0, 0, 0.0)
+
+    def metrics(self):
+        now = time.time()
+        with self._locked() as data:
+            _, failures, lockouts, hashes_avoided = HEADER.unpack_from(data, 0)
+            tracked = locked = 0
+            for offset in range(HEADER.size, len(data), SLOT.size):
+                slot_key, _, _, _, _, locked_until = SLOT.unpack_from(data, offset)
+                if slot_key:
+                    tracked += 1
+                    locked += locked_until > now
+        return {
+            'failures': failures,
+            'lockouts': lockouts,
+            'hashes_avoided': hashes_avoided,
+            'accounts_tracked': tracked,
+            'accounts_locked': locked,
+            'slots': self.slots,
+            'memory_bytes': HEADER.size + self.slots * SLOT.size,
+        }
+
+    def reset(self):
+        """Drop this process's map and file description (after fork)"""
+        with self._lock:
+            if self._map is not None:
+                self._map.close()
+                os.close(self._fd)
+            self._map = None
+            self._fd = None
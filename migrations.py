@@ -0,0 +1,436 @@
+"""
+Versioned schema migrations
+db.create_all() only creates missing tables; columns, indexes, constraints
+and data changes on tables that already hold data go through the numbered
+migrations in MIGRATIONS, applied in order and recorded in the
+schema_migrations table (the only record of the schema state: a model change
+on an existing table needs a new migration). They are written to run while
+an election is in progress:
+
+- indexes are built with CREATE INDEX CONCURRENTLY on PostgreSQL (no write
+  lock). SQLite has no online index build: each index is built in its own
+  transaction, one at a time with a pause in between, so writers wait for
+  one index build at most (WAL readers are never blocked)
+- columns are added nullable or with a constant default (a metadata-only
+  change) and backfilled in primary key ranges of chunk_size rows, one
+  short transaction per chunk
+- foreign keys are recreated NOT VALID and validated without blocking
+  writes (PostgreSQL)
+
+Every operation is idempotent, so a migration interrupted halfway is simply
+re-run, and on a fresh database (where create_all already built everything)
+migrations only get recorded. The dry run (`python migrations.py
+--dry-run`) estimates rows, duration and locking of each pending operation
+from cheap row-count estimates, without touching the data.
+
+Usage: python migrations.py [--dry-run] [--status] [--target VERSION]
+"""
+import argparse
+import logging
+import time
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, inspect, text
+from sqlalchemy.exc import SQLAlchemyError
+
+logger = logging.getLogger(__name__)
+
+migration_metadata = MetaData()
+schema_migrations = Table(
+    'schema_migrations', migration_metadata,
+    Column('version', Integer, primary_key=True, autoincrement=False),
+    Column('name', String(200), nullable=False),
+    Column('applied_at', DateTime, nullable=False),
+    Column('duration_ms', Integer),
+)
+
+# Rough rates used by the dry run (rows per second, measured on SQLite;
+# concurrent PostgreSQL builds scan the table twice)
+INDEX_ROWS_PER_SECOND = {'sqlite': 700000, 'postgresql': 300000}
+BACKFILL_ROWS_PER_SECOND = 200000
+
+# Pause between SQLite index builds / backfill chunks, letting queued writers in
+DEFAULT_PAUSE = 0.05
+
+
+class MigrationError(Exception):
+    """An operation could not be applied (the migration is not recorded)"""
+
+
+def estimate_rows(conn, table):
+    """Cheap row-count estimate: planner statistics or the rowid range"""
+    if conn.dialect.name == 'postgresql':
+        rows = conn.execute(text('SELECT reltuples::bigint FROM pg_class WHERE relname = :table'),
+                            {'table': table}).scalar()
+        return max(rows or 0, 0)
+    low, high = conn.execute(text(f'SELECT min(id), max(id) FROM {table}')).one()
+    return 0 if low is None else high - low + 1
+
+
+class CreateIndex:
+    def __init__(self, table, name, columns, unique=False):
+        self.table = table
+        self.name = name
+        self.columns = columns
+        self.unique = unique
+
+    def describe(self):
+        kind = 'unique index' if self.unique else 'index'
+        return f"{kind} {self.name} on {self.table} ({', '.join(self.columns)})"
+
+    def _state(self, conn):
+        """'valid', 'invalid' (left by a failed concurrent build) or None"""
+        if conn.dialect.name == 'postgresql':
+            valid = conn.execute(text(
+                'SELECT i.indisvalid FROM pg_class c JOIN pg_index i ON i.indexrelid = c.oid '
+                'WHERE c.relname = :name'), {'name': self.name}).scalar()
+            return None if valid is None else ('valid' if valid else 'invalid')
+        exists = any(index['name'] == self.name for index in inspect(conn).get_indexes(self.table))
+        return 'valid' if exists else None
+
+    def estimate(self, conn):
+        if self._state(conn) == 'valid':
+            return {'rows': 0, 'seconds': 0.0, 'locking': 'already exists'}
+        rows = estimate_rows(conn, self.table)
+        seconds = rows / INDEX_ROWS_PER_SECOND.get(conn.dialect.name, INDEX_ROWS_PER_SECOND['sqlite'])
+        if conn.dialect.name == 'postgresql':
+            locking = 'no write lock (CONCURRENTLY); waits for open transactions'
+        else:
+            locking = f'blocks writes to {self.table} for ~{seconds:.1f}s; reads unaffected'
+        return {'rows': rows, 'seconds': seconds, 'locking': locking}
+
+    def apply(self, engine, pause):
+        unique = 'UNIQUE ' if self.unique else ''
+        columns = ', '.join(self.columns)
+        if engine.dialect.name == 'postgresql':
+            # CONCURRENTLY cannot run inside a transaction block
+            with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+                state = self._state(conn)
+                if state == 'valid':
+                    return
+                if state == 'invalid':
+                    # A failed concurrent build leaves an invalid index behind
+                    conn.execute(text(f'DROP INDEX CONCURRENTLY IF EXISTS {self.name}'))
+                conn.execute(text(f'CREATE {unique}INDEX CONCURRENTLY {self.name} ON {self.table} ({columns})'))
+                if self._state(conn) != 'valid':
+                    raise MigrationError(f'Concurrent build of {self.name} left an invalid index')
+            return
+        with engine.begin() as conn:
+            if self._state(conn) == 'valid':
+                return
+            conn.execute(text(f'CREATE {unique}INDEX {self.name} ON {self.table} ({columns})'))
+        time.sleep(pause)
+
+
+class Backfill:
+    """
+    UPDATE table SET assignments WHERE condition, in primary key ranges
+
+    Args:
+        unresolved: Condition matching rows the backfill deliberately left
+            alone; they are logged for an admin to resolve
+    """
+
+    def __init__(self, table, assignments, condition, chunk_size=5000, unresolved=None):
+        self.table = table
+        self.assignments = assignments
+        self.condition = condition
+        self.chunk_size = chunk_size
+        self.unresolved = unresolved
+
+    def describe(self):
+        return f'backfill {self.table}: SET {self.assignments} WHERE {self.condition}'
+
+    def estimate(self, conn):
+        rows = estimate_rows(conn, self.table)
+        chunks = -(-rows // self.chunk_size)
+        return {'rows': rows, 'seconds': rows / BACKFILL_ROWS_PER_SECOND,
+                'locking': f'{chunks} transactions of at most {self.chunk_size} rows'}
+
+    def apply(self, engine, pause):
+        with engine.connect() as conn:
+            low, high = conn.execute(text(f'SELECT min(id), max(id) FROM {self.table}')).one()
+        if low is None:
+            return
+        updated = 0
+        for start in range(low, high + 1, self.chunk_size):
+            with engine.begin() as conn:
+                updated += conn.execute(text(
+                    f'UPDATE {self.table} SET {self.assignments} '
+                    f'WHERE id >= :start AND id < :end AND ({self.condition})'),
+                    {'start': start, 'end': start + self.chunk_size}).rowcount
+            if pause:
+                time.sleep(pause)
+        logger.info('Backfilled %s rows of %s', updated, self.table,
+                    extra={'event': 'migration_backfill', 'table': self.table, 'rows': updated})
+        if self.unresolved:
+            with engine.connect() as conn:
+                ids = conn.execute(text(f'SELECT id FROM {self.table} WHERE {self.unresolved} ORDER BY id')).scalars().all()
+            if ids:
+                logger.warning('%s rows of %s need manual attention (ids %s)', len(ids), self.table,
+                               ', '.join(map(str, ids[:50])) + (' ...' if len(ids) > 50 else ''),
+                               extra={'event': 'migration_backfill_unresolved', 'table': self.table,
+                                      'rows': len(ids)})
+
+
+class AddColumn:
+    """
+    Add a nullable column, then optionally backfill it
+
+    Args:
+        default: SQL literal for a constant DEFAULT (metadata-only on
+            SQLite and PostgreSQL 11+, existing rows read it without a rewrite)
+        backfill: SQL expression computing the value of existing rows
+    """
+
+    def __init__(self, table, column, column_type, default=None, backfill=None, chunk_size=5000):
+        self.table = table
+        self.column = column
+        self.column_type = column_type
+        self.default = default
+        self.backfill = Backfill(table, f'{column} = {backfill}', f'{column} IS NULL', chunk_size) if backfill else None
+
+    def describe(self):
+        suffix = f' DEFAULT {self.default}' if self.default is not None else ''
+        if self.backfill:
+            suffix += f' = {self.backfill.assignments.split("=", 1)[1].strip()}'
+        return f'add column {self.table}.{self.column} {self.column_type}{suffix}'
+
+    def _exists(self, conn):
+        return any(column['name'] == self.column for column in inspect(conn).get_columns(self.table))
+
+    def estimate(self, conn):
+        if self.backfill:
+            estimate = self.backfill.estimate(conn)
+            estimate['locking'] = 'metadata-only ALTER; ' + estimate['locking']
+            return estimate
+        return {'rows': 0, 'seconds': 0.0, 'locking': 'metadata-only ALTER'}
+
+    def apply(self, engine, pause):
+        with engine.begin() as conn:
+            if not self._exists(conn):
+                default = f' DEFAULT {self.default}' if self.default is not None else ''
+                conn.execute(text(f'ALTER TABLE {self.table} ADD COLUMN {self.column} {self.column_type}{default}'))
+        if self.backfill:
+            self.backfill.apply(engine, pause)
+
+
+class SetOnDelete:
+    """
+    Change the ON DELETE rule of a foreign key (PostgreSQL only; SQLite
+    cannot alter constraints, and the application deletes children
+    explicitly anyway)
+
+    The constraint is recreated NOT VALID, which only needs a brief lock,
+    then validated in a second transaction that does not block writes.
+    """
+
+    def __init__(self, table, column, referred, ondelete):
+        self.table = table
+        self.column = column
+        self.referred = referred  # 'table.column'
+        self.ondelete = ondelete
+
+    def describe(self):
+        return f'foreign key {self.table}.{self.column} -> {self.referred} ON DELETE {self.ondelete}'
+
+    def _outdated(self, conn):
+        """Name of the constraint if its rule differs, else None"""
+        for existing in inspect(conn).get_foreign_keys(self.table):
+            if existing['constrained_columns'] != [self.column]:
+                continue
+            current = (existing['options'].get('ondelete') or '').upper()
+            return existing['name'] if current != self.ondelete.upper() else None
+        return None
+
+    def estimate(self, conn):
+        if conn.dialect.name != 'postgresql':
+            return {'rows': 0, 'seconds': 0.0, 'locking': 'skipped on SQLite'}
+        if self._outdated(conn) is None:
+            return {'rows': 0, 'seconds': 0.0, 'locking': 'already up to date'}
+        rows = estimate_rows(conn, self.table)
+        return {'rows': rows, 'seconds': rows / INDEX_ROWS_PER_SECOND['postgresql'],
+                'locking': 'brief lock to swap the constraint; validation does not block writes'}
+
+    def apply(self, engine, pause):
+        if engine.dialect.name != 'postgresql':
+            return
+        referred_table, referred_column = self.referred.split('.')
+        with engine.begin() as conn:
+            name = self._outdated(conn)
+            if name is None:
+                return
+            conn.execute(text(f'ALTER TABLE {self.table} DROP CONSTRAINT {name}'))
+            conn.execute(text(
+                f'ALTER TABLE {self.table} ADD CONSTRAINT {name} FOREIGN KEY ({self.column}) '
+                f'REFERENCES {referred_table} ({referred_column}) ON DELETE {self.ondelete} NOT VALID'))
+        with engine.begin() as conn:
+            conn.execute(text(f'ALTER TABLE {self.table} VALIDATE CONSTRAINT {name}'))
+
+
+class Migration:
+    def __init__(self, version, name, operations):
+        self.version = version
+        self.name = name
+        self.operations = operations
+
+
+MIGRATIONS = [
+    Migration(1, 'Lowercase voter emails', [
+        # Registration stores emails lowercased; older rows may not be. Only
+        # addresses no other row shares in any case are lowercased (two rows
+        # would collide on uq_voters_email); the rest are logged for an admin
+        Backfill('voters', 'email = lower(email)',
+                 'email <> lower(email) AND lower(email) IN '
+                 '(SELECT lower(email) FROM voters GROUP BY lower(email) HAVING count(*) = 1)',
+                 unresolved='email <> lower(email)'),
+    ]),
+    Migration(2, 'Unique voter IDs and emails', [
+        CreateIndex('voters', 'uq_voters_voter_id', ['voter_id'], unique=True),
+        CreateIndex('voters', 'uq_voters_email', ['email'], unique=True),
+    ]),
+    Migration(3, 'Lookup indexes for tallies, deletes and per-college lists', [
+        CreateIndex('votes', 'ix_votes_election_candidate', ['election_id', 'candidate_id']),
+        CreateIndex('votes', 'ix_votes_candidate_id', ['candidate_id']),
+        CreateIndex('candidates', 'ix_candidates_election_id', ['election_id']),
+        CreateIndex('voters', 'ix_voters_college_code', ['college_code']),
+        CreateIndex('elections', 'ix_elections_college_code', ['college_code']),
+    ]),
+    Migration(4, 'Ranked ballots and uploaded candidate photos', [
+        AddColumn('elections', 'voting_method', 'VARCHAR(20)', default="'plurality'"),
+        AddColumn('elections', 'seats', 'INTEGER', default='1'),
+        AddColumn('candidates', 'photo_key', 'VARCHAR(32)'),
+        AddColumn('votes', 'rankings', 'VARCHAR(255)'),
+    ]),
+    Migration(5, 'Cascade deletes of election children', [
+        SetOnDelete('candidates', 'election_id', 'elections.id', 'CASCADE'),
+        SetOnDelete('votes', 'voter_id', 'voters.id', 'CASCADE'),
+        SetOnDelete('votes', 'election_id', 'elections.id', 'CASCADE'),
+        SetOnDelete('votes', 'candidate_id', 'candidates.id', 'CASCADE'),
+        SetOnDelete('vote_rollups', 'election_id', 'elections.id', 'CASCADE'),
+        SetOnDelete('result_snapshots', 'election_id', 'elections.id', 'CASCADE'),
+    ]),
+]
+
+LATEST_VERSION = MIGRATIONS[-1].version
+
+
+def current_version(engine):
+    """Highest applied version (one indexed query), or None on a database never migrated"""
+    try:
+        with engine.connect() as conn:
+            return conn.execute(text('SELECT max(version) FROM schema_migrations')).scalar()
+    except SQLAlchemyError:
+        return None
+
+
+class Migrator:
+    """
+    Apply MIGRATIONS to a database
+
+    Args:
+        engine: Writer engine of the main database
+        pause: Seconds between SQLite index builds and backfill chunks
+    """
+
+    def __init__(self, engine, migrations=MIGRATIONS, pause=DEFAULT_PAUSE):
+        self.engine = engine
+        self.migrations = migrations
+        self.pause = pause
+
+    def applied(self):
+        migration_metadata.create_all(self.engine)
+        with self.engine.connect() as conn:
+            return set(conn.execute(text('SELECT version FROM schema_migrations')).scalars())
+
+    def pending(self, target=None):
+        applied = self.applied()
+        return [migration for migration in self.migrations
+                if migration.version not in applied and (target is None or migration.version <= target)]
+
+    def plan(self, target=None):
+        """
+        Dry run: pending migrations with a cost estimate per operation
+
+        Returns:
+            List of dicts (version, name, operations: [{description, rows,
+            seconds, locking}])
+        """
+        plan = []
+        pending = self.pending(target)
+        # One connection at a time: the SQLite writer pool holds a single one
+        with self.engine.connect() as conn:
+            for migration in pending:
+                operations = []
+                for operation in migration.operations:
+                    try:
+                        estimate = operation.estimate(conn)
+                    except Exception as e:
+                        # e.g. a table created by an earlier pending migration
+                        estimate = {'rows': None, 'seconds': None, 'locking': f'cannot estimate ({e.__class__.__name__})'}
+                    operations.append(dict(estimate, description=operation.describe()))
+                plan.append({'version': migration.version, 'name': migration.name, 'operations': operations})
+        return plan
+
+    def migrate(self, target=None):
+        """
+        Apply pending migrations in order, stopping at the first failure
+
+        Returns:
+            List of applied versions
+
+        Raises:
+            MigrationError: (or a database error) from the failed migration;
+            earlier migrations stay applied
+        """
+        done = []
+        for migration in self.pending(target):
+            started = time.monotonic()
+            logger.info('Applying migration %s: %s', migration.version, migration.name,
+                        extra={'event': 'migration_start', 'version': migration.version})
+            for operation in migration.operations:
+                operation.apply(self.engine, self.pause)
+            duration_ms = int((time.monotonic() - started) * 1000)
+            with self.engine.begin() as conn:
+                conn.execute(schema_migrations.insert().values(
+                    version=migration.version, name=migration.name, applied_at=datetime.now(),
+                    duration_ms=duration_ms))
+            logger.info('Applied migration %s in %s ms', migration.version, duration_ms,
+                        extra={'event': 'migration_applied', 'version': migration.version,
+                               'duration_ms': duration_ms})
+            done.append(migration.version)
+        return done
+
+
+def format_plan(plan):
+    lines = []
+    for migration in plan:
+        lines.append(f"{migration['version']:>4}  {migration['name']}")
+        for operation in migration['operations']:
+            rows = '?' if operation['rows'] is None else f"~{operation['rows']} rows"
+            seconds = '?' if operation['seconds'] is None else f"~{operation['seconds']:.1f}s"
+            lines.append(f"        {operation['description']}: {rows}, {seconds}, {operation['locking']}")
+    return '\n'.join(lines) or 'No pending migrations'
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Apply versioned schema migrations')
+    parser.add_argument('--dry-run', action='store_true', help='estimate the pending migrations without applying them')
+    parser.add_argument('--status', action='store_true', help='list applied and pending versions')
+    parser.add_argument('--target', type=int, help='stop after this version')
+    args = parser.parse_args()
+
+    from app import app, db
+
+    with app.app_context():
+        db.create_all()
+        migrator = Migrator(db.engine)
+        if args.status:
+            applied = migrator.applied()
+            for migration in migrator.migrations:
+                print(f"{migration.version:>4}  {'applied' if migration.version in applied else 'pending':<8} {migration.name}")
+        elif args.dry_run:
+            print(format_plan(migrator.plan(args.target)))
+        else:
+            versions = migrator.migrate(args.target)
+            print(f"Applied migrations: {', '.join(map(str, versions)) or 'none'}")
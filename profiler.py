@@ -0,0 +1,154 @@
+"""
+On-demand profiling for admins
+RequestProfiler runs cProfile for the next N requests to one endpoint;
+SamplingProfiler samples the stacks of all threads for a time window and
+writes them in the folded format read by flamegraph.pl and speedscope.
+Both only affect the worker process that received the admin request, and
+cost one attribute check per request while inactive.
+"""
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+
+def _timestamp():
+    return datetime.now().strftime('%Y%m%d-%H%M%S-%f')
+
+
+class RequestProfiler:
+    """
+    cProfile the next requests of armed endpoints
+
+    Each profiled request is written as <output_dir>/request-...-<endpoint>.prof
+    (pstats, for snakeviz / flameprof) with a .txt summary next to it.
+    """
+
+    def __init__(self, output_dir):
+        self.output_dir = output_dir
+        self.armed = {}  # endpoint -> requests left to profile
+        self._lock = threading.Lock()
+
+    def arm(self, endpoint, count):
+        with self._lock:
+            self.armed[endpoint] = count
+
+    def disarm(self, endpoint=None):
+        with self._lock:
+            if endpoint is None:
+                self.armed.clear()
+            else:
+                self.armed.pop(endpoint, None)
+
+    def start(self, endpoint):
+        """Profile this request if its endpoint is armed; returns the profile or None"""
+        if not self.armed:
+            return None
+        with self._lock:
+            left = self.armed.get(endpoint)
+            if not left:
+                return None
+            if left == 1:
+                del self.armed[endpoint]
+            else:
+                self.armed[endpoint] = left - 1
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Another profiler is active on this interpreter; give the slot back
+            with self._lock:
+                self.armed[endpoint] = self.armed.get(endpoint, 0) + 1
+            return None
+        return profile
+
+    def finish(self, profile, endpoint):
+        """Stop the profile and write it out; returns the .prof path"""
+        profile.disable()
+        os.makedirs(self.output_dir, exist_ok=True)
+        path = os.path.join(self.output_dir, f'request-{_timestamp()}-{os.getpid()}-{endpoint}.prof')
+        profile.dump_stats(path)
+        summary = io.StringIO()
+        pstats.Stats(profile, stream=summary).sort_stats('cumulative').print_stats(40)
+        with open(path[:-len('.prof')] + '.txt', 'w', encoding='utf-8') as f:
+            f.write(summary.getvalue())
+        return path
+
+
+class SamplingProfiler:
+    """Periodically sample every thread's stack on a background thread"""
+
+    def __init__(self, output_dir):
+        self.output_dir = output_dir
+        self.current = None  # status of the running window
+        self._lock = threading.Lock()
+
+    @property
+    def running(self):
+        return self.current is not None
+
+    def start(self, seconds, interval):
+        """
+        Sample for `seconds`, every `interval` seconds
+
+        Returns:
+            Path the folded stacks will be written to
+
+        Raises:
+            RuntimeError: if a sampling window is already running
+        """
+        with self._lock:
+            if self.current is not None:
+                raise RuntimeError('A sampling profile is already running')
+            path = os.path.join(self.output_dir, f'sample-{_timestamp()}-{os.getpid()}.folded')
+            self.current = {'path': path, 'seconds': seconds, 'interval': interval,
+                            'started_at': datetime.now().isoformat()}
+        thread = threading.Thread(target=self._run, args=(path, seconds, interval),
+                                  name='sampling-profiler', daemon=True)
+        thread.start()
+        return path
+
+    def _run(self, path, seconds, interval):
+        try:
+            stacks = Counter()
+            own = threading.get_ident()
+            deadline = time.monotonic() + seconds
+            while time.monotonic() < deadline:
+                names = {thread.ident: thread.name for thread in threading.enumerate()}
+                for ident, frame in sys._current_frames().items():
+                    if ident == own:
+                        continue
+                    stack = []
+                    while frame is not None:
+                        code = frame.f_code
+                        stack.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+                        frame = frame.f_back
+                    stack.append(names.get(ident, str(ident)))
+                    stacks[';'.join(reversed(stack))] += 1
+                time.sleep(interval)
+            os.makedirs(self.output_dir, exist_ok=True)
+            with open(path, 'w', encoding='utf-8') as f:
+                for stack, count in stacks.most_common():
+                    f.write(f'{stack} {count}\n')
+        finally:
+            with self._lock:
+                self.current = None
+
+
+def list_profiles(output_dir):
+    """Stored profile files, newest first, as dicts (name, size, modified)"""
+    if not os.path.isdir(output_dir):
+        return []
+    entries = []
+    for name in os.listdir(output_dir):
+        path = os.path.join(output_dir, name)
+        if os.path.isfile(path):
+            stat = os.stat(path)
+            entries.append({'name': name, 'size': stat.st_size,
+                            'modified': datetime.fromtimestamp(stat.st_mtime).isoformat(timespec='seconds')})
+    return sorted(entries, key=lambda entry: entry['modified'], reverse=True)
@@ -0,0 +1,265 @@
+"""
+Vote sharding for multi-college deployments
+Routes each college's votes to its own database (or schema) so that
+simultaneous elections in different colleges do not contend on one table
+"""
+import os
+import re
+import threading
+from datetime import datetime
+
+from sqlalchemy import (
+    create_engine, event, MetaData, Table, Column, Integer, String, DateTime,
+    UniqueConstraint, Index, select, func, delete, insert, text, inspect
+)
+
+
+# Shard tables carry no foreign keys: voters, elections and candidates live in
+# the main database, so integrity is enforced by the application on insert.
+shard_metadata = MetaData()
+
+shard_votes = Table(
+    'votes', shard_metadata,
+    Column('id', Integer, primary_key=True),
+    Column('voter_id', Integer, nullable=False),
+    Column('election_id', Integer, nullable=False),
+    Column('candidate_id', Integer, nullable=False),
+    Column('timestamp', DateTime, default=datetime.now),
+    # Ranked ballots: comma-separated candidate ids, most preferred first
+    Column('rankings', String(255)),
+    UniqueConstraint('voter_id', 'election_id', name='uq_shard_votes_voter_election'),
+    Index('ix_shard_votes_election_candidate', 'election_id', 'candidate_id'),
+)
+
+SHARD_KEY_PATTERN = re.compile(r'[^a-z0-9_]')
+
+
+def shard_key(college_code):
+    """
+    Normalize a college code into a name safe for file paths and schemas
+
+    Args:
+        college_code: College code as stored on the election/voter
+
+    Returns:
+        Lower-case shard key containing only [a-z0-9_]
+    """
+    return SHARD_KEY_PATTERN.sub('_', (college_code or 'default').strip().lower())
+
+
+class VoteShardRouter:
+    """
+    Sends vote reads and writes to a per-college shard
+
+    The URL template decides the layout:
+      - contains ``{college_code}``: one database per college, e.g.
+        ``sqlite:///shards/votes_{college_code}.db``
+      - otherwise: one shared database with a ``votes_<college>`` schema
+        per college (PostgreSQL)
+    """
+
+    def __init__(self, url_template, engine_options=None):
+        self.url_template = url_template
+        self.per_database = '{college_code}' in url_template
+        self.engine_options = engine_options or {}
+        self._engines = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config):
+        """Build a router from app config, or return None if sharding is off"""
+        url_template = config.get('VOTE_SHARD_URL')
+        if not url_template:
+            return None
+        return cls(url_template)
+
+    def _create_engine(self, key):
+        if self.per_database:
+            url = self.url_template.format(college_code=key)
+            if url.startswith('sqlite:///'):
+                directory = os.path.dirname(url[len('sqlite:///'):])
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+            engine = create_engine(url, **self.engine_options)
+            if url.startswith('sqlite'):
+                @event.listens_for(engine, 'connect')
+                def _set_sqlite_pragmas(dbapi_connection, connection_record):
+                    cursor = dbapi_connection.cursor()
+                    cursor.execute('PRAGMA journal_mode=WAL')
+                    cursor.execute('PRAGMA busy_timeout=5000')
+                    cursor.close()
+            shard_metadata.create_all(engine)
+            self._upgrade(engine)
+            return engine
+
+        schema = f'votes_{key}'
+        base = create_engine(self.url_template, **self.engine_options)
+        with base.begin() as conn:
+            conn.execute(text(f'CREATE SCHEMA IF NOT EXISTS "{schema}"'))
+        engine = base.execution_options(schema_translate_map={None: schema})
+        shard_metadata.create_all(engine)
+        self._upgrade(engine, schema)
+        return engine
+
+    @staticmethod
+    def _upgrade(engine, schema=None):
+        """Add columns introduced after a shard was created (rankings)"""
+        with engine.begin() as conn:
+            columns = {column['name'] for column in inspect(conn).get_columns(shard_votes.name, schema=schema)}
+            if 'rankings' not in columns:
+                table = f'"{schema}".{shard_votes.name}' if schema else shard_votes.name
+                conn.execute(text(f'ALTER TABLE {table} ADD COLUMN rankings VARCHAR(255)'))
+
+    def engine_for(self, college_code):
+        """
+        Get (lazily creating) the engine for a college's shard
+
+        Args:
+            college_code: College code owning the votes
+
+        Returns:
+            SQLAlchemy engine bound to that shard
+        """
+        key = shard_key(college_code)
+        engine = self._engines.get(key)
+        if engine is None:
+            with self._lock:
+                engine = self._engines.get(key)
+                if engine is None:
+                    engine = self._create_engine(key)
+                    self._engines[key] = engine
+        return engine
+
+    def add_vote(self, college_code, voter_id, election_id, candidate_id, timestamp=None, rankings=None):
+        with self.engine_for(college_code).begin() as conn:
+            conn.execute(insert(shard_votes).values(
+                voter_id=voter_id,
+                election_id=election_id,
+                candidate_id=candidate_id,
+                timestamp=timestamp or datetime.now(),
+                rankings=rankings,
+            ))
+
+    def add_votes(self, college_code, entries):
+        """
+        Insert a batch of votes, skipping voter/election pairs already stored
+
+        Args:
+            college_code: College owning the votes
+            entries: Dicts with voter_id, election_id, candidate_id, timestamp
+
+        Returns:
+            List of the inserted rows (dicts), e.g. for updating rollups
+        """
+        if not entries:
+            return []
+        with self.engine_for(college_code).begin() as conn:
+            existing = set(conn.execute(select(shard_votes.c.voter_id, shard_votes.c.election_id).where(
+                shard_votes.c.election_id.in_({e['election_id'] for e in entries}),
+                shard_votes.c.voter_id.in_({e['voter_id'] for e in entries}),
+            )).all())
+            rows = []
+            for entry in entries:
+                key = (entry['voter_id'], entry['election_id'])
+                if key not in existing:
+                    existing.add(key)
+                    rows.append({k: entry.get(k) for k in ('voter_id', 'election_id', 'candidate_id', 'timestamp', 'rankings')})
+            if rows:
+                conn.execute(insert(shard_votes), rows)
+            return rows
+
+    def has_voted(self, college_code, voter_id, election_id):
+        query = select(shard_votes.c.id).where(
+            shard_votes.c.voter_id == voter_id,
+            shard_votes.c.election_id == election_id,
+        ).limit(1)
+        with self.engine_for(college_code).connect() as conn:
+            return conn.execute(query).first() is not None
+
+    def tally(self, college_code, election_id):
+        """Return {candidate_id: vote_count} for one election"""
+        query = select(shard_votes.c.candidate_id, func.count()).where(
+            shard_votes.c.election_id == election_id
+        ).group_by(shard_votes.c.candidate_id)
+        with self.engine_for(college_code).connect() as conn:
+            return dict(conn.execute(query).all())
+
+    def grouped_rankings(self, college_code, election_id):
+        """Return (rankings, candidate_id, count) rows grouped by identical ballot"""
+        query = select(shard_votes.c.rankings, shard_votes.c.candidate_id, func.count()).where(
+            shard_votes.c.election_id == election_id
+        ).group_by(shard_votes.c.rankings, shard_votes.c.candidate_id)
+        with self.engine_for(college_code).connect() as conn:
+            return conn.execute(query).all()
+
+    def election_votes(self, college_code, election_id):
+        """Return all vote rows of an election ordered by timestamp"""
+        query = select(shard_votes).where(
+            shard_votes.c.election_id == election_id
+        ).order_by(shard_votes.c.timestamp)
+        with self.engine_for(college_code).connect() as conn:
+            return conn.execute(query).all()
+
+    def all_votes(self, college_code):
+        with self.engine_for(college_code).connect() as conn:
+            return conn.execute(select(shard_votes).order_by(shard_votes.c.id)).all()
+
+    def count_votes(self, college_code, election_ids=None):
+        query = select(func.count()).select_from(shard_votes)
+        if election_ids is not None:
+            if not election_ids:
+                return 0
+            query = query.where(shard_votes.c.election_id.in_(election_ids))
+        with self.engine_for(college_code).connect() as conn:
+            return conn.execute(query).scalar() or 0
+
+    def votes_per_voter(self, college_code, voter_ids=None):
+        """Return {voter_pk: number_of_votes_cast}"""
+        query = select(shard_votes.c.voter_id, func.count()).group_by(shard_votes.c.voter_id)
+        if voter_ids is not None:
+            query = query.where(shard_votes.c.voter_id.in_(voter_ids))
+        with self.engine_for(college_code).connect() as conn:
+            return dict(conn.execute(query).all())
+
+    def count_voter_votes(self, college_code, voter_id):
+        """Number of votes one voter cast"""
+        query = select(func.count()).select_from(shard_votes).where(shard_votes.c.voter_id == voter_id)
+        with self.engine_for(college_code).connect() as conn:
+            return conn.execute(query).scalar() or 0
+
+    def votes_for_voter(self, college_code, voter_id):
+        """Return (election_id, candidate_id, timestamp) of every vote a voter cast"""
+        query = select(shard_votes.c.election_id, shard_votes.c.candidate_id, shard_votes.c.timestamp).where(
+            shard_votes.c.voter_id == voter_id)
+        with self.engine_for(college_code).connect() as conn:
+            return conn.execute(query).all()
+
+    def delete_for_voter(self, college_code, voter_id):
+        with self.engine_for(college_code).begin() as conn:
+            return conn.execute(delete(shard_votes).where(shard_votes.c.voter_id == voter_id)).rowcount
+
+    def delete_for_election(self, college_code, election_id):
+        with self.engine_for(college_code).begin() as conn:
+            return conn.execute(delete(shard_votes).where(shard_votes.c.election_id == election_id)).rowcount
+
+    def delete_batch_for_election(self, college_code, election_id, batch_size):
+        """Delete up to batch_size votes of an election; returns the number deleted"""
+        batch = select(shard_votes.c.id).where(shard_votes.c.election_id == election_id).limit(batch_size)
+        with self.engine_for(college_code).begin() as conn:
+            return conn.execute(delete(shard_votes).where(shard_votes.c.id.in_(batch.scalar_subquery()))).rowcount
+
+    def delete_for_candidate(self, college_code, candidate_id):
+        with self.engine_for(college_code).begin() as conn:
+            return conn.execute(delete(shard_votes).where(shard_votes.c.candidate_id == candidate_id)).rowcount
+
+    def dispose(self, close=True):
+        """
+        Drop all shard connection pools
+
+        Args:
+            close: False after fork, so the parent's connections are left
+                untouched and the child simply opens new ones
+        """
+        with self._lock:
+            for engine in self._engines.values():
+                engine.dispose(close=close)
@@ -0,0 +1,64 @@
+"""
+Immutable result snapshots
+Results of a completed election are computed once, serialized as canonical
+JSON, zlib-compressed and stored with a SHA-256 checksum of the JSON, so
+later views decode one blob instead of recounting the raw votes.
+"""
+import hashlib
+import json
+import zlib
+
+# Payload keys that describe the outcome; re-verification compares these
+# (stats such as computed_at or the current number of registered voters may
+# legitimately differ between two counts)
+RESULT_KEYS = ('results', 'ranked', 'total_votes', 'detailed_votes')
+
+
+class SnapshotIntegrityError(Exception):
+    """Stored snapshot does not match its checksum"""
+
+
+def canonical_json(payload):
+    return json.dumps(payload, sort_keys=True, separators=(',', ':'), default=str)
+
+
+def encode_snapshot(payload):
+    """
+    Serialize a snapshot payload
+
+    Returns:
+        Tuple (compressed_blob, sha256_hex_of_the_json)
+    """
+    data = canonical_json(payload).encode('utf-8')
+    return zlib.compress(data, 9), hashlib.sha256(data).hexdigest()
+
+
+def decode_snapshot(blob, checksum):
+    """
+    Decompress a snapshot and check it against its checksum
+
+    Raises:
+        SnapshotIntegrityError: if the blob is corrupt or was modified
+    """
+    try:
+        data = zlib.decompress(blob)
+    except zlib.error as e:
+        raise SnapshotIntegrityError(f"Snapshot cannot be decompressed: {e}")
+    if hashlib.sha256(data).hexdigest() != checksum:
+        raise SnapshotIntegrityError("Snapshot checksum mismatch")
+    return json.loads(data)
+
+
+def compare_results(stored, fresh):
+    """
+    Compare the outcome of a stored snapshot with a fresh recount
+
+    Args:
+        stored: Decoded snapshot payload
+        fresh: Newly computed payload (not yet JSON round-tripped)
+
+    Returns:
+        List of RESULT_KEYS that differ (empty when the recount matches)
+    """
+    fresh = json.loads(canonical_json(fresh))
+    return [key for key in RESULT_KEYS if stored.get(key) != fresh.get(key)]
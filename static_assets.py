@@ -0,0 +1,143 @@
+"""
+Fingerprinted, precompressed static assets
+Every file under static/ is copied to the build directory as
+name.<content-hash>.ext together with .gz and .br variants, so it can be
+served with an immutable Cache-Control and without compressing per request.
+Templates link to the hashed names through asset_url(). The build runs at
+deploy time; the app only loads the manifest.
+Usage: python static_assets.py   (builds static/ into ASSET_BUILD_DIR)
+"""
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import shutil
+
+try:
+    import brotli
+except ImportError:  # Brotli variants are skipped without the package
+    brotli = None
+
+MANIFEST_NAME = 'manifest.json'
+
+# Already-compressed formats gain nothing from gzip/brotli
+SKIP_COMPRESSION = {'.png', '.jpg', '.jpeg', '.gif', '.webp', '.woff', '.woff2', '.gz', '.br', '.zip'}
+
+
+def fingerprint(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()[:12]
+
+
+def hashed_name(filename, digest):
+    root, ext = os.path.splitext(filename)
+    return f'{root}.{digest}{ext}'
+
+
+class AssetPipeline:
+    """
+    Build and look up fingerprinted assets
+
+    Args:
+        source_dir: The app's static folder
+        build_dir: Writable directory for the hashed and compressed files
+    """
+
+    def __init__(self, source_dir, build_dir):
+        self.source_dir = source_dir
+        self.build_dir = build_dir
+        self.manifest = {}  # 'css/custom.css' -> 'css/custom.<hash>.css'
+        self.served = {}  # hashed name -> {'mimetype', 'encodings': ['br', 'gz']}
+
+    def build(self):
+        """
+        Fingerprint every source file; only new or changed files are written
+        and compressed, so a rebuild after deploy is a few hash computations
+
+        Returns:
+            Number of files written
+        """
+        written = 0
+        manifest = {}
+        for directory, _, files in os.walk(self.source_dir):
+            for name in files:
+                source = os.path.join(directory, name)
+                logical = os.path.relpath(source, self.source_dir).replace(os.sep, '/')
+                target_name = hashed_name(logical, fingerprint(source))
+                target = os.path.join(self.build_dir, target_name)
+                if not os.path.exists(target):
+                    os.makedirs(os.path.dirname(target), exist_ok=True)
+                    shutil.copyfile(source, target)
+                    self._compress(target)
+                    written += 1
+                manifest[logical] = target_name
+        os.makedirs(self.build_dir, exist_ok=True)
+        with open(os.path.join(self.build_dir, MANIFEST_NAME), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+        self._index(manifest)
+        return written
+
+    def load(self):
+        """
+        Read the manifest of an earlier build
+
+        Returns:
+            False if there is no build (asset_url then links plain static files)
+        """
+        try:
+            with open(os.path.join(self.build_dir, MANIFEST_NAME), encoding='utf-8') as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            return False
+        self._index(manifest)
+        return True
+
+    def _compress(self, path):
+        if os.path.splitext(path)[1].lower() in SKIP_COMPRESSION:
+            return
+        with open(path, 'rb') as f:
+            data = f.read()
+        variants = {'gz': gzip.compress(data, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            variants['br'] = brotli.compress(data, quality=11)
+        for suffix, compressed in variants.items():
+            # Tiny files can grow when compressed; keep only real savings
+            if len(compressed) < len(data):
+                with open(f'{path}.{suffix}', 'wb') as f:
+                    f.write(compressed)
+
+    def _index(self, manifest):
+        self.manifest = manifest
+        self.served = {}
+        for target_name in manifest.values():
+            path = os.path.join(self.build_dir, target_name)
+            self.served[target_name] = {
+                'mimetype': mimetypes.guess_type(target_name)[0] or 'application/octet-stream',
+                'encodings': [suffix for suffix in ('br', 'gz') if os.path.exists(f'{path}.{suffix}')],
+            }
+
+    def resolve(self, filename, accept_encoding):
+        """
+        File to send for a hashed asset name
+
+        Returns:
+            Tuple (relative_path, mimetype, content_encoding or None), or
+            None if the name is not a built asset
+        """
+        info = self.served.get(filename)
+        if info is None:
+            return None
+        for suffix, encoding in (('br', 'br'), ('gz', 'gzip')):
+            if suffix in info['encodings'] and encoding in accept_encoding:
+                return f'{filename}.{suffix}', info['mimetype'], encoding
+        return filename, info['mimetype'], None
+
+
+if __name__ == '__main__':
+    from config import Config
+
+    root = os.path.dirname(os.path.abspath(__file__))
+    assets = AssetPipeline(os.path.join(root, 'static'), Config.ASSET_BUILD_DIR)
+    written = assets.build()
+    print(f"{len(assets.manifest)} assets ({written} new) in {assets.build_dir}")
@@ -0,0 +1,174 @@
+"""
+Non-blocking structured logging
+Request threads only put log records on an in-memory queue; a
+QueueListener thread formats them as one JSON object per line and writes
+them to stdout and, optionally, a size-rotated log file. High-volume
+events (per-request summaries, successful votes) can be sampled.
+"""
+import json
+import logging
+import os
+import queue
+import random
+import sys
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+from flask import g, has_request_context, request, session
+from sqlalchemy import event
+
+# Extra record attributes copied into the JSON line when present
+CONTEXT_FIELDS = ('event', 'route', 'method', 'status', 'voter_id', 'admin_id', 'election_id',
+                  'latency_ms', 'query_count', 'sample_rate')
+
+
+def parse_sample_rates(text):
+    """'request=0.1,vote_recorded=0.05' -> {'request': 0.1, 'vote_recorded': 0.05}"""
+    rates = {}
+    for item in (text or '').split(','):
+        name, _, rate = item.partition('=')
+        if name.strip() and rate.strip():
+            rates[name.strip()] = min(max(float(rate), 0.0), 1.0)
+    return rates
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record"""
+
+    def format(self, record):
+        data = {
+            'ts': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for field in CONTEXT_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                data[field] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data['exception'] = record.exc_text
+        return json.dumps(data, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keep only a fraction of INFO/DEBUG records of the configured events
+    (records carry the rate as sample_rate so counts can be scaled back);
+    warnings and errors are never dropped
+    """
+
+    def __init__(self, rates):
+        super().__init__()
+        self.rates = rates
+
+    def filter(self, record):
+        rate = self.rates.get(getattr(record, 'event', None))
+        if rate is None or record.levelno >= logging.WARNING:
+            return True
+        if random.random() >= rate:
+            return False
+        record.sample_rate = rate
+        return True
+
+
+class RequestContextFilter(logging.Filter):
+    """Attach route and voter/admin ids while still on the request thread"""
+
+    def filter(self, record):
+        if has_request_context():
+            if getattr(record, 'route', None) is None:
+                record.route = request.endpoint
+            if getattr(record, 'voter_id', None) is None:
+                record.voter_id = session.get('voter_id')
+            if getattr(record, 'admin_id', None) is None:
+                record.admin_id = session.get('_user_id')
+            if getattr(record, 'election_id', None) is None and request.view_args:
+                record.election_id = request.view_args.get('election_id')
+        return True
+
+
+class ContextQueueHandler(QueueHandler):
+    """
+    QueueHandler that keeps records structured: the message is merged with
+    its args and the traceback rendered to text here, but the JSON
+    formatting itself happens on the listener thread
+    """
+
+    def prepare(self, record):
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class LogPipeline:
+    """
+    The queue handler installed on the root logger and its listener thread
+
+    The listener starts with the handler, so a preloading gunicorn master
+    writes its own records (app import, bootstrap) too. Threads do not
+    survive fork: start() in a forked worker replaces the inherited listener
+    with a new one on a fresh queue.
+    """
+
+    def __init__(self, handlers, sample_rates, level):
+        self.handlers = handlers
+        self.queue_handler = ContextQueueHandler(queue.Queue(-1))
+        self.queue_handler.addFilter(SamplingFilter(sample_rates))
+        self.queue_handler.addFilter(RequestContextFilter())
+        self.level = level
+        self.listener = None
+        self._pid = None  # process the listener thread runs in
+
+    def install(self, logger=None):
+        """Attach the queue handler and start draining it in this process"""
+        logger = logger or logging.getLogger()
+        logger.addHandler(self.queue_handler)
+        logger.setLevel(self.level)
+        self.start()
+
+    def start(self):
+        """Start the listener thread in this process (no-op if it runs here already)"""
+        if self.listener is not None and self._pid == os.getpid():
+            return
+        self.queue_handler.queue = queue.Queue(-1)
+        self.listener = QueueListener(self.queue_handler.queue, *self.handlers, respect_handler_level=True)
+        self.listener.start()
+        self._pid = os.getpid()
+
+    def stop(self):
+        """Drain the queue and stop the listener thread"""
+        if self.listener is not None and self._pid == os.getpid():
+            self.listener.stop()
+        self.listener = None
+
+
+def create_log_pipeline(config):
+    """Build the pipeline from LOG_* settings (stdout, plus a rotating file if LOG_FILE is set)"""
+    formatter = JsonFormatter()
+    handlers = [logging.StreamHandler(sys.stdout)]
+    if config.get('LOG_FILE'):
+        directory = os.path.dirname(config['LOG_FILE'])
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        handlers.append(RotatingFileHandler(config['LOG_FILE'], maxBytes=config['LOG_MAX_BYTES'],
+                                            backupCount=config['LOG_BACKUP_COUNT'], encoding='utf-8',
+                                            delay=True))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    return LogPipeline(handlers, parse_sample_rates(config.get('LOG_SAMPLE_RATES')),
+                       config.get('LOG_LEVEL', 'INFO'))
+
+
+def install_query_counter(engine):
+    """Count statements per request in flask.g.query_count"""
+    @event.listens_for(engine, 'before_cursor_execute')
+    def _count_query(conn, cursor, statement, parameters, context, executemany):
+        if has_request_context():
+            g.query_count = g.get('query_count', 0) + 1
@@ -0,0 +1,250 @@
+"""
+Ranked-choice tallying engine (instant-runoff and single transferable vote)
+Ballots are grouped by identical ranking into a compact matrix
+(one row per distinct ranking, one weight per row), so every round is a
+couple of vectorized passes over the distinct rankings instead of a rescan
+of all ballot rows.
+"""
+from collections import Counter
+
+import numpy as np
+
+VOTING_METHODS = {
+    'plurality': 'First past the post',
+    'irv': 'Instant-runoff (ranked choice)',
+    'stv': 'Single transferable vote (multi-seat)',
+}
+
+
+def parse_rankings(value):
+    """'3,1,2' -> (3, 1, 2); empty/None -> ()"""
+    if not value:
+        return ()
+    return tuple(int(part) for part in value.split(',') if part)
+
+
+def format_rankings(candidate_ids):
+    """(3, 1, 2) -> '3,1,2'"""
+    return ','.join(str(candidate_id) for candidate_id in candidate_ids)
+
+
+class BallotSet:
+    """
+    Ranked ballots grouped by identical ranking
+
+    Attributes:
+        candidate_ids: Candidate ids; column index i refers to candidate_ids[i]
+        matrix: int32 array (groups x max_rank) of candidate indices, padded
+            with len(candidate_ids) (a sentinel that is never active)
+        weights: float64 array with the number of ballots in each group
+    """
+
+    def __init__(self, candidate_ids, matrix, weights):
+        self.candidate_ids = list(candidate_ids)
+        self.matrix = matrix
+        self.weights = weights
+
+    @classmethod
+    def from_rankings(cls, rankings, candidate_ids):
+        """
+        Build a BallotSet from an iterable of rankings
+
+        Args:
+            rankings: Iterable of sequences of candidate ids, most preferred
+                first; unknown and repeated candidates are ignored
+            candidate_ids: All candidates standing in the election
+        """
+        return cls.from_grouped(Counter(tuple(ranking) for ranking in rankings).items(), candidate_ids)
+
+    @classmethod
+    def from_grouped(cls, grouped, candidate_ids):
+        """
+        Build a BallotSet from (ranking, ballot_count) pairs, e.g. the result
+        of a GROUP BY over stored rankings; equal rankings may repeat
+        """
+        candidate_ids = list(candidate_ids)
+        index = {candidate_id: i for i, candidate_id in enumerate(candidate_ids)}
+        groups = Counter()
+        for ranking, count in grouped:
+            groups[tuple(ranking)] += count
+
+        rows = []
+        weights = []
+        for ranking, count in groups.items():
+            seen = []
+            for candidate_id in ranking:
+                i = index.get(candidate_id)
+                if i is not None and i not in seen:
+                    seen.append(i)
+            if seen:
+                rows.append(seen)
+                weights.append(count)
+
+        sentinel = len(candidate_ids)
+        width = max((len(row) for row in rows), default=1)
+        matrix = np.full((len(rows), width), sentinel, dtype=np.int32)
+        for r, row in enumerate(rows):
+            matrix[r, :len(row)] = row
+        return cls(candidate_ids, matrix, np.asarray(weights, dtype=np.float64))
+
+    @property
+    def total(self):
+        return float(self.weights.sum())
+
+    def top_choices(self, active):
+        """
+        Current top preference of every group among the active candidates
+
+        Args:
+            active: bool array (len(candidate_ids),) of continuing candidates
+
+        Returns:
+            Tuple (top, live): top[i] is the candidate index group i counts
+            for, live[i] is False for exhausted groups
+        """
+        lookup = np.append(active, False)
+        usable = lookup[self.matrix]
+        live = usable.any(axis=1)
+        first = usable.argmax(axis=1)
+        top = self.matrix[np.arange(len(self.matrix)), first]
+        return top, live
+
+
+def _counts(ballots, weights, active):
+    top, live = ballots.top_choices(active)
+    counts = np.bincount(top[live], weights=weights[live], minlength=len(ballots.candidate_ids) + 1)
+    return counts[:len(ballots.candidate_ids)], top, live
+
+
+def _lowest(counts, active, history):
+    """Pick the active candidate to eliminate; ties broken by earlier rounds, then by position"""
+    candidates = np.flatnonzero(active)
+    def key(i):
+        return (counts[i],) + tuple(round_counts[i] for round_counts in reversed(history)) + (-i,)
+    return min(candidates, key=key)
+
+
+def run_stv(ballots, seats=1):
+    """
+    Count an election with single transferable vote (Droop quota, Gregory
+    fractional surplus transfer). With one seat this is instant-runoff.
+
+    Args:
+        ballots: BallotSet
+        seats: Number of candidates to elect
+
+    Returns:
+        Dict with 'quota', 'winners' (candidate ids in order of election)
+        and 'rounds' (per-round counts, elected/eliminated, exhausted votes);
+        without ballots nobody is elected and there are no rounds
+    """
+    n = len(ballots.candidate_ids)
+    ids = ballots.candidate_ids
+    seats = max(1, min(seats, n)) if n else 0
+    if not ballots.total:
+        return {'method': 'stv', 'seats': seats, 'quota': None, 'winners': [], 'rounds': []}
+    weights = ballots.weights.copy()
+    active = np.ones(n, dtype=bool)
+    elected = []
+    rounds = []
+    history = []
+    quota = int(ballots.total // (seats + 1)) + 1
+
+    while len(elected) < seats and active.any():
+        counts, top, live = _counts(ballots, weights, active)
+        round_info = {
+            'round': len(rounds) + 1,
+            'counts': {ids[i]: round(float(counts[i]), 4) for i in np.flatnonzero(active)},
+            'exhausted': round(float(weights[~live].sum()), 4),
+            'elected': [],
+            'eliminated': None,
+        }
+        rounds.append(round_info)
+
+        remaining_seats = seats - len(elected)
+        if active.sum() <= remaining_seats:
+            # Everyone left fills the remaining seats
+            for i in sorted(np.flatnonzero(active), key=lambda i: -counts[i]):
+                elected.append(ids[i])
+                round_info['elected'].append(ids[i])
+            break
+
+        winners = [i for i in np.flatnonzero(active) if counts[i] >= quota]
+        if winners:
+            winners.sort(key=lambda i: -counts[i])
+            for i in winners[:remaining_seats]:
+                elected.append(ids[i])
+                round_info['elected'].append(ids[i])
+                active[i] = False
+                # Transfer the surplus: ballots counting for i keep only the
+                # fraction of their value that exceeded the quota
+                if counts[i] > 0:
+                    factor = (counts[i] - quota) / counts[i]
+                    weights[live & (top == i)] *= factor
+        else:
+            loser = _lowest(counts, active, history)
+            active[loser] = False
+            round_info['eliminated'] = ids[loser]
+        history.append(counts)
+
+    return {'method': 'stv', 'seats': seats, 'quota': quota, 'winners': elected, 'rounds': rounds}
+
+
+def run_irv(ballots):
+    """
+    Count a single-winner instant-runoff election: a candidate wins with a
+    majority of the continuing (non-exhausted) votes, otherwise the last
+    placed candidate is eliminated and their ballots transfer. Without
+    ballots nobody is elected.
+    """
+    if not ballots.total:
+        return {'method': 'irv', 'seats': 1, 'quota': None, 'winners': [], 'rounds': []}
+    n = len(ballots.candidate_ids)
+    ids = ballots.candidate_ids
+    weights = ballots.weights
+    active = np.ones(n, dtype=bool)
+    rounds = []
+    history = []
+    winner = None
+
+    while active.any():
+        counts, top, live = _counts(ballots, weights, active)
+        continuing = float(counts[active].sum())
+        round_info = {
+            'round': len(rounds) + 1,
+            'counts': {ids[i]: int(counts[i]) for i in np.flatnonzero(active)},
+            'exhausted': int(weights[~live].sum()),
+            'elected': [],
+            'eliminated': None,
+        }
+        rounds.append(round_info)
+
+        leader = max(np.flatnonzero(active), key=lambda i: (counts[i], -i))
+        if counts[leader] * 2 > continuing or active.sum() == 1:
+            winner = ids[leader]
+            round_info['elected'].append(winner)
+            break
+
+        loser = _lowest(counts, active, history)
+        active[loser] = False
+        round_info['eliminated'] = ids[loser]
+        history.append(counts)
+
+    return {'method': 'irv', 'seats': 1, 'quota': None,
+            'winners': [winner] if winner is not None else [], 'rounds': rounds}
+
+
+def tally(method, grouped_rankings, candidate_ids, seats=1):
+    """
+    Run the tally for an election
+
+    Args:
+        method: 'irv' or 'stv'
+        grouped_rankings: Iterable of (candidate-id sequence, ballot count)
+        candidate_ids: Candidates standing
+        seats: Seats to fill (STV)
+    """
+    ballots = BallotSet.from_grouped(grouped_rankings, candidate_ids)
+    if method == 'stv':
+        return run_stv(ballots, seats)
+    return run_irv(ballots)
@@ -0,0 +1,31 @@
+"""
+Test setup: the app module reads its configuration at import, so the
+environment points it at a throwaway SQLite database before any test
+imports it, with every optional host-local store switched off.
+"""
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+TEST_DIR = tempfile.mkdtemp(prefix='voting-tests-')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(TEST_DIR, 'app.db')}"
+os.environ['RATELIMIT_ENABLED'] = '0'
+for name in ('VOTE_WAL_PATH', 'VOTE_SHARD_URL', 'VOTED_INDEX_DIR', 'LOGIN_THROTTLE_PATH', 'JOB_DIR',
+             'ASSET_BUILD_DIR', 'TEMPLATE_CACHE_DIR', 'PROFILE_DIR', 'LOG_FILE'):
+    os.environ.pop(name, None)
+
+
+@pytest.fixture
+def app_module():
+    """The app module with empty tables"""
+    import app as app_module
+
+    with app_module.app.app_context():
+        app_module.db.drop_all()
+        app_module.db.create_all()
+    return app_module
@@ -0,0 +1,55 @@
+"""Bloom filter (bloom_filter.py) and the registration checks it lets the app skip"""
+import pytest
+
+from bloom_filter import BloomFilter
+
+
+def test_no_false_negatives():
+    bloom = BloomFilter(5000)
+    keys = [f'id:V{n}' for n in range(5000)] + [f'email:voter{n}@example.com' for n in range(5000)]
+    for key in keys:
+        bloom.add(key)
+    assert all(key in bloom for key in keys)
+    assert bloom.saturated
+
+
+@pytest.mark.parametrize('error_rate', [0.01, 0.001])
+def test_false_positive_rate_at_capacity(error_rate):
+    bloom = BloomFilter(20000, error_rate)
+    for n in range(20000):
+        bloom.add(f'id:V{n}')
+    assert not bloom.saturated
+    probes = 100000
+    false_positives = sum(f'id:other{n}' in bloom for n in range(probes))
+    assert false_positives / probes < 1.5 * error_rate
+
+
+def test_registration_falls_back_to_unique_index(app_module, monkeypatch):
+    m = app_module
+    monkeypatch.setitem(m.app.config, 'WTF_CSRF_ENABLED', False)
+    voter_filter = m.RegisteredVoterFilter(0.01, sync_interval=3600)
+    monkeypatch.setattr(m, 'voter_filter', voter_filter)
+    with m.app.app_context():
+        m.db.session.add(m.College(college_code='C1', college_name='College One'))
+        m.db.session.commit()
+        assert voter_filter.may_exist('V1', 'v1@example.com') == (False, False)
+        # Registered through another worker after this one's filter was loaded
+        m.db.session.add(m.Voter(voter_id='V1', name='Voter One', email='v1@example.com', password_hash='x',
+                                 college_code='C1'))
+        m.db.session.commit()
+        assert voter_filter.may_exist('V1', 'v1@example.com') == (False, False)
+
+    client = m.app.test_client()
+    response = client.post('/voter/register', base_url='https://localhost', data={
+        'voter_id': 'V1', 'name': 'Someone Else', 'email': 'v1@example.com', 'password': 'Secret123',
+        'college_code': 'C1'})
+
+    assert response.status_code == 302
+    assert response.headers['Location'].endswith('/voter/register')
+    with client.session_transaction(base_url='https://localhost') as session:
+        assert session['_flashes'] == [
+            ('danger', 'Voter ID or email already registered! Please use different details or login.')]
+    with m.app.app_context():
+        assert [v.name for v in m.Voter.query.all()] == ['Voter One']
+        # The filter learns the keys, so the next attempt takes the query path
+        assert voter_filter.may_exist('V1', 'v1@example.com') == (True, True)
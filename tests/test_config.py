@@ -0,0 +1,46 @@
+"""Connection pool sizing per deployment profile (config.py)"""
+import pytest
+
+from config import get_engine_options
+
+SQLITE_URL = 'sqlite:////tmp/voting.db'
+POSTGRES_URL = 'postgresql://user:pass@db/voting'
+
+
+@pytest.fixture
+def env(monkeypatch):
+    for name in ('JOB_WORKERS', 'VOTE_WAL_PATH', 'WEB_CONCURRENCY', 'GUNICORN_WORKERS', 'GUNICORN_THREADS',
+                 'PYTHON_MAX_THREADS', 'DB_MAX_CONNECTIONS', 'SQLITE_PERFORMANCE_MODE'):
+        monkeypatch.delenv(name, raising=False)
+    return monkeypatch
+
+
+def test_long_running_pool_counts_job_and_flusher_threads(env):
+    env.setenv('GUNICORN_THREADS', '4')
+    env.setenv('JOB_WORKERS', '3')
+    env.setenv('VOTE_WAL_PATH', '/tmp/votes.wal')
+    options = get_engine_options(POSTGRES_URL, 'long-running')
+    # 4 request threads + 3 job threads + 1 flusher, and one spare
+    assert (options['pool_size'], options['max_overflow']) == (9, 8)
+
+
+def test_long_running_pool_stays_under_connection_cap(env):
+    env.setenv('WEB_CONCURRENCY', '4')
+    env.setenv('GUNICORN_THREADS', '4')
+    env.setenv('DB_MAX_CONNECTIONS', '40')
+    options = get_engine_options(POSTGRES_URL, 'long-running')
+    assert options['pool_size'] == 7
+    assert 4 * (options['pool_size'] + options['max_overflow']) <= 40
+
+
+def test_serverless_jobs_run_inline(env):
+    env.setenv('JOB_WORKERS', '3')
+    assert get_engine_options(POSTGRES_URL, 'serverless')['pool_size'] == 2
+    env.setenv('VOTE_WAL_PATH', '/tmp/votes.wal')
+    assert get_engine_options(POSTGRES_URL, 'serverless')['pool_size'] == 3
+
+
+def test_sqlite_pool_counts_job_threads(env):
+    assert get_engine_options(SQLITE_URL, 'sqlite')['pool_size'] == 7
+    env.setenv('SQLITE_PERFORMANCE_MODE', '1')
+    assert get_engine_options(SQLITE_URL, 'sqlite')['pool_size'] == 1
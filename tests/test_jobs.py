@@ -0,0 +1,42 @@
+"""Background jobs run through JobRunner (jobs.py) as the admin pages start them"""
+from datetime import datetime, timedelta
+
+import pytest
+
+from timeline import GRANULARITIES
+
+
+@pytest.fixture
+def runner(app_module, monkeypatch):
+    """The app's job runner, running jobs in the submitting thread"""
+    monkeypatch.setattr(app_module.job_runner, 'inline', True)
+    return app_module.job_runner
+
+
+def test_generate_test_data_job_stores_votes(app_module, runner):
+    m = app_module
+    with m.app.app_context():
+        m.db.session.add(m.College(college_code='C1', college_name='College One'))
+        admin = m.Admin(username='admin', email='admin@example.com', role='admin', password_hash='x')
+        m.db.session.add(admin)
+        m.db.session.flush()
+        now = datetime.now()
+        election = m.Election(title='Council', start_date=now - timedelta(hours=1), end_date=now + timedelta(hours=1),
+                              status='active', college_code='C1', created_by=admin.id)
+        m.db.session.add(election)
+        m.db.session.flush()
+        m.db.session.add_all([m.Candidate(name=name, election_id=election.id) for name in ('Ann', 'Bob')])
+        m.db.session.commit()
+        election_id = election.id
+
+        job_id = runner.submit('generate_test_data', {'college_code': 'C1', 'voters': 40, 'vote_share': 1.0})
+
+        m.db.session.expire_all()
+        job = m.db.session.get(m.Job, job_id)
+        assert (job.status, job.error) == ('done', None)
+        assert m.Voter.query.filter_by(college_code='C1').count() == 40
+        assert m.Vote.query.filter_by(election_id=election_id).count() == 40
+        assert m.AuditEntry.query.filter_by(election_id=election_id).count() == 40
+        rolled_up = m.db.session.query(m.db.func.sum(m.VoteRollup.votes)).filter(
+            m.VoteRollup.election_id == election_id, m.VoteRollup.granularity == GRANULARITIES[0]).scalar()
+        assert rolled_up == 40
@@ -0,0 +1,94 @@
+"""Failed-login throttle (login_throttle.py)"""
+import types
+
+import pytest
+
+import login_throttle
+from login_throttle import PROBES, LoginThrottle
+
+
+class Clock:
+    def __init__(self, now):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock(1000.0)  # start of window 10 with window=100
+    monkeypatch.setattr(login_throttle, 'time', types.SimpleNamespace(time=clock.time))
+    return clock
+
+
+def make_throttle(tmp_path, **kwargs):
+    options = dict(max_failures=5, window=100, base_lockout=30, max_lockout=100)
+    options.update(kwargs)
+    return LoginThrottle(str(tmp_path / 'throttle.bin'), **options)
+
+
+def fail(throttle, account, times):
+    return [throttle.record_failure(*account) for _ in range(times)]
+
+
+def test_lockout_at_threshold(tmp_path, clock):
+    throttle = make_throttle(tmp_path)
+    account = ('voter', 'C1', 'V1')
+    assert fail(throttle, account, 4) == [0, 0, 0, 0]
+    assert throttle.locked_for(*account) == 0
+    assert throttle.record_failure(*account) == 30
+    assert throttle.locked_for(*account) == 31
+    assert throttle.locked_for('voter', 'C1', 'V2') == 0
+    clock.now += 30
+    assert throttle.locked_for(*account) == 0
+    assert throttle.metrics()['lockouts'] == 1
+
+
+def test_lockout_doubles_up_to_max(tmp_path, clock):
+    throttle = make_throttle(tmp_path)
+    account = ('admin', '', 'root')
+    lockouts = []
+    for _ in range(4):
+        lockouts.append(fail(throttle, account, 5)[-1])
+        clock.now += lockouts[-1]
+    assert lockouts == [30, 60, 100, 100]
+    throttle.record_success(*account)
+    assert fail(throttle, account, 5)[-1] == 30
+
+
+def test_previous_window_counts_by_overlap(tmp_path, clock):
+    throttle = make_throttle(tmp_path)
+    account = ('voter', 'C1', 'V1')
+    clock.now = 1050.0
+    fail(throttle, account, 4)
+    # Halfway through the next window: 4 * 0.5 + 2 < 5
+    clock.now = 1150.0
+    assert fail(throttle, account, 2) == [0, 0]
+    # A quarter into the one after: 2 * 0.75 + 4 >= 5 locks on the fourth
+    clock.now = 1225.0
+    assert fail(throttle, account, 4) == [0, 0, 0, 30]
+    # Two windows later nothing carries over
+    clock.now = 1400.0
+    assert fail(throttle, account, 4) == [0, 0, 0, 0]
+
+
+def test_collisions_never_evict_locked_accounts(tmp_path, clock):
+    # As many slots as probes: every account shares one probe chain
+    throttle = make_throttle(tmp_path, slots=PROBES)
+    victims = [('voter', 'C1', f'V{n}') for n in range(PROBES)]
+    for account in victims:
+        assert fail(throttle, account, 5)[-1] == 30
+
+    # Flooding the chain with new accounts must not unlock a victim
+    for n in range(100):
+        throttle.record_failure('voter', 'C1', f'flood{n}')
+    assert all(throttle.locked_for(*account) for account in victims)
+    # Untracked accounts are refused while no slot is free (fail closed)
+    assert throttle.locked_for('voter', 'C1', 'new') == 31
+
+    # Once the locks expire the slots can be reused
+    clock.now += 30
+    throttle.record_success(*victims[0])
+    assert fail(throttle, ('voter', 'C1', 'new'), 5)[-1] == 30
+    assert throttle.locked_for('voter', 'C1', 'new') == 31
@@ -0,0 +1,89 @@
+"""The public results and audit endpoints never write; finalization happens at close"""
+from datetime import datetime, timedelta
+
+import pytest
+
+
+class Progress:
+    """Job context of a reconciliation run outside the job runner"""
+
+    def progress(self, done, total=None, message=None, force=False):
+        pass
+
+
+@pytest.fixture
+def closed_election(app_module):
+    """An election with three votes whose end date has passed, its stored status still active"""
+    m = app_module
+    with m.app.app_context():
+        m.db.session.add(m.College(college_code='C1', college_name='College One'))
+        admin = m.Admin(username='admin', email='admin@example.com', role='admin', password_hash='x')
+        m.db.session.add(admin)
+        m.db.session.flush()
+        now = datetime.now()
+        election = m.Election(title='Council', start_date=now - timedelta(hours=1), end_date=now + timedelta(hours=1),
+                              status='active', college_code='C1', created_by=admin.id)
+        m.db.session.add(election)
+        m.db.session.flush()
+        candidates = [m.Candidate(name=name, election_id=election.id) for name in ('Ann', 'Bob')]
+        voters = [m.Voter(voter_id=f'V{n}', name=f'Voter {n}', email=f'v{n}@example.com', password_hash='x',
+                          college_code='C1') for n in range(3)]
+        m.db.session.add_all(candidates + voters)
+        m.db.session.commit()
+        receipts = [m.record_vote(voter, election, candidates[n % 2].id) for n, voter in enumerate(voters)]
+        election.end_date = now - timedelta(minutes=1)
+        m.db.session.commit()
+        return {'id': election.id, 'candidates': [c.id for c in candidates], 'receipts': receipts}
+
+
+def stored_state(m, election_id):
+    with m.app.app_context():
+        return (m.db.session.get(m.Election, election_id).status,
+                m.ResultSnapshot.query.filter_by(election_id=election_id).count())
+
+
+def test_public_results_do_not_finalize(app_module, closed_election):
+    m = app_module
+    client = m.app.test_client()
+    response = client.get(f"/api/elections/{closed_election['id']}/results", base_url='https://localhost')
+    assert response.status_code == 200
+    assert {row['id']: row['votes'] for row in response.get_json()} == {
+        closed_election['candidates'][0]: 2, closed_election['candidates'][1]: 1}
+    assert stored_state(m, closed_election['id']) == ('active', 0)
+
+
+def test_reconciliation_finalizes_closed_elections(app_module, closed_election):
+    m = app_module
+    with m.app.app_context():
+        report = m.reconcile_tallies_job(Progress())
+    assert report['issues'] == []
+    assert stored_state(m, closed_election['id']) == ('completed', 1)
+    client = m.app.test_client()
+    response = client.get(f"/api/elections/{closed_election['id']}/results", base_url='https://localhost')
+    assert {row['id']: row['votes'] for row in response.get_json()} == {
+        closed_election['candidates'][0]: 2, closed_election['candidates'][1]: 1}
+
+
+def test_public_audit_reads_do_not_hash(app_module, closed_election):
+    m = app_module
+    client = m.app.test_client()
+    audit = client.get(f"/api/elections/{closed_election['id']}/audit", base_url='https://localhost').get_json()
+    assert (audit['tree_size'], audit['root']) == (0, None)
+    receipt = closed_election['receipts'][0]
+    proof = client.get(f'/api/receipts/{receipt}', base_url='https://localhost').get_json()
+    assert proof['status'] == 'pending'
+    with m.app.app_context():
+        assert m.AuditTree.query.count() == 0
+        assert m.AuditEntry.query.filter(m.AuditEntry.leaf_index.isnot(None)).count() == 0
+
+
+def test_reconciliation_hashes_audit_entries(app_module, closed_election):
+    m = app_module
+    with m.app.app_context():
+        m.reconcile_tallies_job(Progress())
+    client = m.app.test_client()
+    audit = client.get(f"/api/elections/{closed_election['id']}/audit", base_url='https://localhost').get_json()
+    assert audit['tree_size'] == 3
+    for receipt in closed_election['receipts']:
+        proof = client.get(f'/api/receipts/{receipt}', base_url='https://localhost').get_json()
+        assert (proof['status'], proof['root'], proof['verified']) == ('included', audit['root'], True)
@@ -0,0 +1,53 @@
+"""Queue-based log pipeline (structured_log.py) across a preload fork"""
+import json
+import logging
+import os
+
+import pytest
+
+from structured_log import JsonFormatter, LogPipeline
+
+
+@pytest.fixture
+def pipeline(tmp_path):
+    handler = logging.FileHandler(tmp_path / 'app.log')
+    handler.setFormatter(JsonFormatter())
+    pipeline = LogPipeline([handler], {}, 'INFO')
+    logger = logging.getLogger('test_structured_log')
+    logger.propagate = False
+    pipeline.install(logger)
+    yield pipeline, logger, tmp_path / 'app.log'
+    pipeline.stop()
+    logger.removeHandler(pipeline.queue_handler)
+    handler.close()
+
+
+def messages(path):
+    return [json.loads(line)['message'] for line in path.read_text().splitlines()]
+
+
+def test_records_before_the_worker_start_are_written(pipeline):
+    pipeline, logger, path = pipeline
+    logger.info('importing the app in the master')
+    pipeline.stop()
+    assert messages(path) == ['importing the app in the master']
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason='needs fork')
+def test_forked_worker_restarts_the_listener(pipeline):
+    pipeline, logger, path = pipeline
+    logger.info('master before fork')
+    pipeline.stop()
+    pipeline.start()
+    pid = os.fork()
+    if pid == 0:
+        try:
+            pipeline.start()  # what init_worker does in post_fork
+            logger.info('worker')
+            pipeline.stop()
+        finally:
+            os._exit(0)
+    os.waitpid(pid, 0)
+    logger.info('master after fork')
+    pipeline.stop()
+    assert sorted(messages(path)) == ['master after fork', 'master before fork', 'worker']
@@ -0,0 +1,79 @@
+"""Ranked-choice counts of tally.py against worked examples"""
+from tally import BallotSet, run_irv, run_stv, tally
+
+
+def ballots(grouped, candidate_ids):
+    return BallotSet.from_grouped(grouped, candidate_ids)
+
+
+def test_stv_surplus_transfer_and_exhausted_ballots():
+    # Three seats, twenty voters, Droop quota 6 (the "favourite food" example)
+    orange, pear, chocolate, strawberry, bonbon = range(1, 6)
+    result = run_stv(ballots([
+        ((orange,), 4),
+        ((pear, orange), 2),
+        ((chocolate, strawberry), 8),
+        ((chocolate, bonbon), 4),
+        ((strawberry,), 1),
+        ((bonbon,), 1),
+    ], [orange, pear, chocolate, strawberry, bonbon]), seats=3)
+
+    assert result['quota'] == 6
+    assert result['winners'] == [chocolate, orange, strawberry]
+    rounds = result['rounds']
+    assert rounds[0]['elected'] == [chocolate]
+    # Chocolate's surplus of 6 transfers at half value
+    assert rounds[1]['counts'] == {orange: 4, pear: 2, strawberry: 5, bonbon: 3}
+    assert rounds[1]['eliminated'] == pear
+    assert rounds[2]['elected'] == [orange]
+    assert rounds[3]['eliminated'] == bonbon
+    # Bonbon's ballots have no further preference: 1 + 4 * 0.5
+    assert rounds[4]['exhausted'] == 3
+    assert rounds[4]['elected'] == [strawberry]
+
+
+def test_irv_transfers_until_majority():
+    # The Tennessee capital example: Knoxville wins on transfers
+    memphis, nashville, chattanooga, knoxville = range(1, 5)
+    result = run_irv(ballots([
+        ((memphis, nashville, chattanooga, knoxville), 42),
+        ((nashville, chattanooga, knoxville, memphis), 26),
+        ((chattanooga, knoxville, nashville, memphis), 15),
+        ((knoxville, chattanooga, nashville, memphis), 17),
+    ], [memphis, nashville, chattanooga, knoxville]))
+
+    assert [r['eliminated'] for r in result['rounds']] == [chattanooga, nashville, None]
+    assert result['rounds'][-1]['counts'] == {memphis: 42, knoxville: 58}
+    assert result['winners'] == [knoxville]
+
+
+def test_elimination_tie_broken_by_earlier_round():
+    a, c, b, d = 1, 2, 3, 4
+    result = run_irv(ballots([
+        ((a,), 6),
+        ((b,), 3),
+        ((c, a), 2),
+        ((d, c), 1),
+    ], [a, c, b, d]))
+
+    rounds = result['rounds']
+    assert rounds[0]['eliminated'] == d
+    # b and c are tied on 3; c had fewer votes in the first round
+    assert rounds[1]['counts'] == {a: 6, c: 3, b: 3}
+    assert rounds[1]['eliminated'] == c
+    assert result['winners'] == [a]
+
+
+def test_elimination_tie_without_history_removes_later_candidate():
+    result = run_irv(ballots([((1,), 3), ((2, 1), 2), ((3, 2), 2)], [1, 2, 3]))
+
+    assert result['rounds'][0]['eliminated'] == 3
+    assert result['winners'] == [2]
+
+
+def test_no_ballots_elect_nobody():
+    for method, seats in (('irv', 1), ('stv', 1), ('stv', 2)):
+        result = tally(method, [], [1, 2, 3], seats)
+        assert (result['winners'], result['rounds']) == ([], [])
+    assert run_stv(ballots([], [1, 2]), seats=2)['winners'] == []
+    assert run_irv(ballots([((99,), 5)], [1, 2]))['winners'] == []
@@ -0,0 +1,58 @@
+"""sanitize_input's fast path must match bleach.clean exactly"""
+import random
+import string
+
+import bleach
+import pytest
+
+from validation import VOTER_REGISTRATION_SCHEMA, sanitize_input, validate_batch, validate_form
+
+PLAIN = ['STU00042', 'Ada Lovelace', 'COL1', 'o\'brien', 'a.b-c_d@e', '  padded  ', '', '100%']
+HOSTILE = [
+    '<script>alert(1)</script>', 'a & b', 'Tom &amp; Jerry', '<b>bold</b> name', '1 < 2 > 0',
+    '<img src=x onerror=alert(1)>', '&lt;escaped&gt;', '&#60;', '&', '<<>>', '<!-- comment -->text',
+    '<a href="javascript:x">y</a>', 'tab\there', 'line\nbreak', 'cr\rlf\r\n', 'nul\x00byte', 'bell\x07',
+    'vt\x0bff\x0c', '\x1cfile\x1fsep', '\x7fdel',
+]
+NON_ASCII = ['ünïcödé', '名前', 'Ωμέγα <i>x</i>', 'emoji 🗳️', 'x￾y', 'nbsp here', 'rtl ‮abc',
+             'zero​width', 'lone \ud800 surrogate']
+
+
+def reference(text):
+    """What sanitize_input returned before the fast path: bleach on every value"""
+    return bleach.clean(str(text).strip(), tags=[], strip=True)
+
+
+@pytest.mark.parametrize('text', PLAIN + HOSTILE + NON_ASCII)
+def test_sanitize_input_matches_bleach(text):
+    assert sanitize_input(text) == reference(text)
+
+
+def test_sanitize_input_matches_bleach_on_every_low_code_point():
+    for code_point in range(0x250):
+        assert sanitize_input(chr(code_point)) == reference(chr(code_point)), hex(code_point)
+
+
+def test_sanitize_input_matches_bleach_on_random_text():
+    rng = random.Random(42)
+    alphabet = string.ascii_letters + string.digits + ' .-_@\t&<>;#\x00\x01\r\nüé名'
+    for _ in range(2000):
+        text = ''.join(rng.choice(alphabet) for _ in range(rng.randint(0, 30)))
+        assert sanitize_input(text) == reference(text), repr(text)
+
+
+def test_validate_batch_matches_validate_form():
+    rows = [{'voter_id': 'STU00001', 'name': 'Ann', 'email': 'ann@college.edu', 'password': 'Passw0rdX',
+             'college_code': 'COL1'},
+            {'voter_id': 'STU00002', 'name': '<b>Bob</b>', 'email': 'BOB@College.edu', 'password': 'weak',
+             'college_code': 'COL1'},
+            {'voter_id': '', 'name': 'Ann', 'email': 'not-an-email', 'password': 'Passw0rdX', 'college_code': 'COL1'}]
+    assert validate_batch(VOTER_REGISTRATION_SCHEMA, rows) == [
+        validate_form(VOTER_REGISTRATION_SCHEMA, row) for row in rows]
+
+
+def test_utils_sanitize_input_only_strips():
+    import utils
+
+    assert utils.sanitize_input('  <b>Ann</b> & co  ') == '<b>Ann</b> & co'
+    assert utils.sanitize_input(None) is None
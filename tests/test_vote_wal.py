@@ -0,0 +1,123 @@
+"""Crash recovery of the vote write-ahead log (vote_wal.py + apply_vote_batch)"""
+from datetime import datetime, timedelta
+
+import pytest
+
+from sharding import VoteShardRouter
+from timeline import GRANULARITIES
+from vote_wal import VoteWriteAheadLog
+
+
+class Crash(Exception):
+    """Stands in for the process dying"""
+
+
+@pytest.fixture
+def election(app_module):
+    """An active election with two candidates and six voters"""
+    m = app_module
+    with m.app.app_context():
+        m.db.session.add(m.College(college_code='C1', college_name='College One'))
+        admin = m.Admin(username='admin', email='admin@example.com', role='admin', password_hash='x')
+        m.db.session.add(admin)
+        m.db.session.flush()
+        now = datetime.now()
+        election = m.Election(title='Council', start_date=now - timedelta(hours=1), end_date=now + timedelta(hours=1),
+                              status='active', college_code='C1', created_by=admin.id)
+        m.db.session.add(election)
+        m.db.session.flush()
+        candidates = [m.Candidate(name=name, election_id=election.id) for name in ('Ann', 'Bob')]
+        voters = [m.Voter(voter_id=f'V{n}', name=f'Voter {n}', email=f'v{n}@example.com', password_hash='x',
+                          college_code='C1') for n in range(6)]
+        m.db.session.add_all(candidates + voters)
+        m.db.session.commit()
+        return {'id': election.id, 'candidates': [c.id for c in candidates], 'voters': [v.id for v in voters]}
+
+
+@pytest.fixture(params=['main', 'sharded'])
+def storage(request, app_module, monkeypatch, tmp_path):
+    """Votes in the main database, or in per-college shards"""
+    if request.param == 'sharded':
+        router = VoteShardRouter(f"sqlite:///{tmp_path}/votes_{{college_code}}.db")
+        monkeypatch.setattr(app_module, 'vote_router', router)
+        yield request.param
+        router.dispose()
+    else:
+        yield request.param
+
+
+def append_votes(wal, election):
+    expected = {}
+    for n, voter_id in enumerate(election['voters']):
+        candidate_id = election['candidates'][n % 2]
+        assert wal.append(voter_id, election['id'], candidate_id, 'C1', nonce=f'{n:032x}')
+        expected[voter_id] = candidate_id
+    return expected
+
+
+def assert_applied_once(m, election, expected):
+    with m.app.app_context():
+        if m.vote_router:
+            stored = [(row.voter_id, row.candidate_id) for row in m.vote_router.election_votes('C1', election['id'])]
+        else:
+            stored = m.db.session.query(m.Vote.voter_id, m.Vote.candidate_id).filter_by(
+                election_id=election['id']).all()
+        assert sorted(stored) == sorted(expected.items())
+
+        audited = m.db.session.query(m.AuditEntry.voter_id, m.AuditEntry.candidate_id).filter_by(
+            election_id=election['id']).all()
+        assert sorted(audited) == sorted(expected.items())
+
+        for granularity in GRANULARITIES:
+            rolled_up = dict(m.db.session.query(m.VoteRollup.candidate_id, m.db.func.sum(m.VoteRollup.votes)).filter(
+                m.VoteRollup.election_id == election['id'], m.VoteRollup.granularity == granularity).group_by(
+                m.VoteRollup.candidate_id).all())
+            counts = {}
+            for candidate_id in expected.values():
+                counts[candidate_id] = counts.get(candidate_id, 0) + 1
+            assert rolled_up == counts
+
+
+def test_replay_after_crash_between_apply_and_dequeue(app_module, election, storage, tmp_path):
+    def apply_then_crash(entries):
+        app_module.apply_vote_batch(entries)
+        raise Crash()
+
+    wal = VoteWriteAheadLog(str(tmp_path / 'wal.db'), apply_then_crash, batch_size=4)
+    expected = append_votes(wal, election)
+    with pytest.raises(Crash):
+        wal.flush()
+    # The applied batch is still queued, as after a crash
+    assert wal.pending_count() == len(expected)
+
+    wal.apply_batch = app_module.apply_vote_batch
+    assert wal.replay() == len(expected)
+    assert wal.pending_count() == 0
+    assert_applied_once(app_module, election, expected)
+
+    # A second replay of the same entries changes nothing
+    append_votes(wal, election)
+    wal.replay()
+    assert_applied_once(app_module, election, expected)
+
+
+def test_replay_after_failed_main_commit_on_shards(app_module, election, monkeypatch, tmp_path):
+    router = VoteShardRouter(f"sqlite:///{tmp_path}/votes_{{college_code}}.db")
+    monkeypatch.setattr(app_module, 'vote_router', router)
+    real_append = app_module.append_audit_entries
+
+    def fail_after_shard_commit(votes):
+        raise Crash()
+
+    monkeypatch.setattr(app_module, 'append_audit_entries', fail_after_shard_commit)
+    wal = VoteWriteAheadLog(str(tmp_path / 'wal.db'), app_module.apply_vote_batch)
+    expected = append_votes(wal, election)
+    with pytest.raises(Crash):
+        wal.flush()
+    # Votes reached the shard, their rollups and audit entries did not
+    assert len(router.election_votes('C1', election['id'])) == len(expected)
+
+    monkeypatch.setattr(app_module, 'append_audit_entries', real_append)
+    wal.replay()
+    assert_applied_once(app_module, election, expected)
+    router.dispose()
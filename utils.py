@@ -2,13 +2,17 @@
 Utility functions for the voting system
 Contains helper functions for validation, sanitization, and other common operations
 """
-import re
 from datetime import datetime, timedelta
 
+# Format validators live in validation.py (precompiled patterns);
+# re-exported here for existing imports
+from validation import validate_email, validate_voter_id, LETTER_PATTERN, DIGIT_PATTERN
+
 
 def sanitize_input(text):
     """
-    Sanitize user input to prevent XSS attacks
+    Trim surrounding whitespace (validation.sanitize_input also strips
+    markup with bleach)
     
     Args:
         text: Input string to sanitize
@@ -18,42 +22,7 @@ def sanitize_input(text):
     """
     if not text:
         return text
-    # Remove potentially dangerous characters and trim whitespace
-    text = text.strip()
-    # Additional sanitization can be added here
-    return text
-
-
-def validate_email(email):
-    """
-    Validate email format using regex
-    
-    Args:
-        email: Email address to validate
-        
-    Returns:
-        Boolean indicating if email is valid
-    """
-    if not email:
-        return False
-    pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-    return re.match(pattern, email) is not None
-
-
-def validate_voter_id(voter_id):
-    """
-    Validate voter ID format (alphanumeric, 5-20 characters)
-    
-    Args:
-        voter_id: Voter ID to validate
-        
-    Returns:
-        Boolean indicating if voter ID is valid
-    """
-    if not voter_id:
-        return False
-    pattern = r'^[a-zA-Z0-9]{5,20}$'
-    return re.match(pattern, voter_id) is not None
+    return text.strip()
 
 
 def validate_password(password):
@@ -72,10 +41,10 @@ def validate_password(password):
     if not password or len(password) < 8:
         return False, "Password must be at least 8 characters long"
     
-    if not re.search(r'[A-Za-z]', password):
+    if not LETTER_PATTERN.search(password):
         return False, "Password must contain at least one letter"
     
-    if not re.search(r'\d', password):
+    if not DIGIT_PATTERN.search(password):
         return False, "Password must contain at least one number"
     
     return True, None
@@ -0,0 +1,222 @@
+"""
+Input validation and sanitization
+Schema-driven field specs with precompiled patterns. Sanitization only runs
+the bleach HTML parser when a value actually contains characters bleach
+would change; plain values (voter IDs, names, codes) take a fast path.
+"""
+import re
+import threading
+
+from config import Config
+from email_blocklist import DomainBlocklist, SizedCache
+
+# Disposable email domains, loaded from a data file and hot-reloaded
+email_blocklist = DomainBlocklist(Config.EMAIL_BLOCKLIST_PATH)
+
+# Sized, measurable cache for is_valid_email; cleared whenever the
+# blocklist is reloaded so cached verdicts never go stale
+email_validation_cache = SizedCache(Config.EMAIL_VALIDATION_CACHE_SIZE)
+email_blocklist.on_reload(email_validation_cache.clear)
+
+# Pre-compiled patterns
+EMAIL_PATTERN = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+VOTER_ID_PATTERN = re.compile(r'^[a-zA-Z0-9]{5,20}$')
+LETTER_PATTERN = re.compile(r'[A-Za-z]')
+DIGIT_PATTERN = re.compile(r'\d')
+
+# Every character bleach.clean(tags=[], strip=True) rewrites: markup
+# (& < >), C0 control characters other than tab/newline, and lone
+# surrogates. Text without any of them comes back unchanged.
+MARKUP_CHARS = re.compile('[\x00-\x08\x0b-\x1f&<>\ud800-\udfff]')
+
+_cleaners = threading.local()
+
+
+def _bleach_clean(text):
+    """bleach.clean(text, tags=[], strip=True) with a reused per-thread Cleaner"""
+    cleaner = getattr(_cleaners, 'cleaner', None)
+    if cleaner is None:
+        from bleach.sanitizer import Cleaner  # heavy import, only when markup shows up
+        cleaner = _cleaners.cleaner = Cleaner(tags=[], strip=True)
+    return cleaner.clean(text)
+
+
+def sanitize_input(text):
+    """Sanitize user input to prevent XSS"""
+    if text is None:
+        return None
+    text = str(text).strip()
+    if not MARKUP_CHARS.search(text):
+        return text
+    return _bleach_clean(text)
+
+
+def is_valid_email(email):
+    """Validate email format and check against blocked domains (cached)"""
+    email_blocklist.maybe_reload()
+    return email_validation_cache.get_or_compute(email, _check_email)
+
+
+def _check_email(email):
+    if not email or len(email) < 6:
+        return False, "Email is required" if not email else "Email is too short"
+
+    email = email.strip().lower()
+
+    # Fast regex check with pre-compiled pattern
+    if not EMAIL_PATTERN.match(email):
+        return False, "Invalid email format"
+
+    # Extract and validate domain
+    domain = email.rsplit('@', 1)[-1]
+    if '.' not in domain or email_blocklist.is_blocked(domain):
+        return (False, "Invalid email domain") if '.' not in domain else (False, "Disposable/temporary emails are not allowed.")
+
+    return True, "Valid email"
+
+
+# Password strength validation
+def is_strong_password(password):
+    """Check password strength: min 8 chars, 1 uppercase, 1 lowercase, 1 digit"""
+    if not password or len(password) < 8:
+        return False, "Password must be at least 8 characters long"
+    if not any(c.isupper() for c in password):
+        return False, "Password must contain at least one uppercase letter"
+    if not any(c.islower() for c in password):
+        return False, "Password must contain at least one lowercase letter"
+    if not any(c.isdigit() for c in password):
+        return False, "Password must contain at least one number"
+    return True, "Strong password"
+
+
+class FieldSpec:
+    """
+    How one form field is cleaned and validated
+
+    Args:
+        label: Human readable name used in error messages
+        required: Reject missing/empty values
+        sanitize: Run sanitize_input (off for passwords and emails)
+        lower: Lower-case the value
+        max_length: Maximum length after cleaning (matches the DB column)
+        pattern: Precompiled regex the value must fully match
+        validator: Callable returning (is_valid, message)
+        message: Error message when the pattern does not match
+    """
+
+    __slots__ = ('label', 'required', 'sanitize', 'lower', 'max_length', 'pattern', 'validator', 'message')
+
+    def __init__(self, label, required=True, sanitize=True, lower=False, max_length=None,
+                 pattern=None, validator=None, message=None):
+        self.label = label
+        self.required = required
+        self.sanitize = sanitize
+        self.lower = lower
+        self.max_length = max_length
+        self.pattern = pattern
+        self.validator = validator
+        self.message = message or f"Invalid {label.lower()}"
+
+    def clean(self, value):
+        """
+        Clean and validate one value
+
+        Returns:
+            Tuple (cleaned_value, error_message or None)
+        """
+        if value is None or (isinstance(value, str) and not value.strip()):
+            return value, (f"{self.label} is required" if self.required else None)
+        if self.sanitize:
+            value = sanitize_input(value)
+        elif self.lower:
+            value = value.strip()
+        if self.lower:
+            value = value.lower()
+        if self.validator is not None:
+            is_valid, message = self.validator(value)
+            if not is_valid:
+                return value, message
+        if self.pattern is not None and not self.pattern.match(value):
+            return value, self.message
+        if self.max_length is not None and len(value) > self.max_length:
+            return value, f"{self.label} must be at most {self.max_length} characters"
+        return value, None
+
+
+# Field order decides which error is reported first
+VOTER_REGISTRATION_SCHEMA = {
+    'password': FieldSpec('Password', sanitize=False, validator=is_strong_password),
+    'email': FieldSpec('Email', sanitize=False, lower=True, max_length=120, validator=is_valid_email),
+    'college_code': FieldSpec('College code', max_length=20),
+    'voter_id': FieldSpec('Voter ID', max_length=50),
+    'name': FieldSpec('Name', max_length=100),
+}
+
+VOTER_LOGIN_SCHEMA = {
+    'voter_id': FieldSpec('Voter ID', max_length=50),
+    'password': FieldSpec('Password', sanitize=False),
+    'college_code': FieldSpec('College code', max_length=20),
+}
+
+
+def validate_form(schema, data):
+    """
+    Clean and validate a mapping of raw values (e.g. request.form)
+
+    Args:
+        schema: Dict of field name -> FieldSpec
+        data: Mapping with a .get() method
+
+    Returns:
+        Tuple (cleaned_dict, errors) where errors is a list of messages in
+        schema order (empty when valid)
+    """
+    cleaned = {}
+    errors = []
+    for name, spec in schema.items():
+        value, error = spec.clean(data.get(name))
+        cleaned[name] = value
+        if error:
+            errors.append(error)
+    return cleaned, errors
+
+
+def validate_batch(schema, rows):
+    """
+    Validate many rows at once (bulk imports)
+
+    Duplicate raw values within the batch are cleaned only once, so a column
+    such as college_code that repeats on every row costs one check.
+
+    Returns:
+        List of (cleaned_dict, errors) tuples, one per row
+    """
+    memo = {name: {} for name in schema}
+    results = []
+    for row in rows:
+        cleaned = {}
+        errors = []
+        for name, spec in schema.items():
+            raw = row.get(name)
+            field_memo = memo[name]
+            try:
+                value, error = field_memo[raw]
+            except KeyError:
+                value, error = field_memo[raw] = spec.clean(raw)
+            except TypeError:
+                value, error = spec.clean(raw)
+            cleaned[name] = value
+            if error:
+                errors.append(error)
+        results.append((cleaned, errors))
+    return results
+
+
+def validate_email(email):
+    """Boolean email format check (no blocklist)"""
+    return bool(email) and EMAIL_PATTERN.match(email) is not None
+
+
+def validate_voter_id(voter_id):
+    """Validate voter ID format (alphanumeric, 5-20 characters)"""
+    return bool(voter_id) and VOTER_ID_PATTERN.match(voter_id) is not None
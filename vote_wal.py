@@ -0,0 +1,190 @@
+"""
+Write-ahead vote ingestion buffer
+Votes are appended to a local SQLite queue (fsynced before the voter is
+acknowledged) and group-committed to the main database by a background
+flusher. The voter/election pair is unique in both the queue and the votes
+table, so replaying the queue after a crash applies every vote exactly once.
+"""
+import logging
+import sqlite3
+import threading
+import time
+import os
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+
+class VoteWriteAheadLog:
+    """
+    Durable, append-only queue of cast votes
+
+    Args:
+        path: SQLite file holding the queue
+        apply_batch: Callable receiving a list of entry dicts; must insert the
+            votes idempotently (skip voter/election pairs already stored)
+        batch_size: Maximum votes group-committed per flush
+        flush_interval: Seconds the flusher waits for more votes to arrive
+    """
+
+    def __init__(self, path, apply_batch, batch_size=500, flush_interval=0.2):
+        self.path = path
+        self.apply_batch = apply_batch
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._local = threading.local()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Use a throwaway connection so no SQLite handle is created in a
+        # process that may fork afterwards (gunicorn --preload)
+        conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS vote_log ('
+            ' seq INTEGER PRIMARY KEY AUTOINCREMENT,'
+            ' voter_id INTEGER NOT NULL,'
+            ' election_id INTEGER NOT NULL,'
+            ' candidate_id INTEGER NOT NULL,'
+            ' college_code TEXT,'
+            ' timestamp TEXT NOT NULL,'
+            ' rankings TEXT,'
+            ' nonce TEXT,'
+            ' UNIQUE (voter_id, election_id))'
+        )
+        columns = {row[1] for row in conn.execute('PRAGMA table_info(vote_log)')}
+        if 'rankings' not in columns:
+            # Queue files written before ranked ballots existed
+            conn.execute('ALTER TABLE vote_log ADD COLUMN rankings TEXT')
+        if 'nonce' not in columns:
+            # Queue files written before the audit log existed
+            conn.execute('ALTER TABLE vote_log ADD COLUMN nonce TEXT')
+        conn.close()
+
+    def _connection(self):
+        """One connection per thread; FULL sync makes each commit an fsync"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=FULL')
+            conn.execute('PRAGMA busy_timeout=30000')
+            self._local.conn = conn
+        return conn
+
+    def append(self, voter_id, election_id, candidate_id, college_code=None, timestamp=None, rankings=None,
+               nonce=None):
+        """
+        Durably append a vote
+
+        Args:
+            nonce: Audit log salt of the voter's receipt, kept so the applied
+                vote's audit entry reproduces the receipt
+
+        Returns:
+            True once the vote is on disk, False if this voter already has a
+            pending vote for the election
+        """
+        timestamp = (timestamp or datetime.now()).isoformat()
+        try:
+            self._connection().execute(
+                'INSERT INTO vote_log (voter_id, election_id, candidate_id, college_code, timestamp, rankings, nonce)'
+                ' VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (voter_id, election_id, candidate_id, college_code, timestamp, rankings, nonce)
+            )
+        except sqlite3.IntegrityError:
+            return False
+        self._wakeup.set()
+        return True
+
+    def is_pending(self, voter_id, election_id):
+        row = self._connection().execute(
+            'SELECT 1 FROM vote_log WHERE voter_id = ? AND election_id = ?',
+            (voter_id, election_id)
+        ).fetchone()
+        return row is not None
+
+    def pending_count(self, election_id=None):
+        if election_id is None:
+            return self._connection().execute('SELECT COUNT(*) FROM vote_log').fetchone()[0]
+        return self._connection().execute(
+            'SELECT COUNT(*) FROM vote_log WHERE election_id = ?', (election_id,)).fetchone()[0]
+
+    def flush(self):
+        """
+        Group-commit one batch of pending votes to the main database
+
+        Entries are removed from the queue only after apply_batch returns, so
+        a crash in between simply replays them (and they are skipped as
+        already stored).
+
+        Returns:
+            Number of queue entries processed
+        """
+        with self._flush_lock:
+            conn = self._connection()
+            rows = conn.execute(
+                'SELECT seq, voter_id, election_id, candidate_id, college_code, timestamp, rankings, nonce'
+                ' FROM vote_log ORDER BY seq LIMIT ?',
+                (self.batch_size,)
+            ).fetchall()
+            if not rows:
+                return 0
+            entries = [{
+                'voter_id': voter_id,
+                'election_id': election_id,
+                'candidate_id': candidate_id,
+                'college_code': college_code,
+                'timestamp': datetime.fromisoformat(timestamp),
+                'rankings': rankings,
+                'nonce': nonce
+            } for _, voter_id, election_id, candidate_id, college_code, timestamp, rankings, nonce in rows]
+            self.apply_batch(entries)
+            conn.execute('DELETE FROM vote_log WHERE seq <= ?', (rows[-1][0],))
+            return len(rows)
+
+    def replay(self):
+        """Drain the whole queue (crash recovery / shutdown)"""
+        total = 0
+        while True:
+            applied = self.flush()
+            if not applied:
+                return total
+            total += applied
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                while self.flush() == self.batch_size:
+                    pass
+            except Exception:
+                # Keep the entries queued and retry on the next tick
+                logger.exception('Vote WAL flush failed', extra={'event': 'vote_wal_flush_failed'})
+                time.sleep(self.flush_interval)
+
+    def start(self):
+        """Replay anything left by a previous crash, then start the flusher"""
+        if self._thread and self._thread.is_alive():
+            return
+        # Connections, locks and events inherited through fork are unusable
+        self._local = threading.local()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='vote-wal-flusher', daemon=True)
+        self._thread.start()
+        self._wakeup.set()
+
+    def stop(self):
+        """Stop the flusher and drain the queue"""
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        self.replay()
@@ -0,0 +1,172 @@
+"""
+Per-election voted bitmaps
+One bit per voter primary key records whether the voter has a vote in the
+election, so has_voted is a bit test and turnout a popcount. Each bitmap is
+a file mapped with mmap(MAP_SHARED): every gunicorn worker on the host maps
+the same pages, a bit set by one worker is immediately visible to the
+others, and 1M voters take 125 KB per election.
+
+Writers serialize on an flock of the file across processes and on a lock
+within the process (setting a bit is a read-modify-write of its byte);
+reset() must run after fork so each worker has its own file descriptions.
+Files only ever grow and are cleared in place rather than deleted, so
+another process's mapping never goes stale.
+"""
+import fcntl
+import mmap
+import os
+import threading
+from contextlib import contextmanager
+
+MAGIC = b'VOTEDIX1'  # written once the initial build is complete
+HEADER = len(MAGIC)
+GROW_BYTES = 64 * 1024  # grow in steps so new registrations rarely resize
+
+
+class _Bitmap:
+    def __init__(self, path):
+        self.fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        self.map = None
+        self.length = 0
+
+    def remap(self):
+        size = os.fstat(self.fd).st_size
+        if size and size != self.length:
+            self.map = mmap.mmap(self.fd, size, mmap.MAP_SHARED, mmap.PROT_READ | mmap.PROT_WRITE)
+            self.length = size
+
+    @property
+    def built(self):
+        return self.map is not None and self.map[:HEADER] == MAGIC
+
+
+class VotedIndex:
+    """
+    Directory of mmap-backed voted bitmaps
+
+    Args:
+        directory: Host-local directory shared by all workers
+        load_voter_ids: Callable(election_id) returning the ids of all
+            voters with a stored vote in the election (used to build and
+            rebuild a bitmap)
+    """
+
+    def __init__(self, directory, load_voter_ids):
+        self.directory = directory
+        self.load_voter_ids = load_voter_ids
+        self._bitmaps = {}
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, election_id):
+        return os.path.join(self.directory, f'election-{election_id}.bits')
+
+    def _bitmap(self, election_id):
+        bitmap = self._bitmaps.get(election_id)
+        if bitmap is not None and bitmap.built:
+            return bitmap
+        with self._lock:
+            bitmap = self._bitmaps.get(election_id)
+            if bitmap is None:
+                bitmap = _Bitmap(self._path(election_id))
+                self._bitmaps[election_id] = bitmap
+            bitmap.remap()
+            if not bitmap.built:
+                self._rebuild(election_id, bitmap, force=False)
+        return bitmap
+
+    def _ensure_length(self, bitmap, voter_id):
+        """Grow the file to hold voter_id (caller holds the flock)"""
+        needed = HEADER + voter_id // 8 + 1
+        bitmap.remap()
+        if bitmap.length < needed:
+            os.ftruncate(bitmap.fd, needed + GROW_BYTES)
+            bitmap.remap()
+
+    @contextmanager
+    def _locked(self, bitmap):
+        """Exclusive write access across threads and processes"""
+        with self._write_lock:
+            fcntl.flock(bitmap.fd, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(bitmap.fd, fcntl.LOCK_UN)
+
+    def _rebuild(self, election_id, bitmap, force=True):
+        with self._locked(bitmap):
+            bitmap.remap()
+            if not force and bitmap.built:
+                # Another worker built it while we waited for the lock
+                return
+            voter_ids = list(self.load_voter_ids(election_id))
+            self._ensure_length(bitmap, max(voter_ids, default=0))
+            # Cleared and refilled in place: other processes keep valid maps
+            bitmap.map[HEADER:] = bytes(bitmap.length - HEADER)
+            for voter_id in voter_ids:
+                bitmap.map[HEADER + voter_id // 8] |= 1 << (voter_id % 8)
+            bitmap.map[:HEADER] = MAGIC
+
+    def has_voted(self, election_id, voter_id):
+        bitmap = self._bitmap(election_id)
+        offset = HEADER + voter_id // 8
+        if offset >= bitmap.length:
+            # Another worker may have grown the file for a new voter
+            bitmap.remap()
+            if offset >= bitmap.length:
+                return False
+        return bool(bitmap.map[offset] & (1 << (voter_id % 8)))
+
+    def mark(self, election_id, voter_ids, voted=True):
+        """Set (or with voted=False clear) the bits of stored/deleted votes"""
+        bitmap = self._bitmap(election_id)
+        voter_ids = list(voter_ids)
+        if not voter_ids:
+            return
+        with self._locked(bitmap):
+            self._ensure_length(bitmap, max(voter_ids))
+            for voter_id in voter_ids:
+                offset = HEADER + voter_id // 8
+                if voted:
+                    bitmap.map[offset] |= 1 << (voter_id % 8)
+                else:
+                    bitmap.map[offset] &= ~(1 << (voter_id % 8)) & 0xFF
+
+    def unmark_voter(self, voter_id, election_ids):
+        for election_id in election_ids:
+            self.mark(election_id, [voter_id], voted=False)
+
+    def rebuild(self, election_id):
+        """Reload an election's bitmap from the stored votes"""
+        bitmap = self._bitmap(election_id)
+        self._rebuild(election_id, bitmap)
+
+    def _bits(self, election_id):
+        bitmap = self._bitmap(election_id)
+        bitmap.remap()
+        return int.from_bytes(bitmap.map[HEADER:], 'little')
+
+    def count(self, election_id):
+        """Voters with a vote in the election (popcount)"""
+        return self._bits(election_id).bit_count()
+
+    def count_any(self, election_ids):
+        """Distinct voters with a vote in any of the elections"""
+        combined = 0
+        for election_id in election_ids:
+            combined |= self._bits(election_id)
+        return combined.bit_count()
+
+    def memory_bytes(self):
+        """Bytes of bitmap mapped by this process (the pages are shared between workers)"""
+        return sum(bitmap.length for bitmap in self._bitmaps.values())
+
+    def reset(self):
+        """Drop this process's maps (after fork); files stay valid"""
+        with self._lock:
+            for bitmap in self._bitmaps.values():
+                if bitmap.map is not None:
+                    bitmap.map.close()
+                os.close(bitmap.fd)
+            self._bitmaps = {}